@@ -0,0 +1,89 @@
+"""
+Microbenchmark of the per-call overhead of FallbackWrapper, which runs the
+function compiled from a SIR, against calling its partial program directly.
+
+The wrapper is called in the steady state, i.e. after its partial program is
+built and the back trace steps of the calling code are done. With
+`--num_statements`, the SIR is a chain of that many statements (1 by default),
+so the overhead can be compared with the cost of the program itself. With
+`--overhead`, the partial program is replaced by a function returning its
+outputs, so only the cost of the wrapper itself is measured.
+
+The hooked path, which is taken when the logs or the profiler are enabled,
+is measured by calling `FallbackWrapper.call_with_hooks`.
+
+Usage:
+    ENABLE_FALL_BACK=False python benchmarks/fallback_wrapper.py [number] [--num_statements=N] [--overhead]
+"""
+import sys
+import timeit
+
+import paddle
+from sot.symbolic.compile_cache import FallbackWrapper
+from sot.symbolic.interpreter import compile_sir
+from sot.symbolic.statement_ir import MethodStatement, Symbol
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+from sot.utils import StepInfoManager
+
+
+def build_wrapper(num_statements):
+    context = SymbolicTraceContext()
+    sir = context.TOS
+    for i in range(num_statements):
+        sir.add_statement(
+            MethodStatement(
+                "__add__",
+                ((Symbol(f"var_{i}"), 1.0), {}),
+                Symbol(f"var_{i + 1}"),
+                [],
+            )
+        )
+    sir.inputs = [Symbol("var_0")]
+    sir.outputs = [Symbol(f"var_{num_statements}")]
+    return FallbackWrapper(
+        paddle.jit.to_static(
+            compile_sir(context, sir.name), enable_fallback=False
+        ),
+        sir,
+    )
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    number = int(args[0]) if args else 1000
+    repeat = 20
+    num_statements = 1
+    for arg in sys.argv[1:]:
+        if arg.startswith("--num_statements="):
+            num_statements = int(arg.split("=", 1)[1])
+    wrapper = build_wrapper(num_statements)
+    inputs = (paddle.rand([4, 4]),)
+    with StepInfoManager().step_guard(main.__code__):
+        step_info = StepInfoManager().current_step_info
+        step_info.step_count = step_info.BACK_TRACE_STEPS
+        wrapper(inputs)
+        assert wrapper.partial_program is not None
+        if "--overhead" in sys.argv:
+            outputs = wrapper.partial_program(inputs)
+            wrapper.partial_program = lambda *args, **kwargs: outputs
+
+        fns = {
+            "partial_program": wrapper.partial_program,
+            "FallbackWrapper": wrapper,
+            "FallbackWrapper (hooks)": wrapper.call_with_hooks,
+        }
+        # The repeats of both are interleaved, so they see the same noise.
+        costs = {name: [] for name in fns}
+        for _ in range(repeat):
+            for name, fn in fns.items():
+                costs[name].append(
+                    timeit.timeit(lambda: fn(inputs), number=number)
+                )
+    for name, cost in costs.items():
+        print(f"{name}: {min(cost) / number * 1e6:.2f} us per call")
+    overhead = min(costs["FallbackWrapper"]) - min(costs["partial_program"])
+    print(f"overhead: {overhead / number * 1e6:.2f} us per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Microbenchmark of looking up cache entries through GuardTree versus scanning
+the guards of all entries linearly.
+
+Every entry guards `num_tensors` tensors, and entries only differ in the shape
+of the last tensor, like the shape specializations of a hot function. Besides
+repeatedly hitting the last entry, the lookups also alternate between the
+entries of the first and the last shape, like an inference server serving two
+batch sizes.
+
+Usage:
+    python benchmarks/guard_tree_lookup.py [num_entries] [num_tensors]
+"""
+import inspect
+import sys
+import timeit
+
+import paddle
+from sot.infer_meta import MetaInfo
+from sot.opcode_translator.executor.guard import (
+    StringifyExpression,
+    make_guard,
+    tensor_meta_stringify_guard,
+)
+from sot.opcode_translator.executor.guard_tree import GuardTree
+from sot.utils import tmp_name_guard
+
+
+def build_guard(tensors, entry_id):
+    with tmp_name_guard():
+        exprs = []
+        for name, tensor in tensors.items():
+            tracer = StringifyExpression(f"frame.f_locals['{name}']", [], {})
+            exprs.append(
+                tensor_meta_stringify_guard(
+                    tracer,
+                    MetaInfo.from_tensor(tensor),
+                    f"__{name}_{entry_id}_meta",
+                )
+            )
+        return make_guard(exprs)
+
+
+def fake_frame(tensors):
+    namespace = {"inspect": inspect}
+    params = ", ".join(tensors.keys())
+    exec(f"def inner({params}):\n    return inspect.currentframe()", namespace)
+    return namespace["inner"](**tensors)
+
+
+def linear_lookup(guards, frame):
+    for guard, entry in guards:
+        try:
+            if guard(frame):
+                return entry
+        except Exception:
+            continue
+    return None
+
+
+def main():
+    num_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    num_tensors = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    guards = []
+    tree = GuardTree()
+    for i in range(num_entries):
+        tensors = {f"x{j}": paddle.rand([4, 4]) for j in range(num_tensors)}
+        tensors[f"x{num_tensors - 1}"] = paddle.rand([i + 1, 4])
+        guard = build_guard(tensors, i)
+        guards.append((guard, i))
+        tree.add(guard, i)
+
+    frames = []
+    for i in [0, num_entries - 1]:
+        tensors = {f"x{j}": paddle.rand([4, 4]) for j in range(num_tensors)}
+        tensors[f"x{num_tensors - 1}"] = paddle.rand([i + 1, 4])
+        frame = fake_frame(tensors)
+        assert linear_lookup(guards, frame) == tree.lookup(frame) == i
+        frames.append(frame)
+
+    def alternate(lookup):
+        for frame in frames:
+            lookup(frame)
+
+    number = 2000
+    # The worst case of linear scan: hit the last entry.
+    last_frame = frames[-1]
+    for title, lookup in [
+        ("linear scan", lambda: linear_lookup(guards, last_frame)),
+        ("guard tree", lambda: tree.lookup(last_frame)),
+        (
+            "linear scan (alternating)",
+            lambda: alternate(lambda frame: linear_lookup(guards, frame)),
+        ),
+        ("guard tree (alternating)", lambda: alternate(tree.lookup)),
+    ]:
+        cost = min(timeit.repeat(lookup, number=number, repeat=5))
+        if "alternating" in title:
+            cost /= len(frames)
+        print(f"{title:>25}: {cost / number * 1e6:.3f} us per lookup")
+    print(
+        f"guard tree hits: {tree.hit_count}, "
+        f"last hit fast path: {tree.last_hit_count}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Microbenchmark of inferring the metas of the builtin layers of ResNet, which
+are called by `FunctionGraph.call_layer` when a model is simulated, by the
+layer rules of RuleInferMeta, against building the static program of every
+layer. LayerInferMetaCache is bypassed, so every call is a miss, as it is
+when a new input shape is simulated.
+
+Usage:
+    ENABLE_FALL_BACK=False python benchmarks/infer_meta_for_layer.py [number] [--model=resnet18|resnet50]
+"""
+import sys
+import time
+
+import paddle
+from paddle.vision.models import resnet18, resnet50
+from sot.infer_meta import (
+    MetaInfo,
+    infer_meta_for_layer,
+    infer_meta_for_layer_by_program,
+)
+
+MODELS = {"resnet18": resnet18, "resnet50": resnet50}
+
+
+def collect_calls(net, x):
+    """
+    Returns the builtin layers called by net and the shapes of their inputs.
+    """
+    calls = []
+
+    def hook(layer, inputs):
+        calls.append((layer, list(inputs[0].shape)))
+
+    handles = [
+        layer.register_forward_pre_hook(hook)
+        for layer in net.sublayers()
+        if type(layer).__module__.startswith("paddle.nn.")
+        and not layer.sublayers()
+    ]
+    net(x)
+    for handle in handles:
+        handle.remove()
+    return calls
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    number = int(args[0]) if args else 3
+    model = "resnet18"
+    for arg in sys.argv[1:]:
+        if arg.startswith("--model="):
+            model = arg.split("=", 1)[1]
+    net = MODELS[model]()
+    net.eval()
+    calls = collect_calls(net, paddle.rand([1, 3, 64, 64]))
+    print(f"{model}: {len(calls)} builtin layer calls per forward")
+    fns = {
+        "program": infer_meta_for_layer_by_program,
+        "rule": infer_meta_for_layer,
+    }
+    for name, fn in fns.items():
+        # The first batch size warms up.
+        for batch_size in range(1, 2 + number):
+            if batch_size == 2:
+                start = time.perf_counter()
+            for layer, shape in calls:
+                fn(
+                    layer,
+                    MetaInfo(
+                        [batch_size, *shape[1:]],
+                        paddle.float32,
+                        True,
+                        "x",
+                        False,
+                        None,
+                        None,
+                    ),
+                )
+        cost = (time.perf_counter() - start) / number
+        print(f"{name:<10}{cost * 1e3:>10.2f} ms per forward")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Microbenchmark of inferring the metas of common APIs and tensor methods by
+the rules of RuleInferMeta, against appending their ops to the static program
+of VariableCreator. InferMetaCache is bypassed, so every call is a miss, as it
+is when a new shape is simulated.
+
+Usage:
+    python benchmarks/infer_meta_rules.py [number]
+"""
+import sys
+import timeit
+
+import paddle
+from sot.infer_meta import MetaInfo, RuleInferMeta, infer_meta
+
+
+def meta(shape, dtype=paddle.float32):
+    return MetaInfo(shape, dtype, False, "x", False, None, None)
+
+
+x = meta([8, 16, 32])
+y = meta([32])
+w = meta([32, 64])
+CALLS = {
+    "x + y": ("__add__", (x, y), {}),
+    "x * 2.0": ("__mul__", (x, 2.0), {}),
+    "relu(x)": (paddle.nn.functional.relu, (x,), {}),
+    "sum(x, axis=-1)": (paddle.sum, (x,), {"axis": -1}),
+    "matmul(x, w)": (paddle.matmul, (x, w), {}),
+    "reshape(x, [-1, 32])": ("reshape", (x, [-1, 32]), {}),
+    "concat([x, x])": (paddle.concat, ([x, x],), {"axis": 1}),
+    "x.astype('float16')": ("astype", (x, "float16"), {}),
+}
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rules = RuleInferMeta().rules
+    print(f"{'call':<24}{'program (us)':>14}{'rule (us)':>12}")
+    for label, (func, args, kwargs) in CALLS.items():
+        costs = []
+        for enabled in [False, True]:
+            RuleInferMeta().rules = rules if enabled else {}
+            cost = timeit.timeit(
+                lambda: infer_meta(func, *args, **kwargs), number=number
+            )
+            costs.append(cost / number * 1e6)
+        print(f"{label:<24}{costs[0]:>14.2f}{costs[1]:>12.2f}")
+    RuleInferMeta().rules = rules
+
+
+if __name__ == "__main__":
+    main()
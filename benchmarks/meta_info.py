@@ -0,0 +1,61 @@
+"""
+Microbenchmark of the memory of MetaInfo and the cost of computing the keys
+of InferMetaCache, which hashes the metas of the arguments on every call of
+an API during simulation.
+
+The memory is measured for the metas with a few shapes, as the outputs of
+the rules in a trace, and for the metas with distinct shapes.
+
+Usage:
+    python benchmarks/meta_info.py [number]
+"""
+import sys
+import timeit
+import tracemalloc
+
+import paddle
+from sot.infer_meta import InferMetaCache, MetaInfo
+from sot.infer_meta_rules import RULE_OUTPUT_NAME
+
+
+def create_metas(num, num_shapes):
+    return [
+        MetaInfo(
+            [8, 16, 32, i % num_shapes],
+            paddle.float32,
+            False,
+            RULE_OUTPUT_NAME,
+            False,
+            paddle.base.core.VarDesc.VarType.LOD_TENSOR,
+            None,
+        )
+        for i in range(num)
+    ]
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    num_metas = 100000
+    for label, num_shapes in [("4 shapes", 4), ("distinct shapes", num_metas)]:
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        metas = create_metas(num_metas, num_shapes)
+        size = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        print(f"memory ({label}): {size / num_metas:.1f} bytes per meta")
+
+    x, y = metas[:2]
+    cache = InferMetaCache()
+    calls = {
+        "add(x, y)": (paddle.add, (x, y), {}),
+        "concat([x, y], axis=1)": (paddle.concat, ([x, y],), {"axis": 1}),
+    }
+    for label, (func, args, kwargs) in calls.items():
+        cost = timeit.timeit(
+            lambda: cache.key_fn(func, *args, **kwargs), number=number
+        )
+        print(f"key_fn {label:<24}{cost / number * 1e6:>8.3f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Microbenchmark of building the static program of a SIR by the interpreter,
+which is what `paddle.jit.to_static` does with the function compiled from a
+SIR, for chains of `num_statements` statements.
+
+With `--debug`, every statement carries a source callstack, as it does when
+LOG_LEVEL >= 3, so the created ops are tagged with it. With `--overhead`, the
+SIR runs on python floats instead of static variables, so only the cost of
+the interpreter itself is measured.
+
+Usage:
+    python benchmarks/sir_interpreter.py [num_statements] [--debug] [--overhead]
+"""
+import sys
+import timeit
+
+import paddle
+from sot.symbolic.interpreter import Interpreter
+from sot.symbolic.statement_ir import MethodStatement, Symbol
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+
+
+def build_sir(context, num_statements, debug):
+    sir = context.TOS
+    stacks = ['File "model.py", line 1, in forward'] if debug else []
+    for i in range(num_statements):
+        method = "__add__" if i % 2 == 0 else "__mul__"
+        sir.add_statement(
+            MethodStatement(
+                method,
+                ((Symbol(f"var_{i}"), 1.0), {}),
+                Symbol(f"var_{i + 1}"),
+                stacks,
+            )
+        )
+    sir.inputs = [Symbol("var_0")]
+    sir.outputs = [Symbol(f"var_{num_statements}")]
+    return sir
+
+
+def build_program(context, name):
+    main_program, startup_program = (
+        paddle.static.Program(),
+        paddle.static.Program(),
+    )
+    with paddle.static.program_guard(main_program, startup_program):
+        x = paddle.static.data("x", [4, 4], "float32")
+        Interpreter(context).run_sir(name, {"var_0": x})
+    return main_program
+
+
+def run_on_floats(context, name):
+    return Interpreter(context).run_sir(name, {"var_0": 1.0})
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    debug = "--debug" in sys.argv
+    run = run_on_floats if "--overhead" in sys.argv else build_program
+    max_statements = int(args[0]) if args else 2000
+    paddle.enable_static()
+    for num_statements in [
+        max_statements // 4,
+        max_statements // 2,
+        max_statements,
+    ]:
+        context = SymbolicTraceContext()
+        sir = build_sir(context, num_statements, debug)
+        assert (
+            len(build_program(context, sir.name).global_block().ops)
+            >= num_statements
+        )
+        number = 3 if run is build_program else 100
+        cost = timeit.timeit(lambda: run(context, sir.name), number=number)
+        print(
+            f"{num_statements} statements: {cost / number * 1000:.2f} ms per run, "
+            f"{cost / number / num_statements * 1e6:.2f} us per statement"
+        )
+
+
+if __name__ == "__main__":
+    main()
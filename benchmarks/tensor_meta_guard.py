@@ -0,0 +1,71 @@
+"""
+Microbenchmark of the per-call cost of tensor meta guards.
+
+It compares the formatted string guard (`MetaInfo.from_tensor(x).guard_str()`)
+with the tuple based guard generated by `tensor_meta_stringify_guard`.
+
+Usage:
+    python benchmarks/tensor_meta_guard.py [num_tensors]
+"""
+import inspect
+import sys
+import timeit
+
+import paddle
+from sot.infer_meta import MetaInfo
+from sot.opcode_translator.executor.guard import (
+    StringifyExpression,
+    make_guard,
+    tensor_meta_stringify_guard,
+)
+from sot.utils import tmp_name_guard
+
+
+def string_guard(tracer, meta, name):
+    return StringifyExpression(
+        f"MetaInfo.from_tensor({{}}).guard_str() == '{meta.guard_str()}'",
+        [tracer],
+        {"MetaInfo": MetaInfo},
+    )
+
+
+def build_guard(make_expr, names, metas):
+    with tmp_name_guard():
+        exprs = []
+        for name, meta in zip(names, metas):
+            tracer = StringifyExpression(f"frame.f_locals['{name}']", [], {})
+            exprs.append(make_expr(tracer, meta, f"__{name}_meta"))
+        return make_guard(exprs)
+
+
+def fake_frame(tensors):
+    namespace = {"inspect": inspect}
+    params = ", ".join(tensors.keys())
+    exec(f"def inner({params}):\n    return inspect.currentframe()", namespace)
+    return namespace["inner"](**tensors)
+
+
+def main():
+    num_tensors = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    tensors = {
+        f"x{i}": paddle.rand([4, i + 1], dtype="float32")
+        for i in range(num_tensors)
+    }
+    names = list(tensors.keys())
+    metas = [MetaInfo.from_tensor(t) for t in tensors.values()]
+    frame = fake_frame(tensors)
+
+    number = 2000
+    for title, make_expr in [
+        ("string guard", string_guard),
+        ("tuple guard", tensor_meta_stringify_guard),
+    ]:
+        guard = build_guard(make_expr, names, metas)
+        assert guard(frame), f"{title} should pass"
+        cost = min(timeit.repeat(lambda: guard(frame), number=number, repeat=5))
+        per_guard = cost / number / num_tensors * 1e6
+        print(f"{title:>12}: {per_guard:.3f} us per tensor guard")
+
+
+if __name__ == "__main__":
+    main()
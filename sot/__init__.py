@@ -5,4 +5,4 @@ from .opcode_translator.breakpoint import (  # noqa: F401
     add_event,
 )
 from .opcode_translator.skip_files import skip_function  # noqa: F401
-from .translate import symbolic_translate  # noqa: F401
+from .translate import symbolic_translate, warmup  # noqa: F401
@@ -1,3 +1,8 @@
+from __future__ import annotations
+
+import functools
+import weakref
+
 import paddle
 from paddle.amp.auto_cast import amp_state
 from paddle.base.unique_name import UniqueNameGenerator
@@ -5,40 +10,117 @@ from paddle.base.unique_name import guard as UniqueNameGuard
 from paddle.static import Program
 from paddle.utils import flatten, is_sequence
 
-from .utils import Cache, Singleton, map_if_extend, meta_str
+from .utils import (
+    Cache,
+    InnerError,
+    Singleton,
+    check_infer_meta_rules,
+    log,
+    map_if_extend,
+    meta_str,
+    static_program_lock,
+)
 
 
-class MetaInfo:
-    def __init__(
-        self, shape, dtype, stop_gradient, name, persistable, type, place
-    ):
-        self.name = name
-        self.persistable = persistable
-        self.type = type
-        self.place = place
-        self.shape = shape
-        self.dtype = dtype
-        self.stop_gradient = stop_gradient
+def simulation_dtype(dtype):
+    """
+    Returns the dtype used in simulation for a tensor of the given dtype.
 
-    @staticmethod
-    def from_tensor(tensor):
-        # We always use float32 in simulation if AMP is enabled.
-        dtype = tensor.dtype
+    We always use float32 in simulation if AMP is enabled, so a float16 tensor
+    is treated as float32 when the current AMP dtype is float16.
+    """
+    if dtype == paddle.float16:
         current_amp_state = amp_state()
         if (
-            dtype == paddle.float16
-            and current_amp_state is not None
+            current_amp_state is not None
             and current_amp_state["dtype"] == "float16"
         ):
-            dtype = paddle.float32
+            return paddle.float32
+    return dtype
+
+
+class MetaInfo:
+    """
+    The meta information of a tensor, which is immutable, so the metas are
+    shared by the variables and the caches, and hashed by the precomputed
+    hash of its shape (a tuple), dtype and stop_gradient.
+
+    The identical metas are interned, i.e. creating a meta returns the living
+    one with the same fields if there is one. The metas with a place (i.e. of
+    the eager tensors) aren't interned, since the places are compared by
+    identity.
+    """
+
+    __slots__ = (
+        "shape",
+        "dtype",
+        "stop_gradient",
+        "name",
+        "persistable",
+        "type",
+        "place",
+        "_hash",
+        "__weakref__",
+    )
+
+    _interned: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def __new__(
+        cls, shape, dtype, stop_gradient, name, persistable, type, place
+    ):
+        shape = tuple(shape)
+        if place is None:
+            key = (shape, dtype, stop_gradient, name, persistable, type)
+            meta = cls._interned.get(key)
+            if meta is not None:
+                return meta
+        meta = super().__new__(cls)
+        setattr_ = super().__setattr__
+        setattr_(meta, "shape", shape)
+        setattr_(meta, "dtype", dtype)
+        setattr_(meta, "stop_gradient", stop_gradient)
+        setattr_(meta, "name", name)
+        setattr_(meta, "persistable", persistable)
+        setattr_(meta, "type", type)
+        setattr_(meta, "place", place)
+        setattr_(meta, "_hash", hash((shape, dtype, stop_gradient)))
+        if place is None:
+            cls._interned[key] = meta
+        return meta
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"MetaInfo is immutable, can't set {name}.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"MetaInfo is immutable, can't delete {name}.")
+
+    def __reduce__(self):
+        return (
+            MetaInfo,
+            (
+                self.shape,
+                self.dtype,
+                self.stop_gradient,
+                self.name,
+                self.persistable,
+                self.type,
+                self.place,
+            ),
+        )
+
+    @staticmethod
+    def from_tensor(tensor):
+        # The place of a static Variable is a method bound to it, which keeps
+        # the program of VariableCreator alive.
+        place = tensor.place if isinstance(tensor, paddle.Tensor) else None
         return MetaInfo(
-            list(tensor.shape),
-            dtype,
+            tensor.shape,
+            simulation_dtype(tensor.dtype),
             tensor.stop_gradient,
             tensor.name,
             tensor.persistable,
             tensor.type,
-            tensor.place,
+            place,
         )
 
     def is_dynamic_shape(self):
@@ -48,26 +130,58 @@ class MetaInfo:
         """
         return -1 in self.shape
 
+    def dynamic_dims(self):
+        """
+        Returns the indices of the dynamic (-1) dimensions.
+        """
+        return tuple(i for i, size in enumerate(self.shape) if size == -1)
+
+    def with_dynamic_dims(self, dims):
+        """
+        Returns a copy of this MetaInfo whose dimensions in dims are dynamic (-1).
+        """
+        return MetaInfo(
+            [-1 if i in dims else size for i, size in enumerate(self.shape)],
+            self.dtype,
+            self.stop_gradient,
+            self.name,
+            self.persistable,
+            self.type,
+            self.place,
+        )
+
     def to_input_spec(self):
         return paddle.static.InputSpec(
             self.shape, dtype=self.dtype, stop_gradient=self.stop_gradient
         )
 
     def guard_str(self):
-        return f"({self.shape}, {self.dtype}, {self.stop_gradient})"
+        return f"({list(self.shape)}, {self.dtype}, {self.stop_gradient})"
+
+    def guard_tuple(self):
+        """
+        The precomputed value compared by the tensor meta guard, only
+        contains the fields which can be read from a tensor directly.
+        """
+        return (list(self.shape), self.dtype, self.stop_gradient)
 
     def __repr__(self):
-        return meta_str(self.shape, self.dtype, self.stop_gradient)
+        return meta_str(list(self.shape), self.dtype, self.stop_gradient)
 
     def __eq__(self, meta):
+        if self is meta:
+            return True
+        if not isinstance(meta, MetaInfo):
+            return NotImplemented
         return (
-            self.shape == meta.shape
+            self._hash == meta._hash
+            and self.shape == meta.shape
             and self.dtype == meta.dtype
             and self.stop_gradient == meta.stop_gradient
         )
 
     def __hash__(self):
-        return hash((tuple(self.shape), self.dtype, self.stop_gradient))
+        return self._hash
 
 
 @Singleton
@@ -75,13 +189,54 @@ class VariableCreator:
     """
     We use the static graph Variable to infer the meta information of Tensor.
     This singleton class is used to create Variable for infer meta.
+
+    The ops of every inferred call are appended to main_program, which is
+    replaced by a new one (with an empty var_cache) once it has more than
+    MAX_PROGRAM_OPS ops or MAX_PROGRAM_VARS variables, so it doesn't slow
+    down the later calls. The inferred MetaInfo don't refer to the program.
     """
 
+    MAX_PROGRAM_OPS = 10000
+    MAX_PROGRAM_VARS = 20000
+
     def __init__(self):
+        self.var_name_generator = UniqueNameGenerator("infer_meta_variable_")
+        self.recycle_num = 0
+        self.new_program()
+
+    def new_program(self):
         self.var_cache = {}
         self.main_program = Program()
         self.startup_program = Program()
-        self.var_name_generator = UniqueNameGenerator("infer_meta_variable_")
+
+    def recycle_program(self):
+        """
+        Replace main_program by a new one if it's too large.
+        """
+        block = self.main_program.global_block()
+        if (
+            len(block.ops) < self.MAX_PROGRAM_OPS
+            and len(block.vars) < self.MAX_PROGRAM_VARS
+        ):
+            return
+        log(
+            3,
+            f"[VariableCreator] recycle the program with {len(block.ops)} ops and {len(block.vars)} variables\n",
+        )
+        self.new_program()
+        self.recycle_num += 1
+
+    def stats(self):
+        """
+        Returns the number of ops and variables of main_program, and the
+        number of the programs recycled.
+        """
+        block = self.main_program.global_block()
+        return {
+            "program_ops": len(block.ops),
+            "program_vars": len(block.vars),
+            "program_recycles": self.recycle_num,
+        }
 
     def gen_name(self, meta):
         name = f"{meta.dtype}_{meta.stop_gradient}"
@@ -107,6 +262,11 @@ class VariableCreator:
         return self.var_cache[var_feature_name]
 
     def infer_meta(self, func, *args, **kwargs):
+        with static_program_lock:
+            return self._infer_meta(func, *args, **kwargs)
+
+    def _infer_meta(self, func, *args, **kwargs):
+        self.recycle_program()
         with paddle.base.framework._dygraph_guard(None), UniqueNameGuard(
             self.var_name_generator
         ):
@@ -158,6 +318,9 @@ def convert_variable_to_meta_info(args):
 
 
 def infer_meta(func, *args, **kwargs):
+    out = RuleInferMeta()(func, *args, **kwargs)
+    if out is not None:
+        return out
     fn = SpecialInferMeta().get_infermeta_fn(func)
     if fn:
         return fn(*args, **kwargs)
@@ -168,22 +331,114 @@ def infer_meta_for_layer(layer, *args, **kwargs):
     assert isinstance(
         layer, paddle.nn.Layer
     ), f"Expect a Layer, but got {layer}."
-    layer = paddle.jit.to_static(layer, enable_fallback=False)
+    out = RuleInferMeta()(layer, *args, **kwargs)
+    if out is not None:
+        return out
+    return infer_meta_for_layer_by_program(layer, *args, **kwargs)
+
+
+def infer_meta_for_layer_by_program(layer, *args, **kwargs):
+    """
+    Infer the metas of the outputs of layer by building the static program
+    of its forward.
+
+    The bound forward is converted rather than the layer, so the layer is
+    left unchanged and needn't be rolled back.
+    """
+    static_forward = paddle.jit.to_static(layer.forward, enable_fallback=False)
 
     args_, kwargs_ = convert_meta_to_input_spec((args, kwargs))
 
-    (
-        concrete_program,
-        partial_program_layer,
-    ) = layer.forward.get_concrete_program(*args_, **kwargs_)
+    with static_program_lock:
+        (
+            concrete_program,
+            partial_program_layer,
+        ) = static_forward.get_concrete_program(*args_, **kwargs_)
 
-    out = partial_program_layer._restore_out(
+    return partial_program_layer._restore_out(
         paddle.utils.flatten(
             convert_variable_to_meta_info(concrete_program.outputs)
         )
     )
-    layer.forward.rollback()
-    return out
+
+
+@Singleton
+class RuleInferMeta:
+    """
+    Infer the metas of the common APIs, tensor methods and builtin layers by
+    the shape and dtype rules in `infer_meta_rules`, which is much cheaper
+    than appending the ops to the static program of VariableCreator, or
+    building the static program of a layer. The APIs without rules, or the
+    calls which a rule can't infer exactly, fall back to the static program.
+
+    The rules of the layers are registered for their exact classes, since a
+    subclass may override the forward, and don't apply to the layers with
+    forward hooks.
+
+    If the environment variable `SOT_CHECK_INFER_META_RULES` is "1", the
+    metas inferred by the rules are checked against the static program.
+    """
+
+    def __init__(self):
+        from .infer_meta_rules import LAYER_RULES, RULES
+
+        self.rules = RULES
+        self.layer_rules = LAYER_RULES
+        self.hit_num = 0
+        self.miss_num = 0
+
+    def __call__(self, func, *args, **kwargs):
+        """
+        Returns the metas of the outputs of func (an API, the name of a tensor
+        method, or a layer), or None if there is no rule of it, or the rule
+        doesn't apply to the arguments.
+        """
+        if amp_state() is not None:
+            return None
+        if isinstance(func, paddle.nn.Layer):
+            rule = self.get_layer_rule(func)
+            if rule is not None:
+                rule = functools.partial(rule, func)
+        else:
+            rule = self.rules.get(func)
+        if rule is None:
+            return None
+        try:
+            out = rule(*args, **kwargs)
+        except TypeError:
+            # The arguments don't match the rule.
+            out = None
+        if out is None:
+            self.miss_num += 1
+            return None
+        self.hit_num += 1
+        if check_infer_meta_rules():
+            self.check(func, out, *args, **kwargs)
+        return out
+
+    def get_layer_rule(self, layer):
+        if layer._forward_pre_hooks or layer._forward_post_hooks:
+            return None
+        return self.layer_rules.get(type(layer))
+
+    def check(self, func, out, *args, **kwargs):
+        if isinstance(func, paddle.nn.Layer):
+            expected = infer_meta_for_layer_by_program(func, *args, **kwargs)
+        else:
+            expected = VariableCreator().infer_meta(func, *args, **kwargs)
+        if not is_sequence(out) or not is_sequence(expected):
+            out, expected = [out], [expected]
+        if list(flatten(out)) != list(flatten(expected)):
+            raise InnerError(
+                f"The metas of {func} inferred by the rule are {out}, but the static program infers {expected}, the arguments are {args}, {kwargs}"
+            )
+
+    def stats(self):
+        """
+        Returns the number of the calls inferred by the rules, and the ones
+        which fall back to the static program although func has a rule.
+        """
+        return {"hits": self.hit_num, "misses": self.miss_num}
 
 
 @Singleton
@@ -242,19 +497,68 @@ class InferMetaCache(Cache):
     def value_fn(self, func, *args, **kwargs):
         return infer_meta(func, *args, **kwargs)
 
+    def stats(self):
+        """
+        Returns the statistics of the cache, see `Cache.stats`, and the size
+        of the program of VariableCreator, see `VariableCreator.stats`.
+        """
+        return {**super().stats(), **VariableCreator().stats()}
+
+
+@Singleton
+class LayerVersionManager:
+    """
+    Track a structural version of the layers, i.e. the shapes, dtypes and
+    stop_gradient of their parameters (including the ones of sublayers),
+    which is used to key LayerInferMetaCache.
+
+    The layers are not changed while a frame is simulated, so the version of
+    a layer is computed once in a translation, the versions are invalidated
+    when a translation starts, see `OpcodeExecutorCache.translate`.
+    """
+
+    def __init__(self):
+        # Increased when a translation starts, since the layers may be
+        # changed by the code run in dygraph before it.
+        self.generation = 0
+        self.versions: weakref.WeakKeyDictionary[
+            paddle.nn.Layer, tuple[int, int]
+        ] = weakref.WeakKeyDictionary()
+
+    def invalidate(self):
+        self.generation += 1
+
+    def get_version(self, layer: paddle.nn.Layer) -> int:
+        record = self.versions.get(layer)
+        if record is not None and record[0] == self.generation:
+            return record[1]
+        version = hash(
+            tuple(
+                (tuple(param.shape), param.dtype, param.stop_gradient)
+                for param in layer.parameters(include_sublayers=True)
+            )
+        )
+        self.versions[layer] = (self.generation, version)
+        return version
+
 
 @Singleton
 class LayerInferMetaCache(Cache):
+    """
+    Cache the metas of the outputs of the layers, which are keyed by the
+    layer, its structural version (see LayerVersionManager), and the metas
+    of the inputs, so a hit doesn't read the parameters.
+    """
+
     def key_fn(self, layer, *args, **kwargs):
-        params = [
-            MetaInfo.from_tensor(x)
-            for x in layer.parameters(include_sublayers=True)
-        ]
         try:
             retval = hash(
                 (
                     layer,
-                    tuple(params),
+                    LayerVersionManager().get_version(layer),
+                    # The parameters of float16 are simulated as float32
+                    # under AMP, see `simulation_dtype`.
+                    simulation_dtype(paddle.float16),
                     tuple(flatten(args)),
                     tuple(kwargs.keys()),
                     tuple(flatten(kwargs)),
@@ -0,0 +1,718 @@
+"""
+The shape and dtype rules of the common APIs, tensor methods and builtin
+layers, which infer the meta of their outputs without appending ops to a
+static program, see `RuleInferMeta`.
+
+A rule is called with the arguments of the API (the tensors are MetaInfo), and
+returns the metas of the outputs, or None if it can't infer them exactly
+(e.g. the inputs have dynamic shape, or different dtypes), then the metas are
+inferred by the static program. The rules follow the static graph APIs, e.g.
+the magic methods of `paddle.static.Variable` cast an integer tensor to
+float32 when it's divided.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Sequence
+
+import paddle
+from paddle.base.framework import convert_np_dtype_to_dtype_
+
+from .infer_meta import MetaInfo
+
+RULES: dict[Callable[..., Any] | str, Callable[..., Any]] = {}
+LAYER_RULES: dict[type[paddle.nn.Layer], Callable[..., Any]] = {}
+
+# The outputs are middle tensors, see `TensorVariable.getattr`.
+RULE_OUTPUT_NAME = "infer_meta_variable_tmp_rule"
+
+FLOAT_DTYPES = {
+    paddle.float16,
+    paddle.bfloat16,
+    paddle.float32,
+    paddle.float64,
+}
+
+INT_DTYPES = {
+    paddle.uint8,
+    paddle.int8,
+    paddle.int16,
+    paddle.int32,
+    paddle.int64,
+}
+
+
+def register_rule(*funcs: Callable[..., Any] | str):
+    """
+    Register the rule for funcs, the APIs or the names of the tensor methods.
+    """
+
+    def register(rule):
+        for func in funcs:
+            RULES[func] = rule
+        return rule
+
+    return register
+
+
+def register_layer_rule(*classes: type[paddle.nn.Layer]):
+    """
+    Register the rule for the layer classes, which is called with the layer
+    and the arguments of its forward.
+    """
+
+    def register(rule):
+        for cls in classes:
+            LAYER_RULES[cls] = rule
+        return rule
+
+    return register
+
+
+def is_static_meta(x: Any) -> bool:
+    return isinstance(x, MetaInfo) and not x.is_dynamic_shape()
+
+
+def is_float_meta(x: Any) -> bool:
+    return is_static_meta(x) and x.dtype in FLOAT_DTYPES
+
+
+def is_int_list(value: Any) -> bool:
+    return isinstance(value, (list, tuple)) and all(
+        type(item) is int for item in value
+    )
+
+
+def new_meta(shape, dtype, *inputs: MetaInfo) -> MetaInfo:
+    """
+    Create the meta of an output, which stops gradient if all inputs do.
+    """
+    return MetaInfo(
+        shape,
+        dtype,
+        all(meta.stop_gradient for meta in inputs),
+        RULE_OUTPUT_NAME,
+        False,
+        paddle.base.core.VarDesc.VarType.LOD_TENSOR,
+        None,
+    )
+
+
+def normalize_axis(axis: Any, ndim: int) -> int | None:
+    if type(axis) is not int or not -ndim <= axis < ndim:
+        return None
+    return axis % ndim
+
+
+def broadcast_shape(x: Sequence[int], y: Sequence[int]) -> list[int] | None:
+    shape = []
+    for i in range(-max(len(x), len(y)), 0):
+        x_dim = x[i] if i >= -len(x) else 1
+        y_dim = y[i] if i >= -len(y) else 1
+        if x_dim != y_dim and x_dim != 1 and y_dim != 1:
+            return None
+        shape.append(y_dim if x_dim == 1 else x_dim)
+    return shape
+
+
+def elementwise_meta(x: Any, y: Any, dtype=None) -> MetaInfo | None:
+    """
+    The meta of the elementwise op of tensors x and y with the same dtype,
+    whose output has dtype if it's given.
+    """
+    if not (is_static_meta(x) and is_static_meta(y)) or x.dtype != y.dtype:
+        return None
+    shape = broadcast_shape(x.shape, y.shape)
+    if shape is None:
+        return None
+    return new_meta(shape, x.dtype if dtype is None else dtype, x, y)
+
+
+def binary_method_rule(divide: bool = False, compare: bool = False):
+    """
+    Create the rule of a magic method of tensors, see `_binary_creator_` in
+    `paddle.base.layers.math_op_patch`. The output of a tensor and a python
+    scalar has the shape of the tensor.
+
+    Args:
+        divide: Whether the integer tensors are cast to float32.
+        compare: Whether the output is bool.
+    """
+
+    def rule(x, y):
+        if not is_static_meta(x) or x.dtype == paddle.bool:
+            return None
+        if isinstance(y, MetaInfo):
+            dtype = x.dtype
+            if divide and dtype in INT_DTYPES:
+                dtype = paddle.float32
+            return elementwise_meta(
+                x, y, dtype=paddle.bool if compare else dtype
+            )
+        if type(y) not in (int, float):
+            return None
+        dtype = x.dtype
+        if dtype in INT_DTYPES and (isinstance(y, float) or divide):
+            dtype = paddle.float32
+        return new_meta(x.shape, paddle.bool if compare else dtype, x)
+
+    return rule
+
+
+for name, rule in {
+    "__add__": binary_method_rule(),
+    "__radd__": binary_method_rule(),
+    "__sub__": binary_method_rule(),
+    "__rsub__": binary_method_rule(),
+    "__mul__": binary_method_rule(),
+    "__rmul__": binary_method_rule(),
+    "__div__": binary_method_rule(divide=True),
+    "__truediv__": binary_method_rule(divide=True),
+    "__rdiv__": binary_method_rule(divide=True),
+    "__rtruediv__": binary_method_rule(divide=True),
+    "__pow__": binary_method_rule(),
+    "__rpow__": binary_method_rule(),
+    "__eq__": binary_method_rule(compare=True),
+    "__ne__": binary_method_rule(compare=True),
+    "__lt__": binary_method_rule(compare=True),
+    "__le__": binary_method_rule(compare=True),
+    "__gt__": binary_method_rule(compare=True),
+    "__ge__": binary_method_rule(compare=True),
+}.items():
+    register_rule(name)(rule)
+
+
+@register_rule(
+    paddle.add,
+    paddle.subtract,
+    paddle.multiply,
+    paddle.maximum,
+    paddle.minimum,
+)
+def elementwise_api(x, y, name=None):
+    if not isinstance(x, MetaInfo) or x.dtype == paddle.bool:
+        return None
+    return elementwise_meta(x, y)
+
+
+@register_rule(paddle.divide)
+def divide_api(x, y, name=None):
+    if not is_float_meta(x):
+        return None
+    return elementwise_meta(x, y)
+
+
+@register_rule(
+    paddle.nn.functional.relu,
+    paddle.nn.functional.relu6,
+    paddle.nn.functional.sigmoid,
+    paddle.nn.functional.silu,
+    paddle.nn.functional.hardswish,
+    paddle.nn.functional.hardsigmoid,
+    paddle.nn.functional.tanh,
+    paddle.exp,
+    paddle.log,
+    paddle.sqrt,
+    paddle.rsqrt,
+    paddle.abs,
+    paddle.sin,
+    paddle.cos,
+    paddle.tanh,
+    "__neg__",
+    "exp",
+    "log",
+    "sqrt",
+    "rsqrt",
+    "abs",
+    "sin",
+    "cos",
+    "tanh",
+)
+def activation(x, name=None):
+    if not is_float_meta(x):
+        return None
+    return new_meta(x.shape, x.dtype, x)
+
+
+@register_rule(paddle.nn.functional.gelu)
+def gelu(x, approximate=False, name=None):
+    return activation(x)
+
+
+@register_rule(paddle.nn.functional.leaky_relu)
+def leaky_relu(x, negative_slope=0.01, name=None):
+    return activation(x)
+
+
+@register_rule(paddle.nn.functional.elu)
+def elu(x, alpha=1.0, name=None):
+    return activation(x)
+
+
+@register_rule(paddle.nn.functional.softmax, paddle.nn.functional.log_softmax)
+def softmax(x, axis=-1, dtype=None, name=None):
+    if dtype is not None or not is_float_meta(x):
+        return None
+    # The axis of a 0-D tensor is -1 or 0.
+    if normalize_axis(axis, max(len(x.shape), 1)) is None:
+        return None
+    return activation(x)
+
+
+def reduce_meta(x: MetaInfo, axis: Any, keepdim: Any) -> MetaInfo | None:
+    """
+    The meta of reducing x in axis, which is an int, a list of ints, or None
+    to reduce all dimensions.
+    """
+    if not is_static_meta(x) or type(keepdim) is not bool:
+        return None
+    ndim = len(x.shape)
+    if axis is None:
+        axes = set(range(ndim))
+    else:
+        if type(axis) is int:
+            axis = [axis]
+        if not is_int_list(axis) or not axis or ndim == 0:
+            return None
+        axes = {normalize_axis(item, ndim) for item in axis}
+        if None in axes or len(axes) != len(axis):
+            return None
+    if keepdim:
+        shape = [1 if i in axes else size for i, size in enumerate(x.shape)]
+    else:
+        shape = [size for i, size in enumerate(x.shape) if i not in axes]
+    return new_meta(shape, x.dtype, x)
+
+
+@register_rule(paddle.sum, "sum")
+def reduce_sum(x, axis=None, dtype=None, keepdim=False, name=None):
+    # The sum of the integer tensors is int64.
+    if dtype is not None or not is_float_meta(x):
+        return None
+    return reduce_meta(x, axis, keepdim)
+
+
+@register_rule(paddle.mean, "mean")
+def reduce_mean(x, axis=None, keepdim=False, name=None):
+    if not is_float_meta(x):
+        return None
+    return reduce_meta(x, axis, keepdim)
+
+
+@register_rule(paddle.max, paddle.min, "max", "min")
+def reduce_max(x, axis=None, keepdim=False, name=None):
+    if not isinstance(x, MetaInfo) or x.dtype == paddle.bool:
+        return None
+    return reduce_meta(x, axis, keepdim)
+
+
+@register_rule(paddle.matmul, "matmul")
+def matmul(x, y, transpose_x=False, transpose_y=False, name=None):
+    if not (is_float_meta(x) and is_float_meta(y)) or x.dtype != y.dtype:
+        return None
+    if type(transpose_x) is not bool or type(transpose_y) is not bool:
+        return None
+    x_shape, y_shape = list(x.shape), list(y.shape)
+    if not x_shape or not y_shape:
+        return None
+    for shape, transpose in [(x_shape, transpose_x), (y_shape, transpose_y)]:
+        if transpose:
+            if len(shape) == 1:
+                return None
+            shape[-1], shape[-2] = shape[-2], shape[-1]
+    if len(x_shape) == 1 and len(y_shape) == 1:
+        shape = [] if x_shape == y_shape else None
+    elif len(x_shape) == 1:
+        shape = (
+            y_shape[:-2] + y_shape[-1:] if x_shape[0] == y_shape[-2] else None
+        )
+    elif len(y_shape) == 1:
+        shape = x_shape[:-1] if x_shape[-1] == y_shape[0] else None
+    else:
+        # The batch dimensions of different ranks are not broadcast as the
+        # elementwise ops do.
+        x_batch, y_batch = x_shape[:-2], y_shape[:-2]
+        if x_batch and y_batch and len(x_batch) != len(y_batch):
+            return None
+        batch_shape = broadcast_shape(x_batch, y_batch)
+        if x_shape[-1] != y_shape[-2] or batch_shape is None:
+            return None
+        shape = batch_shape + [x_shape[-2], y_shape[-1]]
+    if shape is None:
+        return None
+    return new_meta(shape, x.dtype, x, y)
+
+
+@register_rule("__matmul__")
+def matmul_method(x, y):
+    return matmul(x, y)
+
+
+@register_rule(paddle.reshape, "reshape")
+def reshape(x, shape, name=None):
+    if not is_static_meta(x) or not is_int_list(shape):
+        return None
+    shape = list(shape)
+    for i, size in enumerate(shape):
+        if size == 0:
+            if i >= len(x.shape):
+                return None
+            shape[i] = x.shape[i]
+        elif size < -1:
+            return None
+    numel = math.prod(x.shape)
+    if shape.count(-1) == 1:
+        known = math.prod(size for size in shape if size != -1)
+        if known == 0 or numel % known != 0:
+            return None
+        shape[shape.index(-1)] = numel // known
+    if shape.count(-1) > 0 or math.prod(shape) != numel:
+        return None
+    return new_meta(shape, x.dtype, x)
+
+
+@register_rule(paddle.transpose, "transpose")
+def transpose(x, perm, name=None):
+    if not is_static_meta(x) or not is_int_list(perm):
+        return None
+    if sorted(perm) != list(range(len(x.shape))):
+        return None
+    return new_meta([x.shape[i] for i in perm], x.dtype, x)
+
+
+@register_rule(paddle.concat)
+def concat(x, axis=0, name=None):
+    if not isinstance(x, (list, tuple)) or not x:
+        return None
+    first = x[0]
+    if not all(
+        is_static_meta(item)
+        and item.dtype == first.dtype
+        and len(item.shape) == len(first.shape)
+        for item in x
+    ):
+        return None
+    axis = normalize_axis(axis, len(first.shape))
+    if axis is None:
+        return None
+    shape = list(first.shape)
+    shape[axis] = 0
+    for item in x:
+        if any(
+            item.shape[i] != size
+            for i, size in enumerate(first.shape)
+            if i != axis
+        ):
+            return None
+        shape[axis] += item.shape[axis]
+    return new_meta(shape, first.dtype, *x)
+
+
+@register_rule(paddle.split, "split")
+def split(x, num_or_sections, axis=0, name=None):
+    if not is_static_meta(x):
+        return None
+    axis = normalize_axis(axis, len(x.shape))
+    if axis is None:
+        return None
+    size = x.shape[axis]
+    if type(num_or_sections) is int:
+        if num_or_sections <= 0 or size % num_or_sections != 0:
+            return None
+        sections = [size // num_or_sections] * num_or_sections
+    elif is_int_list(num_or_sections) and num_or_sections:
+        sections = list(num_or_sections)
+        if any(section < -1 for section in sections):
+            return None
+        if sections.count(-1) == 1:
+            known = sum(section for section in sections if section != -1)
+            if known >= size:
+                return None
+            sections[sections.index(-1)] = size - known
+        if sections.count(-1) > 0 or sum(sections) != size:
+            return None
+    else:
+        return None
+    return [
+        new_meta(x.shape[:axis] + (section,) + x.shape[axis + 1 :], x.dtype, x)
+        for section in sections
+    ]
+
+
+@register_rule(paddle.cast, "cast", "astype")
+def cast(x, dtype):
+    if not is_static_meta(x):
+        return None
+    if not isinstance(dtype, paddle.dtype):
+        try:
+            dtype = convert_np_dtype_to_dtype_(dtype)
+        except Exception:
+            return None
+    return new_meta(x.shape, dtype, x)
+
+
+def layer_meta(shape, x: MetaInfo, layer: paddle.nn.Layer) -> MetaInfo | None:
+    """
+    The meta of the output of layer with input x, whose parameters must have
+    the dtype of x.
+    """
+    params = layer.parameters(include_sublayers=False)
+    if any(param.dtype != x.dtype for param in params):
+        return None
+    return new_meta(shape, x.dtype, x, *params)
+
+
+@register_layer_rule(
+    paddle.nn.ReLU,
+    paddle.nn.ReLU6,
+    paddle.nn.Sigmoid,
+    paddle.nn.Silu,
+    paddle.nn.Hardswish,
+    paddle.nn.Hardsigmoid,
+    paddle.nn.Tanh,
+    paddle.nn.GELU,
+    paddle.nn.LeakyReLU,
+    paddle.nn.ELU,
+    paddle.nn.Dropout,
+)
+def activation_layer(layer, x):
+    return activation(x)
+
+
+@register_layer_rule(paddle.nn.Softmax)
+def softmax_layer(layer, x):
+    return softmax(x, layer._axis, layer._dtype)
+
+
+@register_layer_rule(paddle.nn.Identity)
+def identity_layer(layer, x):
+    if not is_static_meta(x):
+        return None
+    return new_meta(x.shape, x.dtype, x)
+
+
+@register_layer_rule(
+    paddle.nn.BatchNorm1D,
+    paddle.nn.BatchNorm2D,
+    paddle.nn.BatchNorm3D,
+)
+def batch_norm_layer(layer, x):
+    if not is_float_meta(x):
+        return None
+    try:
+        layer._check_input_dim(x)
+        layer._check_data_format(layer._data_format)
+    except ValueError:
+        return None
+    channel_dim = -1 if layer._data_format in ("NLC", "NHWC", "NDHWC") else 1
+    if x.shape[channel_dim] != layer._num_features:
+        return None
+    return layer_meta(x.shape, x, layer)
+
+
+@register_layer_rule(paddle.nn.LayerNorm)
+def layer_norm_layer(layer, x):
+    if not is_float_meta(x):
+        return None
+    normalized_shape = tuple(layer._normalized_shape)
+    # The normalized dimensions don't include the first one.
+    begin_norm_axis = len(x.shape) - len(normalized_shape)
+    if begin_norm_axis <= 0 or x.shape[begin_norm_axis:] != normalized_shape:
+        return None
+    return layer_meta(x.shape, x, layer)
+
+
+@register_layer_rule(paddle.nn.Linear)
+def linear_layer(layer, x):
+    if not is_float_meta(x) or not x.shape:
+        return None
+    in_features, out_features = layer.weight.shape
+    if x.shape[-1] != in_features:
+        return None
+    return layer_meta(x.shape[:-1] + (out_features,), x, layer)
+
+
+@register_layer_rule(paddle.nn.Embedding)
+def embedding_layer(layer, x):
+    if not is_static_meta(x) or x.dtype not in (paddle.int32, paddle.int64):
+        return None
+    return new_meta(
+        x.shape + (layer._embedding_dim,), layer.weight.dtype, x, layer.weight
+    )
+
+
+@register_layer_rule(paddle.nn.Flatten)
+def flatten_layer(layer, x):
+    if not is_static_meta(x):
+        return None
+    ndim = len(x.shape)
+    # The axes of a 0-D tensor are -1 or 0, which flattens it to [1].
+    start = normalize_axis(layer.start_axis, max(ndim, 1))
+    stop = normalize_axis(layer.stop_axis, max(ndim, 1))
+    if start is None or stop is None or start > stop:
+        return None
+    if ndim == 0:
+        return new_meta([1], x.dtype, x)
+    shape = (
+        x.shape[:start]
+        + (math.prod(x.shape[start : stop + 1]),)
+        + x.shape[stop + 1 :]
+    )
+    return new_meta(shape, x.dtype, x)
+
+
+def spatial_dims(x: MetaInfo, data_format: str) -> list[int] | None:
+    """
+    The indices of the spatial dimensions of the 4-D tensor x.
+    """
+    if len(x.shape) != 4 or data_format not in ("NCHW", "NHWC"):
+        return None
+    return [1, 2] if data_format == "NHWC" else [2, 3]
+
+
+def window_size(
+    size: int,
+    kernel: int,
+    stride: int,
+    padding: tuple[int, int],
+    dilation: int = 1,
+    ceil_mode: bool = False,
+) -> int | None:
+    """
+    The size of a spatial dimension of the output of a convolution or a
+    pooling, which slides the window of kernel with stride and dilation over
+    the dimension of size padded by padding (before, after).
+    """
+    span = size + sum(padding) - dilation * (kernel - 1) - 1
+    if ceil_mode:
+        span += stride - 1
+    if span < 0:
+        return None
+    return span // stride + 1
+
+
+def explicit_padding(padding: Any, ndim: int) -> list[tuple[int, int]] | None:
+    """
+    Returns the (before, after) paddings of the spatial dimensions, if padding
+    is an int, a list of ndim ints, or a list of 2 * ndim ints.
+    """
+    if type(padding) is int:
+        padding = [padding] * ndim
+    if not is_int_list(padding) or any(item < 0 for item in padding):
+        return None
+    if len(padding) == ndim:
+        return [(item, item) for item in padding]
+    if len(padding) == 2 * ndim:
+        return [tuple(padding[i : i + 2]) for i in range(0, 2 * ndim, 2)]
+    return None
+
+
+@register_layer_rule(paddle.nn.Conv2D)
+def conv2d_layer(layer, x):
+    if not is_float_meta(x) or layer._padding_mode != "zeros":
+        return None
+    dims = spatial_dims(x, layer._data_format)
+    if dims is None or x.shape[layer._channel_dim] != layer._in_channels:
+        return None
+    shape = list(x.shape)
+    shape[layer._channel_dim] = layer._out_channels
+    if layer._padding_algorithm == "SAME":
+        for dim, stride in zip(dims, layer._stride):
+            shape[dim] = (x.shape[dim] + stride - 1) // stride
+        return layer_meta(shape, x, layer)
+    paddings = explicit_padding(layer._updated_padding, 2)
+    if paddings is None:
+        return None
+    for dim, kernel, stride, padding, dilation in zip(
+        dims, layer._kernel_size, layer._stride, paddings, layer._dilation
+    ):
+        shape[dim] = window_size(
+            x.shape[dim], kernel, stride, padding, dilation
+        )
+        if shape[dim] is None:
+            return None
+    return layer_meta(shape, x, layer)
+
+
+def pool2d_meta(
+    x: Any,
+    kernel_size: Any,
+    stride: Any,
+    padding: Any,
+    ceil_mode: bool,
+    data_format: str,
+) -> MetaInfo | None:
+    if not is_float_meta(x) or type(ceil_mode) is not bool:
+        return None
+    dims = spatial_dims(x, data_format)
+    if dims is None:
+        return None
+    kernel_size = [kernel_size] * 2 if type(kernel_size) is int else kernel_size
+    stride = kernel_size if stride is None else stride
+    stride = [stride] * 2 if type(stride) is int else stride
+    paddings = explicit_padding(padding, 2)
+    if (
+        paddings is None
+        or not is_int_list(kernel_size)
+        or not is_int_list(stride)
+        or len(kernel_size) != 2
+        or len(stride) != 2
+    ):
+        return None
+    shape = list(x.shape)
+    for dim, kernel, stride_, padding_ in zip(
+        dims, kernel_size, stride, paddings
+    ):
+        shape[dim] = window_size(
+            x.shape[dim], kernel, stride_, padding_, ceil_mode=ceil_mode
+        )
+        if shape[dim] is None:
+            return None
+    return new_meta(shape, x.dtype, x)
+
+
+@register_layer_rule(paddle.nn.MaxPool2D)
+def max_pool2d_layer(layer, x):
+    if layer.return_mask:
+        return None
+    return pool2d_meta(
+        x,
+        layer.ksize,
+        layer.stride,
+        layer.padding,
+        layer.ceil_mode,
+        layer.data_format,
+    )
+
+
+@register_layer_rule(paddle.nn.AvgPool2D)
+def avg_pool2d_layer(layer, x):
+    return pool2d_meta(
+        x,
+        layer.ksize,
+        layer.stride,
+        layer.padding,
+        layer.ceil_mode,
+        layer.data_format,
+    )
+
+
+@register_layer_rule(paddle.nn.AdaptiveAvgPool2D)
+def adaptive_avg_pool2d_layer(layer, x):
+    if not is_float_meta(x):
+        return None
+    dims = spatial_dims(x, layer._data_format)
+    if dims is None:
+        return None
+    output_size = layer._output_size
+    if type(output_size) is int:
+        output_size = [output_size] * 2
+    if not isinstance(output_size, (list, tuple)) or len(output_size) != 2:
+        return None
+    shape = list(x.shape)
+    for dim, size in zip(dims, output_size):
+        if size is not None:
+            if type(size) is not int or size <= 0:
+                return None
+            shape[dim] = size
+    return new_meta(shape, x.dtype, x)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import marshal
+import os
+import sys
+import types
+from typing import Any
+
+import paddle
+
+from ...utils import Singleton, log, translation_cache_dir
+
+
+def code_identity(code: types.CodeType) -> dict[str, str] | None:
+    """
+    The identity of a code object, a cached record is only valid for the code
+    object with the same identity. Returns None if the code can't be marshaled.
+    """
+    try:
+        bytecode = marshal.dumps(code)
+    except ValueError:
+        return None
+    return {
+        "filename": code.co_filename,
+        "name": code.co_name,
+        "qualname": getattr(code, "co_qualname", code.co_name),
+        "bytecode_hash": hashlib.sha256(bytecode).hexdigest(),
+        "python_version": sys.version,
+        "paddle_version": paddle.__version__,
+    }
+
+
+@Singleton
+class TranslationDiskCache:
+    """
+    Persist the translation decisions of code objects on disk, so a restarted
+    process doesn't have to rediscover them. It's enabled by setting the
+    environment variable `SOT_TRANSLATION_CACHE_DIR` to a directory.
+
+    Only the results that are independent of the current process are stored:
+    the bytecode of the codes which fall back to dygraph unconditionally, the
+    reason of the codes pinned to dygraph by recompile storm with the number
+    of misses that triggered it, and the dynamic dimensions of input tensors.
+    A record is refused if the identity of its code object, see
+    `code_identity`, doesn't match.
+
+    NOTE: The scope is reduced on purpose, the translated entries (their
+    code, guards and SIRs) are not stored, so the codes which are translated
+    are still simulated again after a restart. They depend on the process:
+
+    - The guards embed the ids of objects in their sources, e.g. the type
+      check `id(type(x)) == 140...` of constants and the identity check of
+      layers and functions, and capture objects by weakref.
+    - The code loads the compiled functions from the globals of the frame by
+      the names of their SIRs, which are numbered per process.
+    - The layers called by the SIRs are only known to this process, see
+      `LayerRegistry` of `sir_serialization`.
+    """
+
+    FORMAT_VERSION = 2
+
+    @property
+    def cache_dir(self) -> str:
+        return translation_cache_dir()
+
+    def record_path(self, code: types.CodeType) -> str:
+        # NOTE: The resume functions share the qualname of their origin code.
+        name = f"{code.co_filename}:{getattr(code, 'co_qualname', code.co_name)}:{code.co_name}:{code.co_firstlineno}"
+        return os.path.join(
+            self.cache_dir,
+            hashlib.sha256(name.encode()).hexdigest() + ".json",
+        )
+
+    def load(self, code: types.CodeType) -> dict[str, Any] | None:
+        """
+        Load the record of code, returns None if there is no valid record.
+        """
+        if not self.cache_dir:
+            return None
+        path = self.record_path(code)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                record = json.load(f)
+        except (OSError, ValueError) as e:
+            log(2, f"[DiskCache]: Failed to load {path}: {e}\n")
+            return None
+        if record.get("format_version") != self.FORMAT_VERSION or record.get(
+            "identity"
+        ) != code_identity(code):
+            log(2, f"[DiskCache]: Refuse stale record of {code}\n")
+            return None
+        return record
+
+    def update(self, code: types.CodeType, **fields):
+        """
+        Update the fields of the record of code, and write it to disk.
+        """
+        if not self.cache_dir:
+            return
+        identity = code_identity(code)
+        if identity is None:
+            return
+        record = self.load(code) or {
+            "format_version": self.FORMAT_VERSION,
+            "identity": identity,
+        }
+        record.update(fields)
+        path = self.record_path(code)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log(2, f"[DiskCache]: Failed to save {path}: {e}\n")
+
+    def save_fallback_code(self, code: types.CodeType, fallback_code):
+        self.update(
+            code,
+            fallback_code=base64.b64encode(
+                marshal.dumps(fallback_code)
+            ).decode(),
+        )
+
+    def load_fallback_code(
+        self, record: dict[str, Any]
+    ) -> types.CodeType | None:
+        if not record.get("fallback_code"):
+            return None
+        return marshal.loads(base64.b64decode(record["fallback_code"]))
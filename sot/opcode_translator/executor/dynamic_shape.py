@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import types
+from collections import Counter
+from typing import Tuple
+
+import paddle
+
+from ...utils import Singleton, log
+
+TensorSignature = Tuple[Tuple[int, ...], paddle.dtype]
+
+
+def tensor_signatures(frame: types.FrameType) -> dict[str, TensorSignature]:
+    """
+    Collect the shape and dtype of the tensors in the locals of frame.
+    """
+    return {
+        name: (tuple(value.shape), value.dtype)
+        for name, value in frame.f_locals.items()
+        if isinstance(value, paddle.Tensor)
+    }
+
+
+@Singleton
+class DynamicShapeManager:
+    """
+    Decide which dimensions of the input tensors should be treated as dynamic.
+
+    When a code object misses the cache, the shapes of its input tensors are
+    compared with the ones of its last translation. If the tensors only differ
+    in some dimensions, each of the dimensions is counted, and once a dimension
+    is counted `threshold` times, it becomes dynamic (-1) in the next
+    translation, so one shape-polymorphic graph serves all its sizes.
+
+    Attributes:
+        dynamic_dims: Maps code objects to the dynamic dimensions of their local tensors.
+    """
+
+    def __init__(self):
+        self.dynamic_dims: dict[types.CodeType, dict[str, tuple[int, ...]]] = {}
+        self._signatures: dict[types.CodeType, dict[str, TensorSignature]] = {}
+        self._miss_counts: dict[types.CodeType, Counter[tuple[str, int]]] = {}
+
+    def clear(self):
+        self.dynamic_dims.clear()
+        self._signatures.clear()
+        self._miss_counts.clear()
+
+    def get_dynamic_dims(self, code: types.CodeType, name: str):
+        """
+        Returns the dynamic dimensions of the local tensor name in code.
+        """
+        return self.dynamic_dims.get(code, {}).get(name, ())
+
+    def record_translation(self, frame: types.FrameType):
+        """
+        Record the shapes of the input tensors used to translate frame.
+        """
+        self._signatures[frame.f_code] = tensor_signatures(frame)
+
+    def record_miss(self, frame: types.FrameType, threshold: int) -> bool:
+        """
+        Record a cache miss of frame.
+
+        Args:
+            frame: The frame which missed the cache.
+            threshold: The number of misses before a dimension becomes dynamic.
+
+        Returns:
+            Whether some new dimensions became dynamic.
+        """
+        code = frame.f_code
+        last_signatures = self._signatures.get(code)
+        if last_signatures is None:
+            return False
+        signatures = tensor_signatures(frame)
+        if signatures.keys() != last_signatures.keys():
+            return False
+        dynamic_dims = self.dynamic_dims.get(code, {})
+        changed_dims = []
+        for name, (shape, dtype) in signatures.items():
+            last_shape, last_dtype = last_signatures[name]
+            if dtype != last_dtype or len(shape) != len(last_shape):
+                return False
+            changed_dims.extend(
+                (name, dim)
+                for dim, (size, last_size) in enumerate(zip(shape, last_shape))
+                if size != last_size and dim not in dynamic_dims.get(name, ())
+            )
+        miss_counts = self._miss_counts.setdefault(code, Counter())
+        if not changed_dims:
+            # The miss is caused by something other than shapes.
+            miss_counts.clear()
+            return False
+        miss_counts.update(changed_dims)
+        new_dims = [
+            key for key in changed_dims if miss_counts[key] >= threshold
+        ]
+        if not new_dims:
+            return False
+        dynamic_dims = self.dynamic_dims.setdefault(code, {})
+        for name, dim in new_dims:
+            dynamic_dims[name] = tuple(
+                sorted({*dynamic_dims.get(name, ()), dim})
+            )
+            del miss_counts[(name, dim)]
+        log(
+            2,
+            f"[DynamicShape]: {code.co_name} generalizes dims {new_dims}, dynamic dims: {dynamic_dims}\n",
+        )
+        return True
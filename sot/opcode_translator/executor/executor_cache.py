@@ -1,11 +1,30 @@
 from __future__ import annotations
 
+import json
+import sys
+import threading
+import time
 import traceback
 import types
-from typing import List, Tuple
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, List, Tuple
 
+import paddle
+
+from ...infer_meta import (
+    InferMetaCache,
+    LayerInferMetaCache,
+    LayerVersionManager,
+    RuleInferMeta,
+)
 from ...profiler import EventGuard, event_register
 from ...psdb import NO_FALLBACK_CODES
+from ...symbolic.compile_cache import CompileSIRCache
+from ...symbolic.compile_service import SIRCompileService
+from ...symbolic.sir_passes import SIRPassManager
+from ...symbolic.statement_ir import StatementIRFactory
+from ...symbolic.subgraph_stitching import SubgraphStitcher
 from ...utils import (
     BreakGraphError,
     FallbackError,
@@ -16,7 +35,10 @@ from ...utils import (
     log_do,
 )
 from ..custom_code import CustomCode
-from .guard import Guard
+from .disk_cache import TranslationDiskCache
+from .dynamic_shape import DynamicShapeManager
+from .guard import Guard, GuardCodeCache
+from .guard_tree import GuardTree, find_failed_sub_guard
 from .opcode_executor import OpcodeExecutor, OpcodeExecutorBase
 from .pycode_generator import PyCodeGen
 
@@ -28,42 +50,323 @@ dummy_guard.expr = "lambda frame: True"
 dummy_guard.lambda_expr = "lambda frame: True"
 
 
+def compiled_fn_names(code: types.CodeType | None) -> list[str]:
+    """
+    The names of the globals which hold the compiled functions of SIRs loaded
+    by the translated code, see `FunctionGraph.start_compile`.
+    """
+    if code is None:
+        return []
+    return [name for name in code.co_names if name.startswith("__compiled_fn_")]
+
+
+def running_codes() -> set[types.CodeType]:
+    """
+    The code objects of all the frames on the stacks of all threads.
+    """
+    codes = set()
+    for frame in sys._current_frames().values():
+        while frame is not None:
+            codes.add(frame.f_code)
+            frame = frame.f_back
+    return codes
+
+
+class EntryUsage:
+    """
+    The usage of a cache entry, used to choose the entry to evict.
+    """
+
+    def __init__(self, last_used: int):
+        self.last_used = last_used
+        self.hit_count = 0
+
+
+# The values which can't be changed by the running frame, the tensors are
+# only inspected by their metas during translation.
+IMMUTABLE_LOCAL_TYPES = (
+    paddle.Tensor,
+    bool,
+    int,
+    float,
+    complex,
+    str,
+    bytes,
+    type(None),
+    type(...),
+    paddle.dtype,
+    type,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.ModuleType,
+)
+
+
+def is_immutable_local(value: Any) -> bool:
+    if isinstance(value, tuple):
+        return all(is_immutable_local(item) for item in value)
+    return isinstance(value, IMMUTABLE_LOCAL_TYPES)
+
+
+class FrameSnapshot:
+    """
+    A copy of the fields of a frame needed by translation, it's used to
+    translate a frame in background while the frame itself is running, and
+    its locals are changing.
+
+    Only the dict of locals is copied, so the frames whose locals hold mutable
+    objects, e.g. lists, dicts or layers, which are shared with the running
+    frame, can't be snapshotted, see `can_snapshot`.
+    """
+
+    @staticmethod
+    def can_snapshot(frame: types.FrameType) -> bool:
+        return all(
+            is_immutable_local(value) for value in frame.f_locals.values()
+        )
+
+    def __init__(self, frame: types.FrameType):
+        self.f_code = frame.f_code
+        self.f_locals = dict(frame.f_locals)
+        self.f_globals = frame.f_globals
+        self.f_builtins = frame.f_builtins
+
+
+class CodeCacheStats:
+    """
+    The statistics of the cache of a code object, times are in seconds.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.translations = 0
+        self.evictions = 0
+        self.translate_time = 0.0
+        self.guard_time = 0.0
+        self.fallback_reasons: Counter[str] = Counter()
+
+    def to_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "translations": self.translations,
+            "evictions": self.evictions,
+            "translate_time": self.translate_time,
+            "guard_time": self.guard_time,
+            "fallback_reasons": dict(self.fallback_reasons),
+        }
+
+
+def code_location(code: types.CodeType) -> str:
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
 @Singleton
 class OpcodeExecutorCache:
     """
     A singleton class that implements a cache for translated instructions.
     This cache is used to store previously translated instructions along with their corresponding guard functions.
 
+    When a code object has MAX_CACHE_SIZE entries, or all code objects have MAX_TOTAL_CACHE_SIZE
+    entries in total, an entry is evicted according to EVICTION_POLICY ("lru" or "lfu").
+    A code object which misses the cache RECOMPILE_STORM_THRESHOLD times in a row is recompiling
+    on every call, it will be pinned to run in dygraph, and the guards which kept failing are
+    reported as the reason.
+
+    If DYNAMIC_SHAPE_THRESHOLD is positive, a dimension of the input tensors which changes in
+    DYNAMIC_SHAPE_THRESHOLD misses becomes dynamic, see `DynamicShapeManager`.
+
+    If ASYNC_TRANSLATION is set, a frame which needs translation runs in dygraph immediately,
+    and it's translated in a background thread. The result is installed by the next call of
+    the code. At most MAX_BACKGROUND_TRANSLATIONS translations are pending at the same time,
+    the frames missing the cache beyond that just run in dygraph. The frames whose locals
+    are mutable, see `FrameSnapshot`, are translated synchronously. The static programs
+    built by both threads are serialized by `static_program_lock`.
+
+    If SOT_TRANSLATION_CACHE_DIR is set, the decisions not to translate a code and the dynamic
+    dimensions are restored from disk, the translated entries are not, see `TranslationDiskCache`.
+
+    The compiled functions loaded by a translated code are stored in the globals of the frame.
+    When its entry is evicted, they are deleted (once the code is not running), so the
+    FallbackWrappers and the SIRs which are not used by other entries can be released.
+
     Attributes:
         cache (dict): A dictionary that maps code objects to tuples of a cache getter function and a list of guarded functions.
+        guard_trees (dict): A dictionary that maps code objects to the GuardTree merged from the guards of their guarded functions.
         translate_count (int): The count of how many instructions have been translated. It is used to test whether the cache hits.
+        pinned_codes (dict): A dictionary that maps the code objects pinned to dygraph to the reason.
+        code_stats (dict): A dictionary that maps code objects to their CodeCacheStats, see `get_stats`.
     """
 
     MAX_CACHE_SIZE = 20
+    MAX_TOTAL_CACHE_SIZE = 2000
+    EVICTION_POLICY = "lru"
+    RECOMPILE_STORM_THRESHOLD = 20
+    DYNAMIC_SHAPE_THRESHOLD = 0
+    ASYNC_TRANSLATION = False
+    MAX_BACKGROUND_TRANSLATIONS = 4
     cache: dict[types.CodeType, GuardedFunctions]
+    guard_trees: dict[types.CodeType, GuardTree[GuardedFunction]]
     translate_count: int
+    pinned_codes: dict[types.CodeType, str]
+    code_stats: dict[types.CodeType, CodeCacheStats]
 
     def __init__(self):
         self.cache = {}
+        self.guard_trees = {}
         self.translate_count = 0
+        self.pinned_codes = {}
+        self.code_stats = {}
+        self._usages: dict[int, EntryUsage] = {}
+        self._miss_reasons: dict[types.CodeType, list[str]] = {}
+        self._clock = 0
+        self._pending_translations: dict[
+            types.CodeType, Future[GuardedFunction]
+        ] = {}
+        self._background_executor: ThreadPoolExecutor | None = None
+        # The translator keeps global states (e.g. Dispatcher.graph), so the
+        # translations are serialized.
+        self._translate_lock = threading.RLock()
+        # The globals of the entries, which hold their compiled functions.
+        self._entry_globals: dict[int, dict[str, Any]] = {}
+        self._unreleased_globals: list[
+            tuple[types.CodeType, dict[str, Any]]
+        ] = []
 
     def clear(self):
         """
         Clears the cache and resets the translate count.
         """
+        for guarded_fns in self.cache.values():
+            for guarded_fn in guarded_fns:
+                self.release(guarded_fn)
         self.cache.clear()
+        self.guard_trees.clear()
         self.translate_count = 0
+        self.pinned_codes.clear()
+        self.code_stats.clear()
+        self._usages.clear()
+        self._miss_reasons.clear()
+        self._clock = 0
+        for future in self._pending_translations.values():
+            future.cancel()
+        self.wait_background_translations()
+        self._pending_translations.clear()
+        DynamicShapeManager().clear()
+        SubgraphStitcher().clear()
+        SIRCompileService().shutdown()
 
     def __call__(self, frame: types.FrameType, **kwargs) -> CustomCode:
         code: types.CodeType = frame.f_code
+        if self._pending_translations:
+            self.install_background_translations()
         if code not in self.cache:
             log(2, f"[Cache]: Firstly call {code}\n")
-            new_custom_code, guard_fn = self.translate(frame, **kwargs)
-            self.cache[code] = [(new_custom_code, guard_fn)]
-            return new_custom_code
+            self.cache[code] = []
+            self.guard_trees[code] = GuardTree()
+            self.code_stats[code] = CodeCacheStats()
+            restored_custom_code = self.restore_from_disk(code)
+            if restored_custom_code is not None:
+                return restored_custom_code
+            return self.translate_and_install(frame, **kwargs)
         guarded_fns = self.cache[code]
         return self.lookup(frame, guarded_fns, **kwargs)
 
+    def translate_and_install(
+        self, frame: types.FrameType, **kwargs
+    ) -> CustomCode:
+        """
+        Translates the frame and adds the result to the cache, or schedules the
+        translation in background if ASYNC_TRANSLATION is set.
+
+        Returns:
+            CustomCode: The custom code to run the frame.
+        """
+        if self.ASYNC_TRANSLATION:
+            if FrameSnapshot.can_snapshot(frame):
+                self.schedule_translation(frame, **kwargs)
+                return CustomCode(None, False)
+            log(
+                2,
+                f"[Cache]: Translate {frame.f_code} synchronously, its locals are mutable\n",
+            )
+        guarded_fn = self.translate(frame, **kwargs)
+        self.install(frame.f_code, guarded_fn)
+        return guarded_fn[0]
+
+    def install(self, code: types.CodeType, guarded_fn: GuardedFunction):
+        new_custom_code, guard_fn = guarded_fn
+        self.add_guarded_fn(code, guarded_fn)
+        if (
+            guard_fn is dummy_guard
+            and new_custom_code.code is not None
+            and not new_custom_code.disable_eval_frame
+        ):
+            # The code falls back to dygraph whatever the inputs are.
+            TranslationDiskCache().save_fallback_code(
+                code, new_custom_code.code
+            )
+
+    def schedule_translation(self, frame: types.FrameType, **kwargs):
+        """
+        Translates a snapshot of the frame in a background thread, the result
+        is installed by `install_background_translations`.
+        """
+        code = frame.f_code
+        if (
+            code in self._pending_translations
+            or len(self._pending_translations)
+            >= self.MAX_BACKGROUND_TRANSLATIONS
+        ):
+            return
+        if self._background_executor is None:
+            self._background_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="sot_translation"
+            )
+        log(2, f"[Cache]: Translate {code} in background\n")
+        self._pending_translations[code] = self._background_executor.submit(
+            self.translate, FrameSnapshot(frame), **kwargs
+        )
+
+    def install_background_translations(self):
+        """
+        Installs the results of the finished background translations.
+        """
+        for code, future in list(self._pending_translations.items()):
+            if not future.done():
+                continue
+            del self._pending_translations[code]
+            if future.cancelled():
+                continue
+            try:
+                guarded_fn = future.result()
+            except Exception as e:
+                log(
+                    1,
+                    f"[Cache]: Background translation of {code} failed, fallback to dygraph: {e}\n",
+                )
+                self.record_fallback(code, f"{type(e).__name__}: {e}")
+                guarded_fn = (CustomCode(None, False), dummy_guard)
+            if code not in self.cache:
+                # The cache is cleared during the translation.
+                self.release(guarded_fn)
+                continue
+            self.install(code, guarded_fn)
+
+    def wait_background_translations(self):
+        """
+        Blocks until all the pending background translations finish, and
+        installs their results.
+        """
+        for future in list(self._pending_translations.values()):
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        self.install_background_translations()
+
     @event_register("lookup")
     def lookup(
         self, frame: types.FrameType, guarded_fns: GuardedFunctions, **kwargs
@@ -78,42 +381,216 @@ class OpcodeExecutorCache:
         Returns:
             CustomCode | None: The custom code object if a matching guard function is found, otherwise None.
         """
+        code: types.CodeType = frame.f_code
+        stats = self.code_stats[code]
+        if code in self.pinned_codes:
+            stats.fallback_reasons["recompile storm"] += 1
+            return CustomCode(None, False)
+
+        guard_tree = self.guard_trees[code]
+        with EventGuard("try guard"):
+            start_time = time.perf_counter()
+            guarded_fn = guard_tree.lookup(frame)
+            stats.guard_time += time.perf_counter() - start_time
+        if guarded_fn is not None:
+            stats.hits += 1
+            custom_code, guard_fn = guarded_fn
+            log(
+                2,
+                f"[Cache]: Cache hit, Guard is \n{getattr(guard_fn, 'expr', 'None')}\n",
+            )
+            self._clock += 1
+            usage = self._usages[id(guarded_fn)]
+            usage.last_used = self._clock
+            usage.hit_count += 1
+            self._miss_reasons.pop(code, None)
+            return custom_code
 
-        if len(guarded_fns) >= self.MAX_CACHE_SIZE:
-            log(2, "[Cache]: Exceed max cache size, skip it\n")
+        if code in self._pending_translations:
+            # The frame may be covered by the pending translation.
             return CustomCode(None, False)
 
-        for custom_code, guard_fn in guarded_fns:
+        for _, guard_fn in guarded_fns:
             try:
-                with EventGuard("try guard"):
-                    guard_result = guard_fn(frame)
-                if guard_result:
-                    log(
-                        2,
-                        f"[Cache]: Cache hit, Guard is \n{getattr(guard_fn, 'expr', 'None')}\n",
-                    )
-                    return custom_code
-                else:
-                    log_do(
-                        4,
-                        self.analyse_guard_global_object(guard_fn),
-                    )
-                    log(
-                        2,
-                        f"[Cache]: Cache miss, Guard is \n{getattr(guard_fn, 'expr', 'None')}\n",
-                    )
-                    log_do(
-                        2,
-                        self.analyse_guard_error(guard_fn, frame),
-                    )
+                log_do(
+                    4,
+                    self.analyse_guard_global_object(guard_fn),
+                )
+                log(
+                    2,
+                    f"[Cache]: Cache miss, Guard is \n{getattr(guard_fn, 'expr', 'None')}\n",
+                )
+                log_do(
+                    2,
+                    self.analyse_guard_error(guard_fn, frame),
+                )
             except Exception as e:
                 log(2, f"[Cache]: Guard function error: {e}\n")
-                continue
 
         log(2, "[Cache]: all guards missed\n")
-        new_custom_code, guard_fn = self.translate(frame, **kwargs)
-        guarded_fns.append((new_custom_code, guard_fn))
-        return new_custom_code
+        stats.misses += 1
+        if (
+            self.DYNAMIC_SHAPE_THRESHOLD > 0
+            and DynamicShapeManager().record_miss(
+                frame, self.DYNAMIC_SHAPE_THRESHOLD
+            )
+        ):
+            # The shapes are generalized, the next translation should hit.
+            self._miss_reasons.pop(code, None)
+            TranslationDiskCache().update(
+                code,
+                dynamic_dims=DynamicShapeManager().dynamic_dims[code],
+            )
+        miss_reasons = self._miss_reasons.setdefault(code, [])
+        miss_reasons.append(self.analyse_miss_reason(guarded_fns, frame))
+        if len(miss_reasons) >= self.RECOMPILE_STORM_THRESHOLD:
+            self.pin_code(code, miss_reasons)
+            return CustomCode(None, False)
+
+        return self.translate_and_install(frame, **kwargs)
+
+    def add_guarded_fn(self, code: types.CodeType, guarded_fn: GuardedFunction):
+        """
+        Adds a guarded function to the cache of code, and evicts entries if the cache is full.
+
+        Args:
+            code (types.CodeType): The code object which is translated.
+            guarded_fn (GuardedFunction): The translated code and its guard function.
+        """
+        if len(self.cache[code]) >= self.MAX_CACHE_SIZE:
+            self.evict(code)
+        self._clock += 1
+        self._usages[id(guarded_fn)] = EntryUsage(self._clock)
+        self.cache[code].append(guarded_fn)
+        self.guard_trees[code].add(guarded_fn[1], guarded_fn)
+        if self.total_size() > self.MAX_TOTAL_CACHE_SIZE:
+            self.evict()
+
+    def total_size(self) -> int:
+        return sum(len(guarded_fns) for guarded_fns in self.cache.values())
+
+    def evict(self, code: types.CodeType | None = None):
+        """
+        Evicts an entry according to EVICTION_POLICY.
+
+        Args:
+            code (types.CodeType | None): Only evicts the entries of this code object if it is not None.
+        """
+        if self.EVICTION_POLICY == "lru":
+            priority = lambda usage: usage.last_used
+        elif self.EVICTION_POLICY == "lfu":
+            priority = lambda usage: (usage.hit_count, usage.last_used)
+        else:
+            raise InnerError(
+                f"Unknown eviction policy: {self.EVICTION_POLICY}, expect 'lru' or 'lfu'."
+            )
+        codes = [code] if code is not None else list(self.cache.keys())
+        candidates = [
+            (priority(self._usages[id(guarded_fn)]), victim_code, guarded_fn)
+            for victim_code in codes
+            for guarded_fn in self.cache[victim_code]
+        ]
+        if not candidates:
+            return
+        _, victim_code, victim = min(candidates, key=lambda item: item[0])
+        log(
+            2,
+            f"[Cache]: Evict an entry of {victim_code} by {self.EVICTION_POLICY}\n",
+        )
+        self.code_stats[victim_code].evictions += 1
+        guarded_fns = self.cache[victim_code]
+        del guarded_fns[
+            [id(guarded_fn) for guarded_fn in guarded_fns].index(id(victim))
+        ]
+        self.guard_trees[victim_code].remove(victim)
+        del self._usages[id(victim)]
+        self.release(victim)
+
+    def release(self, guarded_fn: GuardedFunction):
+        """
+        Deletes the globals holding the compiled functions of an entry which
+        is removed from the cache. If the translated code is still running,
+        they are deleted by a later call.
+        """
+        f_globals = self._entry_globals.pop(id(guarded_fn), None)
+        if f_globals is not None:
+            self._unreleased_globals.append((guarded_fn[0].code, f_globals))
+        if not self._unreleased_globals:
+            return
+        codes = running_codes()
+        unreleased_globals = []
+        for code, f_globals in self._unreleased_globals:
+            if code in codes:
+                unreleased_globals.append((code, f_globals))
+                continue
+            for name in compiled_fn_names(code):
+                f_globals.pop(name, None)
+        self._unreleased_globals = unreleased_globals
+
+    def analyse_miss_reason(
+        self, guarded_fns: GuardedFunctions, frame: types.FrameType
+    ) -> str:
+        """
+        Returns the first failed check of the latest guard, it's the most likely
+        reason of a recompilation.
+        """
+        if not guarded_fns:
+            return "no cached entry"
+        sub_guard = find_failed_sub_guard(guarded_fns[-1][1], frame)
+        if sub_guard is None:
+            return "failed guard not found"
+        return sub_guard.debug_expr
+
+    def pin_code(self, code: types.CodeType, miss_reasons: list[str]):
+        """
+        Pins the code object to run in dygraph, because it recompiles on every call.
+        """
+        top_reasons = Counter(miss_reasons).most_common(3)
+        reason = (
+            f"recompiled on {len(miss_reasons)} consecutive calls, "
+            + "most frequently failed guards: "
+            + "; ".join(
+                f"{expr} ({count} times)" for expr, count in top_reasons
+            )
+        )
+        log(1, f"[Cache]: Recompile storm detected in {code}, {reason}\n")
+        self.pinned_codes[code] = reason
+        self._miss_reasons.pop(code, None)
+        TranslationDiskCache().update(
+            code, pinned_reason=reason, pinned_misses=len(miss_reasons)
+        )
+
+    def restore_from_disk(self, code: types.CodeType) -> CustomCode | None:
+        """
+        Restores the translation decisions of code saved by TranslationDiskCache,
+        the translated entries are not restored, see `TranslationDiskCache`.
+
+        Returns:
+            CustomCode | None: The custom code if the code doesn't need to be translated, otherwise None.
+        """
+        record = TranslationDiskCache().load(code)
+        if record is None:
+            return None
+        log(2, f"[Cache]: Restore {code} from disk cache\n")
+        if self.DYNAMIC_SHAPE_THRESHOLD > 0 and record.get("dynamic_dims"):
+            DynamicShapeManager().dynamic_dims[code] = {
+                name: tuple(dims)
+                for name, dims in record["dynamic_dims"].items()
+            }
+        # The pin is only valid if it would be triggered by the current
+        # RECOMPILE_STORM_THRESHOLD.
+        if (
+            record.get("pinned_reason")
+            and record.get("pinned_misses", 0) >= self.RECOMPILE_STORM_THRESHOLD
+        ):
+            self.pinned_codes[code] = record["pinned_reason"]
+            return CustomCode(None, False)
+        fallback_code = TranslationDiskCache().load_fallback_code(record)
+        if fallback_code is not None:
+            custom_code = CustomCode(fallback_code, False)
+            self.add_guarded_fn(code, (custom_code, dummy_guard))
+            return custom_code
+        return None
 
     def translate(
         self, frame: types.FrameType, **kwargs
@@ -129,8 +606,90 @@ class OpcodeExecutorCache:
         """
         code: types.CodeType = frame.f_code
         self.translate_count += 1
-        custom_new_code, guard_fn = start_translate(frame, **kwargs)
-        return custom_new_code, guard_fn
+        if self.DYNAMIC_SHAPE_THRESHOLD > 0:
+            DynamicShapeManager().record_translation(frame)
+        stats = self.code_stats[code]
+        stats.translations += 1
+        start_time = time.perf_counter()
+        try:
+            with self._translate_lock:
+                # The layers may be changed since the last translation.
+                LayerVersionManager().invalidate()
+                custom_new_code, guard_fn = start_translate(frame, **kwargs)
+        finally:
+            stats.translate_time += time.perf_counter() - start_time
+        guarded_fn = (custom_new_code, guard_fn)
+        if compiled_fn_names(custom_new_code.code):
+            self._entry_globals[id(guarded_fn)] = frame.f_globals
+        return guarded_fn
+
+    def record_fallback(self, code: types.CodeType, reason: str):
+        """
+        Records that the translation of code falls back to dygraph.
+        """
+        if code in self.code_stats:
+            self.code_stats[code].fallback_reasons[reason] += 1
+
+    def get_stats(self) -> dict:
+        """
+        Returns the statistics of the cache as a dict, which contains the
+        statistics of each code object (keyed by its location), the sum of them,
+        the statistics of the other caches used by translation, the calls
+        inferred by the rules of RuleInferMeta, the number of statements
+        removed by each SIR pass, the fragments merged by SubgraphStitcher,
+        the programs built by SIRCompileService, and the memory of SIRs, see
+        `StatementIRFactory.memory_report`.
+
+        Examples:
+            >>> from sot.opcode_translator.executor.executor_cache import OpcodeExecutorCache
+            >>> sorted(OpcodeExecutorCache().get_stats().keys())
+            ['caches', 'codes', 'compile_service', 'infer_meta_rules', 'sir_memory', 'sir_passes', 'subgraph_stitching', 'total']
+        """
+        codes = {}
+        total = CodeCacheStats()
+        for code, stats in self.code_stats.items():
+            guard_tree = self.guard_trees[code]
+            codes[code_location(code)] = {
+                **stats.to_dict(),
+                "entries": len(guard_tree),
+                "last_hits": guard_tree.last_hit_count,
+                "pinned_reason": self.pinned_codes.get(code),
+            }
+            for name in ["hits", "misses", "translations", "evictions"]:
+                setattr(
+                    total, name, getattr(total, name) + getattr(stats, name)
+                )
+            total.translate_time += stats.translate_time
+            total.guard_time += stats.guard_time
+            total.fallback_reasons.update(stats.fallback_reasons)
+        return {
+            "codes": codes,
+            "total": {
+                **total.to_dict(),
+                "entries": self.total_size(),
+                "pinned_codes": len(self.pinned_codes),
+            },
+            "caches": {
+                cache.__class__.__name__: cache.stats()
+                for cache in [
+                    CompileSIRCache(),
+                    InferMetaCache(),
+                    LayerInferMetaCache(),
+                    GuardCodeCache(),
+                ]
+            },
+            "infer_meta_rules": RuleInferMeta().stats(),
+            "sir_passes": SIRPassManager().stats(),
+            "subgraph_stitching": SubgraphStitcher().stats(),
+            "compile_service": SIRCompileService().stats(),
+            "sir_memory": StatementIRFactory().memory_report(),
+        }
+
+    def get_stats_json(self, indent: int | None = None) -> str:
+        """
+        Returns the statistics of the cache as a JSON string, see `get_stats`.
+        """
+        return json.dumps(self.get_stats(), indent=indent)
 
     def analyse_guard_global_object(self, guard_fn):
         def inner():
@@ -193,6 +752,9 @@ def start_translate(frame: types.FrameType, **kwargs) -> GuardedFunction:
         # if disable_eval_frame is True, it means we want fallback to speedup rather than error occured
         if is_strict_mode() and e.disable_eval_frame is False:
             raise
+        OpcodeExecutorCache().record_fallback(
+            frame.f_code, f"{type(e).__name__}: {e}"
+        )
         log(
             2,
             f"Unsupport Frame is {frame.f_code}, error message is: \n"
@@ -285,8 +285,14 @@ class FunctionGraph:
         ]
 
         tensor_items = self._find_tensor_outputs(ret_items)
+        input_metas = {
+            variable.get_symbol().name: variable.origin_meta
+            for variable in self.input_variables
+            if isinstance(variable, TensorVariable)
+        }
         compiled_fn, statment_ir = self.sir_ctx.compile_fn(
             [Symbol(tensor_var.var_name) for tensor_var in tensor_items],
+            input_metas,
             **self._kwargs,
         )
         input_names = statment_ir.inputs
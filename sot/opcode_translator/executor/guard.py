@@ -1,11 +1,25 @@
 from __future__ import annotations
 
+import io
+import re
+import time
+import tokenize
 import types
 import weakref
-from typing import TYPE_CHECKING, Any, Callable, TypeVar
+from typing import TYPE_CHECKING, Any, Callable, Iterable, TypeVar
 
+import paddle
+
+from ...infer_meta import MetaInfo, simulation_dtype
 from ...profiler import EventGuard
-from ...utils import InnerError, current_tmp_name_records, log, log_do
+from ...utils import (
+    Cache,
+    InnerError,
+    Singleton,
+    current_tmp_name_records,
+    log,
+    log_do,
+)
 
 Guard = Callable[[types.FrameType], bool]
 
@@ -57,6 +71,314 @@ def union_free_vars(*free_vars: dict[str, Any]):
     return {k: v for d in free_vars for k, v in d.items()}
 
 
+TMP_NAME_PATTERN = re.compile(r"\b_sot_tmp_\d+\b")
+PLAIN_FREE_VAR_TYPES = (
+    bool,
+    int,
+    float,
+    str,
+    bytes,
+    tuple,
+    list,
+    type(None),
+    weakref.ref,
+)
+
+
+def normalize_free_vars(
+    source: str, free_var_names: Iterable[str]
+) -> tuple[str, list[str]]:
+    """
+    Rename the free variables in source to `__free_var_i` by their order of
+    appearance, since the same value may be bound to different names. Only
+    the NAME tokens are renamed, the string literals and the attributes with
+    the same names, e.g. `frame.f_locals['np']`, are kept.
+
+    Returns:
+        The normalized source, and the original names in order of appearance.
+    """
+    names = {name for name in free_var_names if name in source}
+    if not names:
+        return source, []
+    order: dict[str, int] = {}
+    lines = source.splitlines(keepends=True)
+    renames: list[tuple[int, int, int, str]] = []
+    prev_token = None
+    for token in tokenize.generate_tokens(io.StringIO(source).readline):
+        if (
+            token.type == tokenize.NAME
+            and token.string in names
+            and not (prev_token is not None and prev_token.string == ".")
+        ):
+            if token.string not in order:
+                order[token.string] = len(order)
+            (row, start), (_, end) = token.start, token.end
+            renames.append(
+                (row - 1, start, end, f"__free_var_{order[token.string]}")
+            )
+        if token.type not in (tokenize.NL, tokenize.COMMENT):
+            prev_token = token
+    # Replace from the end, so the columns of the former tokens are kept.
+    for row, start, end, new_name in reversed(renames):
+        lines[row] = lines[row][:start] + new_name + lines[row][end:]
+    return "".join(lines), list(order)
+
+
+@Singleton
+class GuardCodeCache(Cache):
+    """
+    Cache the compiled code of guard functions by their normalized source, so
+    the guards which only differ in the names of free variables, such as the
+    same function translated again after eviction, are compiled only once.
+
+    The least recently used code is evicted when there are more than MAX_SIZE
+    codes, so the guards of the evicted cache entries don't pile up.
+    """
+
+    MAX_SIZE = 4096
+
+    def __call__(self, source: str):
+        cache_key = self.key_fn(source)
+        code = self.cache.pop(cache_key, None)
+        if code is not None:
+            self.hit_num += 1
+        else:
+            self.miss_num += 1
+            start_time = time.perf_counter()
+            code = self.value_fn(source)
+            self.value_time += time.perf_counter() - start_time
+        # The most recently used code is the last one.
+        self.cache[cache_key] = code
+        while len(self.cache) > self.MAX_SIZE:
+            self.cache.pop(next(iter(self.cache)))
+        return code
+
+    def key_fn(self, source: str):
+        return source
+
+    def value_fn(self, source: str):
+        return compile(source, "<guard>", "exec")
+
+
+def build_guard_fn(
+    func_string: str, fn_name: str, free_vars: dict[str, Any]
+) -> Guard:
+    """
+    Build the function named fn_name defined in func_string, the code is
+    compiled once for each normalized source by `GuardCodeCache`, and the free
+    variables are bound when the function is instantiated.
+    """
+    normalized_string, names = normalize_free_vars(func_string, free_vars)
+    namespace = dict(free_vars)
+    for i, name in enumerate(names):
+        namespace[f"__free_var_{i}"] = free_vars[name]
+    exec(GuardCodeCache()(normalized_string), namespace)
+    return namespace[fn_name]
+
+
+def is_same_free_var(lhs: Any, rhs: Any) -> bool:
+    """
+    Whether two free variables of guards can be treated as the same value.
+    Only plain data are compared by value, other objects are compared by identity.
+    """
+    if lhs is rhs:
+        return True
+    if type(lhs) is not type(rhs) or not isinstance(lhs, PLAIN_FREE_VAR_TYPES):
+        return False
+    try:
+        return bool(lhs == rhs)
+    except Exception:
+        return False
+
+
+class SubGuard:
+    """
+    A single check of a guard, which is made from a StringifyExpression.
+
+    It records the temporary variables needed to evaluate the check, so that a
+    sequence of SubGuards (possibly from different guards) can be compiled into
+    one short-circuit function by `compile_sub_guards`. Two SubGuards from
+    different guards are the same if they check the same expression against the
+    same free variables, it's used to share the checks between cache entries.
+
+    Args:
+        assignments: The (tmp_name, expr) pairs needed by the check, in dependency order.
+        result: The tmp name which holds the result of the check.
+        debug_expr: The expression without temporary variables.
+        free_vars: The free variables used in the expressions.
+    """
+
+    def __init__(
+        self,
+        assignments: list[tuple[str, str]],
+        result: str,
+        debug_expr: str,
+        free_vars: dict[str, Any],
+    ):
+        self.assignments = assignments
+        self.result = result
+        self.debug_expr = debug_expr
+        self.free_vars = free_vars
+        self.key_expr, self.key_values = self.normalize()
+        self._check: Guard | None = None
+        self.pass_count = 0
+        self.fail_count = 0
+        self.total_time = 0.0
+
+    @property
+    def check(self) -> Guard:
+        """
+        The guard function only checks this SubGuard, used for profiling.
+        """
+        if self._check is None:
+            self._check = compile_sub_guards([self])
+        return self._check
+
+    def profile(self, frame: types.FrameType) -> bool:
+        """
+        Run the check alone and record its result and time cost.
+        """
+        start_time = time.perf_counter()
+        try:
+            passed = bool(self.check(frame))
+        except Exception:
+            passed = False
+        self.total_time += time.perf_counter() - start_time
+        if passed:
+            self.pass_count += 1
+        else:
+            self.fail_count += 1
+        return passed
+
+    @property
+    def rank(self) -> float:
+        """
+        The expected cost to reject a frame by this check, i.e. cost / P(fail).
+        A chain of `and` checks is cheapest on average when sorted by it.
+        """
+        count = self.pass_count + self.fail_count
+        if count == 0:
+            return 0.0
+        fail_rate = (self.fail_count + 1) / (count + 2)
+        return self.total_time / count / fail_rate
+
+    def normalize(self) -> tuple[str, list[Any]]:
+        """
+        Replace the free variable names in debug_expr by their order of
+        appearance, since the same value may be bound to different names.
+        """
+        key_expr, names = normalize_free_vars(self.debug_expr, self.free_vars)
+        return key_expr, [self.free_vars[name] for name in names]
+
+    def is_same(self, other: SubGuard) -> bool:
+        return (
+            self.key_expr == other.key_expr
+            and len(self.key_values) == len(other.key_values)
+            and all(
+                is_same_free_var(lhs, rhs)
+                for lhs, rhs in zip(self.key_values, other.key_values)
+            )
+        )
+
+    def __repr__(self):
+        return f"SubGuard({self.debug_expr})"
+
+
+class OpaqueSubGuard(SubGuard):
+    """
+    Wrap a guard which is not made by `make_guard` (such as `dummy_guard`) as
+    a SubGuard, it's only the same as itself.
+    """
+
+    def __init__(self, guard: Guard):
+        self.guard = guard
+        name = f"__opaque_guard_{id(guard)}"
+        super().__init__(
+            [("_sot_tmp_0", f"{name}(frame)")],
+            "_sot_tmp_0",
+            getattr(guard, "lambda_expr", f"{name}(frame)"),
+            {name: guard},
+        )
+
+    def is_same(self, other: SubGuard) -> bool:
+        return isinstance(other, OpaqueSubGuard) and self.guard is other.guard
+
+
+def make_sub_guards(
+    stringify_guards: list[StringifyExpression],
+    tmp_names: dict[str, str],
+) -> list[SubGuard]:
+    """
+    Split the stringify guards into SubGuards.
+
+    Args:
+        stringify_guards: a list of StringifyExpression.
+        tmp_names: the mapping from expression to tmp name, in creation order.
+    """
+    tmp_exprs = {v: k for k, v in tmp_names.items()}
+    tmp_order = {v: i for i, v in enumerate(tmp_names.values())}
+
+    def collect_deps(tmp_name, deps):
+        if tmp_name in deps or tmp_name not in tmp_exprs:
+            return
+        deps.add(tmp_name)
+        for dep in TMP_NAME_PATTERN.findall(tmp_exprs[tmp_name]):
+            collect_deps(dep, deps)
+
+    sub_guards = []
+    for str_expr in stringify_guards:
+        deps = set()
+        collect_deps(str_expr.expr, deps)
+        assignments = [
+            (name, tmp_exprs[name]) for name in sorted(deps, key=tmp_order.get)
+        ]
+        sub_guards.append(
+            SubGuard(
+                assignments,
+                str_expr.expr,
+                str_expr.debug_expr,
+                str_expr.free_vars,
+            )
+        )
+    return sub_guards
+
+
+def compile_sub_guards(sub_guards: list[SubGuard]) -> Guard:
+    """
+    Compile a sequence of SubGuards into one guard function, which returns False
+    as soon as a check fails. The temporary variables of each SubGuard are renamed,
+    so SubGuards made by different `make_guard` calls can be compiled together, and
+    the same expression is evaluated only once.
+
+    Args:
+        sub_guards: a list of SubGuard.
+    """
+    if not sub_guards:
+        guard = lambda frame: True
+        guard.expr = "lambda frame: True"
+        return guard
+
+    func_string = "def built_sub_guard_fn(frame):\n"
+    free_vars = {}
+    new_tmp_names = {}
+    for sub_guard in sub_guards:
+        renames = {}
+        for tmp_name, expr in sub_guard.assignments:
+            expr = TMP_NAME_PATTERN.sub(lambda m: renames[m.group(0)], expr)
+            if expr not in new_tmp_names:
+                new_tmp_names[expr] = f"_sot_tmp_{len(new_tmp_names)}"
+                func_string += f"    {new_tmp_names[expr]} = {expr}\n"
+            renames[tmp_name] = new_tmp_names[expr]
+        func_string += f"    if not {renames[sub_guard.result]}:\n"
+        func_string += "        return False\n"
+        free_vars = union_free_vars(free_vars, sub_guard.free_vars)
+    func_string += "    return True"
+
+    guard = build_guard_fn(func_string, "built_sub_guard_fn", free_vars)
+    guard.expr = func_string
+    return guard
+
+
 def make_guard(stringify_guards: list[StringifyExpression]) -> Guard:
     """
     Make a guard from a list of StringifyExpression.
@@ -71,6 +393,7 @@ def make_guard(stringify_guards: list[StringifyExpression]) -> Guard:
         if not num_guards:
             guard = lambda frame: True
             guard.expr = "lambda frame: True"
+            guard.sub_guards = []
             return guard
 
         def analyse_expresions(stringify_exprs, tmp_names):
@@ -99,20 +422,63 @@ def make_guard(stringify_guards: list[StringifyExpression]) -> Guard:
             stringify_guards, current_tmp_name_records().tmp_names_record
         )
 
-        exec(
-            func_string,
-            free_vars,
-        )
-
-        guard = free_vars['built_guard_fn']
+        guard = build_guard_fn(func_string, "built_guard_fn", free_vars)
         log(3, f"[Guard]: {lambda_string}\n")
         guard.lambda_expr = lambda_string
         guard.expr = func_string
+        guard.sub_guards = make_sub_guards(
+            stringify_guards, current_tmp_name_records().tmp_names_record
+        )
         assert callable(guard), "guard must be callable."
 
         return guard
 
 
+def mask_dynamic_dims(shape: list[int], dims: tuple[int, ...]) -> list[int]:
+    """
+    Replace the sizes of the dynamic dimensions in shape with -1.
+    """
+    for dim in dims:
+        if dim < len(shape):
+            shape[dim] = -1
+    return shape
+
+
+def tensor_meta_stringify_guard(
+    value_tracer: StringifyExpression, meta: MetaInfo, meta_free_var_name: str
+) -> StringifyExpression:
+    """
+    Make a guard which checks the meta of a tensor.
+
+    Only shape, dtype and stop_gradient are read from the tensor at runtime, and
+    they are compared with a tuple precomputed at compile time, rather than
+    building a MetaInfo and comparing its formatted string. The dynamic (-1)
+    dimensions of meta match any size.
+
+    Args:
+        value_tracer: The expression to get the tensor from frame.
+        meta: The meta info of the tensor when it was traced.
+        meta_free_var_name: The name to bind the precomputed tuple in guard.
+    """
+    shape_expr = "{0}.shape"
+    dtype_expr = "{0}.dtype"
+    free_vars = {meta_free_var_name: meta.guard_tuple()}
+    if meta.is_dynamic_shape():
+        dims_free_var_name = f"{meta_free_var_name}_dynamic_dims"
+        shape_expr = f"mask_dynamic_dims({{0}}.shape, {dims_free_var_name})"
+        free_vars[dims_free_var_name] = meta.dynamic_dims()
+        free_vars["mask_dynamic_dims"] = mask_dynamic_dims
+    if meta.dtype == paddle.float32:
+        # float16 tensor is simulated as float32 under AMP, see `simulation_dtype`
+        dtype_expr = "simulation_dtype({0}.dtype)"
+        free_vars["simulation_dtype"] = simulation_dtype
+    return StringifyExpression(
+        f"({shape_expr}, {dtype_expr}, {{0}}.stop_gradient) == {meta_free_var_name}",
+        [value_tracer],
+        union_free_vars(value_tracer.free_vars, free_vars),
+    )
+
+
 def support_weak_ref(obj):
     if isinstance(obj, types.FunctionType):
         return True
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import types
+from typing import Any, Generic, TypeVar
+
+from .guard import Guard, OpaqueSubGuard, SubGuard, compile_sub_guards
+
+T = TypeVar("T")
+
+
+def get_sub_guards(guard: Guard) -> list[SubGuard]:
+    """
+    Get the SubGuards of a guard, guards not made by `make_guard` are
+    treated as a single opaque check.
+    """
+    sub_guards = getattr(guard, "sub_guards", None)
+    if sub_guards is None:
+        return [OpaqueSubGuard(guard)]
+    return sub_guards
+
+
+def find_failed_sub_guard(
+    guard: Guard, frame: types.FrameType
+) -> SubGuard | None:
+    """
+    Find the first SubGuard of a guard which fails in the given frame.
+    """
+    for sub_guard in get_sub_guards(guard):
+        try:
+            passed = sub_guard.check(frame)
+        except Exception:
+            passed = False
+        if not passed:
+            return sub_guard
+    return None
+
+
+class GuardTreeNode(Generic[T]):
+    """
+    A node of GuardTree, which holds a segment of SubGuards shared by all the
+    entries below it.
+
+    Args:
+        sub_guards: The SubGuards checked when entering this node.
+    """
+
+    def __init__(self, sub_guards: list[SubGuard]):
+        self.sub_guards = sub_guards
+        self.children: list[GuardTreeNode[T]] = []
+        self.entries: list[T] = []
+        self._check: Guard | None = None
+
+    @property
+    def check(self) -> Guard:
+        if self._check is None:
+            self._check = compile_sub_guards(self.sub_guards)
+        return self._check
+
+    def split(self, index: int):
+        """
+        Split the segment at index, the SubGuards after index are moved to a new child.
+        """
+        tail = GuardTreeNode(self.sub_guards[index:])
+        tail.children, tail.entries = self.children, self.entries
+        self.sub_guards = self.sub_guards[:index]
+        self.children, self.entries = [tail], []
+        self._check = None
+
+    def find_child(self, sub_guard: SubGuard) -> GuardTreeNode[T] | None:
+        for child in self.children:
+            if child.sub_guards[0].is_same(sub_guard):
+                return child
+        return None
+
+
+class GuardTree(Generic[T]):
+    """
+    Merge the guards of all the cache entries of a code object into a radix tree,
+    so the common prefix of guards is checked only once, and a failed check skips
+    all the entries below it. Each node compiles its segment of SubGuards into
+    one function, so a tree with a single entry costs the same as a plain guard.
+
+    Every PROFILE_INTERVAL lookups, a SubGuard in the tree is run alone to
+    record whether it passes and how long it takes. The SubGuards are sampled
+    in turn, so a lookup runs at most one extra check. Every REORDER_INTERVAL
+    profiles, the SubGuards of each entry are sorted by `SubGuard.rank` and the
+    tree is rebuilt, so the cheap and frequently failing checks come first.
+
+    The path of the last hit entry is tried first, and if PROMOTE_ON_HIT is
+    set, the nodes on the path of a hit are moved to the front of their
+    siblings, so the hot entries are found with few failed checks, e.g.
+    when an inference server alternates between a few batch shapes.
+
+    Examples:
+        >>> tree = GuardTree()
+        >>> tree.add(lambda frame: True, "entry")
+        >>> tree.lookup(None)
+        'entry'
+    """
+
+    PROFILE_INTERVAL = 16
+    REORDER_INTERVAL = 256
+    PROMOTE_ON_HIT = True
+
+    def __init__(self):
+        self.root: GuardTreeNode[T] = GuardTreeNode([])
+        self.items: list[tuple[list[SubGuard], T]] = []
+        self.lookup_count = 0
+        self.profile_count = 0
+        self.hit_count = 0
+        self.last_hit_count = 0
+        self._last_hit_path: list[GuardTreeNode[T]] | None = None
+        # All the SubGuards in the tree, which are profiled in turn.
+        self._sub_guards: list[SubGuard] | None = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, guard: Guard, entry: T):
+        """
+        Insert an entry guarded by guard into the tree.
+
+        Args:
+            guard: The guard of the entry.
+            entry: The value returned by lookup when the guard passes.
+        """
+        sub_guards = self._insert(get_sub_guards(guard), entry)
+        self.items.append((sub_guards, entry))
+        # The nodes on the path may be split by the insertion.
+        self._last_hit_path = None
+        self._sub_guards = None
+
+    def _insert(self, sub_guards: list[SubGuard], entry: T) -> list[SubGuard]:
+        """
+        Insert the entry, returns its SubGuards with the shared ones replaced by
+        the instances in the tree, so their statistics are shared too.
+        """
+        shared = []
+        node = self.root
+        while sub_guards:
+            child = node.find_child(sub_guards[0])
+            if child is None:
+                child = GuardTreeNode(sub_guards)
+                node.children.append(child)
+                node = child
+                break
+            common = 1
+            while (
+                common < len(child.sub_guards)
+                and common < len(sub_guards)
+                and child.sub_guards[common].is_same(sub_guards[common])
+            ):
+                common += 1
+            if common < len(child.sub_guards):
+                child.split(common)
+            shared.extend(child.sub_guards)
+            node, sub_guards = child, sub_guards[common:]
+        node.entries.append(entry)
+        return shared + list(sub_guards)
+
+    def remove(self, entry: T):
+        """
+        Remove an entry from the tree, the tree is rebuilt without it.
+
+        Args:
+            entry: The entry to be removed, compared by identity.
+        """
+        self._rebuild([item for item in self.items if item[1] is not entry])
+
+    def lookup(self, frame: types.FrameType) -> T | None:
+        """
+        Find an entry whose guard passes in the given frame.
+
+        Args:
+            frame: The frame to be checked.
+
+        Returns:
+            The matched entry, or None if all guards failed.
+        """
+        self.lookup_count += 1
+        if (
+            self.PROFILE_INTERVAL > 0
+            and self.lookup_count % self.PROFILE_INTERVAL == 0
+        ):
+            self.profile(frame)
+        if self._last_hit_path is not None and self._check_path(
+            self._last_hit_path, frame
+        ):
+            self.hit_count += 1
+            self.last_hit_count += 1
+            return self._entry_of(self._last_hit_path)
+        path = self._lookup(self.root, frame)
+        if path is None:
+            return None
+        self.hit_count += 1
+        if self.PROMOTE_ON_HIT:
+            parent = self.root
+            for node in path:
+                if parent.children[0] is not node:
+                    parent.children.remove(node)
+                    parent.children.insert(0, node)
+                parent = node
+        self._last_hit_path = path
+        return self._entry_of(path)
+
+    def _entry_of(self, path: list[GuardTreeNode[T]]) -> T:
+        return (path[-1] if path else self.root).entries[0]
+
+    def _check_path(
+        self, path: list[GuardTreeNode[T]], frame: types.FrameType
+    ) -> bool:
+        try:
+            return all(node.check(frame) for node in path)
+        except Exception:
+            return False
+
+    def _lookup(
+        self, node: GuardTreeNode[T], frame: types.FrameType
+    ) -> list[GuardTreeNode[T]] | None:
+        """
+        Returns the path from node (excluded) to the node which holds the matched entry.
+        """
+        if node.entries:
+            return []
+        for child in node.children:
+            try:
+                passed = child.check(frame)
+            except Exception:
+                passed = False
+            if passed:
+                path = self._lookup(child, frame)
+                if path is not None:
+                    return [child, *path]
+        return None
+
+    def profile(self, frame: types.FrameType):
+        """
+        Run the next SubGuard in the tree alone, to collect its statistics.
+        """
+        if self._sub_guards is None:
+            self._sub_guards = []
+            nodes = [self.root]
+            while nodes:
+                node = nodes.pop()
+                self._sub_guards.extend(node.sub_guards)
+                nodes.extend(node.children)
+        if self._sub_guards:
+            sub_guards = self._sub_guards
+            sub_guards[self.profile_count % len(sub_guards)].profile(frame)
+        self.profile_count += 1
+        if (
+            self.REORDER_INTERVAL > 0
+            and self.profile_count % self.REORDER_INTERVAL == 0
+        ):
+            self.reorder()
+
+    def reorder(self):
+        """
+        Sort the SubGuards of each entry by their rank, and rebuild the tree.
+        """
+        self._rebuild(
+            [
+                (
+                    sorted(sub_guards, key=lambda sub_guard: sub_guard.rank),
+                    entry,
+                )
+                for sub_guards, entry in self.items
+            ]
+        )
+
+    def _rebuild(self, items: list[tuple[list[SubGuard], T]]):
+        self.root = GuardTreeNode([])
+        self._last_hit_path = None
+        self._sub_guards = None
+        self.items = [
+            (self._insert(sub_guards, entry), entry)
+            for sub_guards, entry in items
+        ]
+
+    def clear(self):
+        self.root = GuardTreeNode([])
+        self.items = []
+        self.lookup_count = 0
+        self.profile_count = 0
+        self.hit_count = 0
+        self.last_hit_count = 0
+        self._last_hit_path = None
+        self._sub_guards = None
+
+    def dump(self) -> list[Any]:
+        """
+        Returns the structure of the tree for debugging, each node is a
+        (number of sub guards, number of entries, children) tuple.
+        """
+
+        def dump_node(node):
+            return (
+                len(node.sub_guards),
+                len(node.entries),
+                [dump_node(child) for child in node.children],
+            )
+
+        return dump_node(self.root)[2]
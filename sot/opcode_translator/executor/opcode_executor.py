@@ -44,6 +44,7 @@ from .dispatch_functions import (
     operator_not_in,
 )
 from .dispatcher import Dispatcher
+from .dynamic_shape import DynamicShapeManager
 from .function_graph import FunctionGraph
 from .instr_flag import CALL_FUNCTION_EX_FLAG as CFE
 from .instr_flag import FORMAT_VALUE_FLAG as FV
@@ -1470,6 +1471,15 @@ class OpcodeExecutor(OpcodeExecutorBase):
             self._locals[name] = VariableFactory.from_value(
                 value, self._graph, tracker, debug_name=name
             )
+            dynamic_dims = DynamicShapeManager().get_dynamic_dims(
+                self._code, name
+            )
+            if dynamic_dims and isinstance(self._locals[name], TensorVariable):
+                tensor_var = self._locals[name]
+                tensor_var.meta = tensor_var.meta.with_dynamic_dims(
+                    dynamic_dims
+                )
+                tensor_var.origin_meta = tensor_var.meta
 
         for name in free_or_cell_vars:
             # create a cell for each variable.
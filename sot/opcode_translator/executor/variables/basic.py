@@ -9,7 +9,7 @@ import numpy as np
 
 import paddle
 
-from ....infer_meta import MetaInfo
+from ....infer_meta import MetaInfo, simulation_dtype
 from ....symbolic.statement_ir import Symbol
 from ....utils import (
     BreakGraphError,
@@ -23,6 +23,7 @@ from ..guard import (
     StringifyExpression,
     check_guard,
     object_equal_stringify_guard,
+    tensor_meta_stringify_guard,
     union_free_vars,
 )
 from ..mutable_data import MutableDictLikeData
@@ -243,11 +244,18 @@ class TensorDtypeVariable(DataVariable):
             tensor_value_tracer = (
                 self.tracker.obj.tracker.trace_value_from_frame()
             )
+            dtype_free_var_name = f"__{self.id}_dtype"
             return [
                 StringifyExpression(
-                    f"str(MetaInfo.from_tensor({{}}).dtype) == '{str(self.value)}'",
+                    f"simulation_dtype({{}}.dtype) == {dtype_free_var_name}",
                     [tensor_value_tracer],
-                    {"MetaInfo": MetaInfo},
+                    union_free_vars(
+                        tensor_value_tracer.free_vars,
+                        {
+                            "simulation_dtype": simulation_dtype,
+                            dtype_free_var_name: self.value,
+                        },
+                    ),
                 )
             ]
         else:
@@ -345,13 +353,10 @@ class TensorVariable(VariableBase):
         frame_value_tracer = self.tracker.trace_value_from_frame()
 
         return [
-            StringifyExpression(
-                f"MetaInfo.from_tensor({{}}).guard_str() == '{self.origin_meta.guard_str()}'",
-                [frame_value_tracer],
-                union_free_vars(
-                    {"MetaInfo": MetaInfo},
-                    frame_value_tracer.free_vars,
-                ),
+            tensor_meta_stringify_guard(
+                frame_value_tracer,
+                self.origin_meta,
+                f"__{self.id}_meta",
             )
         ]
 
@@ -363,7 +368,7 @@ class TensorVariable(VariableBase):
     @property
     def main_info(self) -> dict[str, Any]:
         return {
-            "shape": self.meta.shape,
+            "shape": list(self.meta.shape),
             "dtype": DTYPE_ABBRS[self.meta.dtype],
             "stop_gradient": self.meta.stop_gradient,
             "var_name": self.var_name,
@@ -432,7 +437,7 @@ class TensorVariable(VariableBase):
         from .container import ListVariable
 
         return ListVariable(
-            self.meta.shape, self.graph, tracker=DummyTracker([self])
+            list(self.meta.shape), self.graph, tracker=DummyTracker([self])
         )
 
     def numel(self):
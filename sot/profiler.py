@@ -36,6 +36,10 @@ def EventGuard(event_name, event_level=0):
             core.nvprof_nvtx_pop()
 
 
+def event_enabled(event_level=0):
+    return _event_level >= event_level
+
+
 if _event_level == -1:
 
     @contextmanager
@@ -1,24 +1,34 @@
 from __future__ import annotations
 
+import time
 from typing import TYPE_CHECKING
 
 import paddle
 
-from ..profiler import EventGuard
+from ..profiler import EventGuard, event_enabled
 from ..utils import (
     Cache,
     CodeStatus,
     GraphLogger,
     Singleton,
     StepInfoManager,
+    log,
     log_do,
+    log_enabled,
+    static_program_lock,
 )
+from .compile_service import SIRCompileService
 from .interpreter import compile_sir
+from .subgraph_stitching import SubgraphStitcher
 
 if TYPE_CHECKING:
     from .symbolic_context import SymbolicTraceContext
 
 
+# The events are enabled by EVENT_LEVEL when the profiler is imported.
+_events_enabled = event_enabled()
+
+
 def clear_eager_tensor_name(output_tensors):
     for output_tensor in output_tensors:
         output_tensor.name = ""
@@ -27,15 +37,82 @@ def clear_eager_tensor_name(output_tensors):
 class FallbackWrapper:
     """
     Used to store and call static graph methods generated by paddle.jit.to_static
+
+    Once the partial program is built, the wrapper calls it directly, and the
+    profiler events, the back trace of the calling frames and the logs are
+    only done when they are enabled, see `need_hooks`. If SubgraphStitcher is
+    enabled, the calls go through it. If the partial program is being built by
+    SIRCompileService, it's installed on the first call.
     """
 
-    def __init__(self, compiled_fn, SIR):
+    def __init__(self, compiled_fn, SIR, called_sirs=(), compile_kwargs=None):
         self.compiled_fn = compiled_fn
         self.partial_program = None
         self.concrete_program = None
         self.SIR = SIR  # for debug
+        # Keep the SIRs run by compiled_fn alive, see StatementIRFactory.
+        self.called_sirs = list(called_sirs)
+        # The arguments of `CompileSIRCache.value_fn`, which are used to
+        # compile the stitched programs headed by this one.
+        self.compile_kwargs = compile_kwargs or {}
+        # The future of the program built by SIRCompileService.
+        self.pending_program = None
 
     def __call__(self, *args, **kwargs):
+        stitcher = SubgraphStitcher()
+        if stitcher.ENABLED:
+            return stitcher(self, *args, **kwargs)
+        return self.run(*args, **kwargs)
+
+    def run(self, *args, **kwargs):
+        partial_program = self.partial_program
+        if partial_program is None or self.need_hooks():
+            return self.call_with_hooks(*args, **kwargs)
+        outputs = partial_program(*args, **kwargs)
+        for output in outputs:
+            output.name = ""
+        return outputs
+
+    def build_and_call(self, *args, **kwargs):
+        """
+        Install the program built by SIRCompileService, or build the program
+        by compiled_fn, then call it.
+        """
+        if self.pending_program is not None:
+            with EventGuard("FallbackWrapper: install pending program"):
+                SIRCompileService().install(self)
+        if self.partial_program is not None:
+            with EventGuard("FallbackWrapper: call partial_program"):
+                return self.partial_program(*args, **kwargs)
+        with EventGuard("FallbackWrapper: call compiled_fn"):
+            outputs = self.compiled_fn(*args, **kwargs)
+            (
+                self.concrete_program,
+                self.partial_program,
+            ) = self.compiled_fn.get_concrete_program(*args, **kwargs)
+        return outputs
+
+    def print_program(self, *args, **kwargs):
+        with static_program_lock:
+            _, partial_program = self.compiled_fn.get_concrete_program(
+                *args, **kwargs
+            )
+        print(partial_program.train_program)
+
+    def need_hooks(self):
+        """
+        Whether the call should go through `call_with_hooks`, i.e. the
+        profiler or the logs are enabled, or the calling frames need to be
+        traced back in the first steps of the code. The log level and the
+        state of the profiler are read once, see `log_level`.
+        """
+        return (
+            log_enabled(1)
+            or _events_enabled
+            or StepInfoManager().need_back_trace
+        )
+
+    def call_with_hooks(self, *args, **kwargs):
         with EventGuard(f"FallbackWrapper: {self.SIR.name}"):
             if StepInfoManager().need_back_trace:
                 CodeStatus().trace_back_frames()
@@ -44,21 +121,12 @@ class FallbackWrapper:
                 2,
                 lambda: print("[FallbackWrapper] start run SIR: \n", self.SIR),
             )
-            log_do(
-                4,
-                lambda: print(
-                    self.compiled_fn.get_concrete_program(*args, **kwargs)[
-                        1
-                    ].train_program
-                ),
-            )
+            log_do(4, lambda: self.print_program(*args, **kwargs))
             if self.partial_program is None:
-                with EventGuard("FallbackWrapper: call compiled_fn"):
-                    outputs = self.compiled_fn(*args, **kwargs)
-                    (
-                        self.concrete_program,
-                        self.partial_program,
-                    ) = self.compiled_fn.get_concrete_program(*args, **kwargs)
+                # The program may be built while a frame is translated in
+                # background, see `static_program_lock`.
+                with static_program_lock:
+                    outputs = self.build_and_call(*args, **kwargs)
             else:
                 # Speed up Resnet from 0.0068 --> 0.0057
                 with EventGuard("FallbackWrapper: call partial_program"):
@@ -81,28 +149,85 @@ class FallbackWrapper:
 @Singleton
 class CompileSIRCache(Cache):
     """
-    Cache the compiled function of SIR
+    Cache the compiled function of SIR.
+
+    The SIRs are keyed by their structure key, in which the symbols are
+    renamed by position, and the metas of their inputs, so the structurally
+    identical subgraphs (e.g. the same block traced again after a graph break,
+    or a helper inlined into different functions) share one FallbackWrapper,
+    which runs the canonical SIR, see `StatementIR.canonicalize`.
+
+    The least recently used entries are evicted when the SIRs of all entries
+    have more than MAX_TOTAL_STATEMENTS statements. An evicted FallbackWrapper
+    (and its SIRs) is released once the translations using it are evicted.
     """
 
+    MAX_TOTAL_STATEMENTS = 500000
+
     def __init__(self):
         super().__init__(weak=False)
+        self.total_statements = 0
+
+    def __call__(self, context: SymbolicTraceContext, sir_name: str, **kwargs):
+        cache_key = self.key_fn(context, sir_name, **kwargs)
+        wrapper = self.cache.pop(cache_key, None)
+        if wrapper is not None:
+            log(5, "cache hit: ", cache_key, "\n")
+            self.hit_num += 1
+        else:
+            self.miss_num += 1
+            start_time = time.perf_counter()
+            wrapper = self.value_fn(context, sir_name, **kwargs)
+            self.value_time += time.perf_counter() - start_time
+            self.total_statements += len(wrapper.SIR)
+        # The most recently used entry is the last one.
+        self.cache[cache_key] = wrapper
+        while (
+            self.total_statements > self.MAX_TOTAL_STATEMENTS
+            and len(self.cache) > 1
+        ):
+            evicted = self.cache.pop(next(iter(self.cache)))
+            self.total_statements -= len(evicted.SIR)
+            log(3, f"[CompileCache] evict {evicted.SIR.name}\n")
+        return wrapper
+
+    def clear(self):
+        super().clear()
+        self.total_statements = 0
+
+    def stats(self):
+        """
+        Returns the statistics of the cache, see `Cache.stats`, and the number
+        of statements of the cached SIRs.
+        """
+        return {**super().stats(), "statements": self.total_statements}
 
     def key_fn(self, context: SymbolicTraceContext, sir_name: str, **kwargs):
         """
-        generate a hash key for a SIR
+        generate the key of a SIR, which is compared by the structure of the
+        SIR rather than only by its hash
 
         Args:
             context: The context to compile
             sir_name: The name of the sir to compile
             build_strategy: The build strategy to compile
+            input_spec: The input spec to compile, which is only given when some inputs have dynamic shape
+            input_metas: The MetaInfo of the inputs of the SIR, the compiled function is only shared by the SIRs with the same input metas
 
         Returns:
-            The hash key of the SIR
+            The key of the SIR
         """
         sir = context.get_sir(sir_name)
-        # NOTE(dev): Is str(sir) a heavy opearation ?
-        hash_key = hash(str(sir))
-        return hash_key
+        input_spec = kwargs.get("input_spec", None)
+        input_metas = kwargs.get("input_metas", None)
+        if input_metas is None:
+            # The inputs are unknown, so the function is not shared.
+            return (sir_name, sir.structure_key(), str(input_spec))
+        return (
+            sir.structure_key(),
+            tuple(meta.guard_str() for meta in input_metas),
+            str(input_spec),
+        )
 
     def value_fn(self, context: SymbolicTraceContext, sir_name: str, **kwargs):
         """
@@ -112,18 +237,37 @@ class CompileSIRCache(Cache):
             context: The context to compile
             sir_name: The name of the sir to compile
             build_strategy: The build strategy to compile
+            input_spec: The input spec to compile, which is only given when some inputs have dynamic shape
+            input_metas: The MetaInfo of the inputs of the SIR, which are used to build the program by SIRCompileService
 
         Returns:
             The static graph function
         """
         build_strategy = kwargs.get("build_strategy", None)
         backend = kwargs.get("backend", None)
-        return FallbackWrapper(
+        input_spec = kwargs.get("input_spec", None)
+        canonical_sir, names = context.get_sir(sir_name).canonicalize()
+        context.statement_factory.update(canonical_sir)
+        log(
+            3,
+            f"[CompileCache] compile {sir_name} as {canonical_sir.name}, symbols: {names}\n",
+        )
+        wrapper = FallbackWrapper(
             paddle.jit.to_static(
-                compile_sir(context, sir_name),
+                compile_sir(context, canonical_sir.name),
+                input_spec=input_spec,
                 build_strategy=build_strategy,
                 backend=backend,
                 enable_fallback=False,
             ),
-            context.get_sir(sir_name),
+            canonical_sir,
+            context.get_called_sirs(canonical_sir),
+            {
+                "build_strategy": build_strategy,
+                "backend": backend,
+                "input_spec": input_spec,
+            },
         )
+        if SIRCompileService().is_available():
+            SIRCompileService().submit(wrapper, kwargs.get("input_metas", None))
+        return wrapper
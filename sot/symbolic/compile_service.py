@@ -0,0 +1,302 @@
+"""
+THIS FILE IS PRIVATE !!
+
+Build the static programs of the compiled SIRs in worker processes.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Any
+
+import paddle
+from paddle.base.dygraph.base import switch_to_static_graph
+from paddle.jit.dy2static.partial_program import partial_program_from
+from paddle.jit.dy2static.program_translator import ConcreteProgram
+
+from ..utils import Singleton, SIRSerializationError, log
+from .interpreter import compile_sir
+from .sir_serialization import LayerRegistry, deserialize_sir, serialize_sir
+from .statement_ir import SIRRuntimeCache, StatementIRFactory
+
+if TYPE_CHECKING:
+    from ..infer_meta import MetaInfo
+    from .compile_cache import FallbackWrapper
+
+
+def init_worker():
+    # The worker is forked from a thread which may be translating a frame.
+    paddle.framework.core.set_eval_frame(None)
+
+
+def build_program(
+    sir_dumps: list[dict[str, Any]],
+    name: str,
+    input_spec: tuple[tuple[paddle.static.InputSpec, ...]],
+    backend: str | None,
+) -> dict[str, Any]:
+    """
+    Build the concrete program of the SIR name in a worker process, returns
+    the program and the names of its inputs, outputs and parameters, which
+    are loaded by `load_program` in the main process.
+    """
+    from .symbolic_context import SymbolicTraceContext
+
+    sirs = [deserialize_sir(data) for data in sir_dumps]
+    for sir in sirs:
+        StatementIRFactory().update(sir)
+    static_fn = paddle.jit.to_static(
+        compile_sir(SymbolicTraceContext(), name),
+        backend=backend,
+        enable_fallback=False,
+    )
+    concrete_program, _ = static_fn.get_concrete_program(*input_spec)
+
+    def names(structure):
+        return paddle.utils.map_structure(lambda var: var.name, structure)
+
+    return {
+        "program": concrete_program.main_program.desc.serialize_to_string(),
+        "inputs": names(concrete_program.inputs),
+        "outputs": names(concrete_program.outputs),
+        "parameters": [param.name for param in concrete_program.parameters],
+        "name_generator": pickle.dumps(concrete_program.name_generator),
+        "kwargs": {
+            key: value
+            for key, value in concrete_program.kwargs.items()
+            if key not in ("build_strategy", "backend")
+        },
+    }
+
+
+@switch_to_static_graph
+def parse_program(data: bytes) -> paddle.static.Program:
+    return paddle.static.Program.parse_from_string(data)
+
+
+def load_program(
+    shipped: dict[str, Any], wrapper: FallbackWrapper
+) -> tuple[ConcreteProgram, Any]:
+    """
+    Rebuild the concrete program and the partial program built by a worker,
+    whose parameters are replaced by the ones of the layers in this process.
+    """
+    program = parse_program(shipped["program"])
+    block = program.global_block()
+    # The sublayers are registered with the layers.
+    parameters = {
+        param.name: param
+        for layer in list(LayerRegistry().layers.values())
+        for param in [
+            *layer.parameters(include_sublayers=False),
+            *layer.buffers(include_sublayers=False),
+        ]
+    }
+    concrete_program = ConcreteProgram(
+        paddle.utils.map_structure(block.var, shipped["inputs"]),
+        paddle.utils.map_structure(block.var, shipped["outputs"]),
+        [parameters[name] for name in shipped["parameters"]],
+        wrapper.compiled_fn.dygraph_function,
+        pickle.loads(shipped["name_generator"]),
+        program,
+        None,
+        build_strategy=wrapper.compile_kwargs.get("build_strategy")
+        or paddle.static.BuildStrategy(),
+        backend=wrapper.compile_kwargs.get("backend"),
+        **shipped["kwargs"],
+    )
+    partial_program = partial_program_from(concrete_program)
+    partial_program.training = wrapper.compiled_fn._training
+    return concrete_program, partial_program
+
+
+def layer_state(layer: paddle.nn.Layer) -> tuple[bool, ...]:
+    """
+    The state of layer which is used to build its program, i.e. the training
+    mode of its sublayers.
+    """
+    return tuple(sub.training for sub in layer.sublayers(include_self=True))
+
+
+@Singleton
+class SIRCompileService:
+    """
+    Build the static programs of the compiled SIRs in worker processes, so the
+    programs of the SIRs in a frame are built in parallel while the frame is
+    being translated, rather than one by one on their first calls.
+
+    When a SIR is compiled by CompileSIRCache, it's serialized (see
+    `sir_serialization`) with the SIRs it calls and submitted to a pool of
+    forked workers, which inherit the layers of the model, and are forked again
+    if the layers are created or switch the training mode. The program built
+    by a worker is installed in the FallbackWrapper on its first call, or the
+    wrapper builds its program itself if the worker failed or doesn't finish
+    within TIMEOUT seconds, which is about the cost of building a program
+    synchronously, so a stuck worker never stalls the call for long.
+
+    The SIRs whose inputs are unknown, which have free variables, or which
+    can't be serialized are compiled synchronously. Since the workers are
+    forked, it's only enabled on CPU, and not with the ASYNC_TRANSLATION of
+    OpcodeExecutorCache, as forking a process while the other threads hold
+    locks may deadlock the workers. It's disabled by default, set ENABLED to
+    True to enable it.
+
+    Examples:
+        >>> from sot.symbolic.compile_service import SIRCompileService
+        >>> SIRCompileService().ENABLED = True  # doctest: +SKIP
+    """
+
+    ENABLED = False
+    NUM_WORKERS = 2
+    TIMEOUT = 1.0
+
+    def __init__(self):
+        self._executor: ProcessPoolExecutor | None = None
+        # The states of the layers when the workers are forked.
+        self._forked_layers: dict[str, tuple[bool, ...]] = {}
+        # The futures which may be pending, cancelled on shutdown.
+        self._futures: list[Future] = []
+        self.submitted_num = 0
+        self.shipped_num = 0
+        self.fallback_num = 0
+        self.timeout_num = 0
+        self.synchronous_num = 0
+
+    def is_available(self) -> bool:
+        from ..opcode_translator.executor.executor_cache import (
+            OpcodeExecutorCache,
+        )
+
+        return (
+            self.ENABLED
+            and paddle.get_device() == "cpu"
+            and "fork" in multiprocessing.get_all_start_methods()
+            and not OpcodeExecutorCache().ASYNC_TRANSLATION
+        )
+
+    def executor(self, layer_names: set[str]) -> ProcessPoolExecutor:
+        """
+        Returns the pool of workers, which are forked again if some layers are
+        created or changed after they're forked.
+        """
+        layers = LayerRegistry().layers
+        if self._executor is not None and all(
+            name in self._forked_layers
+            and self._forked_layers[name] == layer_state(layers[name])
+            for name in layer_names
+        ):
+            return self._executor
+        if self._executor is not None:
+            log(2, "[CompileService] Fork the workers for changed layers\n")
+            self._executor.shutdown(wait=False)
+        self._forked_layers = {
+            name: layer_state(layer) for name, layer in list(layers.items())
+        }
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.NUM_WORKERS,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=init_worker,
+        )
+        return self._executor
+
+    def submit(
+        self, wrapper: FallbackWrapper, input_metas: list[MetaInfo] | None
+    ):
+        """
+        Build the program of wrapper in a worker, the future is stored in
+        `wrapper.pending_program`.
+        """
+        sirs = [wrapper.SIR, *wrapper.called_sirs]
+        if input_metas is None or any(
+            SIRRuntimeCache().get_free_vars(sir.name) for sir in sirs
+        ):
+            self.synchronous_num += 1
+            return
+        input_spec = wrapper.compile_kwargs.get("input_spec")
+        if input_spec is not None:
+            input_spec = tuple(input_spec)
+        else:
+            input_spec = (tuple(meta.to_input_spec() for meta in input_metas),)
+        try:
+            sir_dumps = [serialize_sir(sir) for sir in sirs]
+        except SIRSerializationError as e:
+            log(
+                2,
+                f"[CompileService] Compile {wrapper.SIR.name} synchronously: {e}\n",
+            )
+            self.synchronous_num += 1
+            return
+        layer_names = {
+            stmt["layer"]
+            for data in sir_dumps
+            for stmt in data["statements"]
+            if stmt["type"] == "layer"
+        }
+        wrapper.pending_program = self.executor(layer_names).submit(
+            build_program,
+            sir_dumps,
+            wrapper.SIR.name,
+            input_spec,
+            wrapper.compile_kwargs.get("backend"),
+        )
+        self._futures = [
+            future for future in self._futures if not future.done()
+        ]
+        self._futures.append(wrapper.pending_program)
+        self.submitted_num += 1
+
+    def install(self, wrapper: FallbackWrapper):
+        """
+        Install the program built by a worker in wrapper, which is left
+        unchanged if the worker failed or is not done within TIMEOUT, then
+        the future is cancelled and the wrapper builds its program itself.
+        """
+        future: Future = wrapper.pending_program
+        wrapper.pending_program = None
+        try:
+            (
+                wrapper.concrete_program,
+                wrapper.partial_program,
+            ) = load_program(future.result(timeout=self.TIMEOUT), wrapper)
+        except FutureTimeoutError:
+            future.cancel()
+            log(
+                1,
+                f"[CompileService] Building {wrapper.SIR.name} in worker timed out, fallback to build it synchronously\n",
+            )
+            self.timeout_num += 1
+            return
+        except Exception as e:
+            log(
+                1,
+                f"[CompileService] Failed to build {wrapper.SIR.name} in worker, fallback to build it synchronously: {type(e).__name__}: {e}\n",
+            )
+            self.fallback_num += 1
+            return
+        self.shipped_num += 1
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number of the programs submitted to the workers, the ones
+        built by the workers, the ones rebuilt after the workers failed or
+        timed out, and the ones not submitted.
+        """
+        return {
+            "submitted": self.submitted_num,
+            "shipped": self.shipped_num,
+            "fallbacks": self.fallback_num,
+            "timeouts": self.timeout_num,
+            "synchronous": self.synchronous_num,
+        }
+
+    def shutdown(self):
+        # NOTE: `cancel_futures` of `Executor.shutdown` requires Python 3.9.
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._forked_layers = {}
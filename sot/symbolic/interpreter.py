@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import weakref
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Callable
 
 import paddle
-from paddle.utils import to_sequence
+from paddle.utils import flatten, to_sequence
 
-from ..utils import InnerError, map_if, map_if_extend
+from ..utils import InnerError, flatten_extend, map_if_extend
 from .statement_ir import SIRRuntimeCache, Symbol
 
 if TYPE_CHECKING:
@@ -61,6 +63,161 @@ def opnum_in_program():
     return len(program.current_block().ops)
 
 
+def lower_structure(
+    structure: Any, slot_of: Callable[[str], int]
+) -> Callable[[list[Any]], Any]:
+    """
+    Lower a nested structure of Symbols and constants, e.g. the inputs of a
+    statement, to a function which builds it from the slots of values.
+
+    Args:
+        structure: The structure to be lowered.
+        slot_of: Returns the index of the slot of a Symbol by its name.
+
+    Returns:
+        A function which takes the slots, and returns the structure with the
+        Symbols replaced by the values in their slots.
+    """
+    if isinstance(structure, Symbol):
+        return itemgetter(slot_of(structure.name))
+    if not any(isinstance(x, Symbol) for x in flatten_extend(structure)):
+        return lambda slots: structure
+    if isinstance(structure, slice):
+        start, stop, step = (
+            lower_structure(x, slot_of)
+            for x in (structure.start, structure.stop, structure.step)
+        )
+        return lambda slots: slice(start(slots), stop(slots), step(slots))
+    if isinstance(structure, dict):
+        items = [
+            (key, lower_structure(value, slot_of))
+            for key, value in structure.items()
+        ]
+        return lambda slots: {key: build(slots) for key, build in items}
+    if type(structure) in (list, tuple):
+        container = type(structure)
+        builds = [lower_structure(x, slot_of) for x in structure]
+        return lambda slots: container([build(slots) for build in builds])
+    # Other containers, e.g. namedtuple, are rebuilt by map_structure.
+    names = {
+        x.name: slot_of(x.name)
+        for x in flatten_extend(structure)
+        if isinstance(x, Symbol)
+    }
+    return lambda slots: replace_symbol(
+        structure, {name: slots[index] for name, index in names.items()}
+    )
+
+
+class LoweredSIR:
+    """
+    A SIR lowered to a flat list of closures, each of which runs a statement
+    on the slots of values. The slots of the inputs and outputs of statements
+    are computed once, so running it costs no lookup of Symbols and no
+    traversal of nested inputs besides building them.
+
+    The ops created by a statement are tagged with its source callstack only
+    if it is recorded, i.e. the statements are traced with LOG_LEVEL >= 3.
+    """
+
+    def __init__(self, SIR: StatementIR):
+        self.slots: dict[str, int] = {}
+        self.steps = [self.lower_statement(stmt) for stmt in SIR.statements]
+        self.build_outputs = lower_structure(SIR.outputs, self.slot_of)
+        # Used to check whether the SIR is changed after lowering.
+        self.version = (len(SIR.statements), SIR.statements_hash)
+
+    def slot_of(self, name: str) -> int:
+        return self.slots.setdefault(name, len(self.slots))
+
+    def lower_statement(
+        self, stmt: Statement
+    ) -> Callable[[Interpreter, list[Any]], None]:
+        build_inputs = lower_structure(stmt.inputs, self.slot_of)
+        run = getattr(Interpreter, stmt.type)
+        store_outputs = self.lower_outputs(stmt.outputs)
+        num_outputs = len(to_sequence(stmt.outputs))
+
+        def step(interpreter: Interpreter, slots: list[Any]):
+            outs = run(interpreter, stmt, build_inputs(slots))
+            if len(to_sequence(outs)) != num_outputs:
+                raise InnerError("Number output mismatch, some error happen.")
+            store_outputs(outs, slots)
+
+        if not stmt.stmt_stack:
+            return step
+
+        def step_with_stack(interpreter: Interpreter, slots: list[Any]):
+            before_stmt_opnum = opnum_in_program()
+            step(interpreter, slots)
+            _append_opstack_between(
+                before_stmt_opnum, opnum_in_program() + 1, stmt.stmt_stack
+            )
+
+        return step_with_stack
+
+    def lower_outputs(self, outputs: Any) -> Callable[[Any, list[Any]], None]:
+        """
+        Lower the outputs of a statement to a function which stores the values
+        returned by the statement into the slots of the Symbols, the values
+        are matched with the Symbols by their positions in outputs.
+        """
+        if isinstance(outputs, Symbol):
+            slot = self.slot_of(outputs.name)
+
+            def store(value, slots):
+                slots[slot] = value
+
+            return store
+        if isinstance(outputs, (list, tuple)):
+            stores = [
+                (index, self.lower_outputs(output))
+                for index, output in enumerate(outputs)
+                if any(isinstance(x, Symbol) for x in flatten(output))
+            ]
+
+            def store(value, slots):
+                for index, store_output in stores:
+                    store_output(value[index], slots)
+
+            return store
+        return lambda value, slots: None
+
+    def run(self, interpreter: Interpreter, state: dict[str, Any]):
+        """
+        Run the statements with the values of Symbols in state, returns the
+        outputs of the SIR.
+        """
+        slots = [None] * len(self.slots)
+        for name, value in state.items():
+            index = self.slots.get(name)
+            if index is not None:
+                slots[index] = value
+        for step in self.steps:
+            step(interpreter, slots)
+        return self.build_outputs(slots)
+
+
+# The lowered SIRs, which are released with their SIRs.
+_lowered_sirs: weakref.WeakKeyDictionary[
+    StatementIR, LoweredSIR
+] = weakref.WeakKeyDictionary()
+
+
+def lower_sir(SIR: StatementIR) -> LoweredSIR:
+    """
+    Returns the LoweredSIR of a SIR, which is cached until the SIR changes.
+    """
+    lowered = _lowered_sirs.get(SIR)
+    if lowered is None or lowered.version != (
+        len(SIR.statements),
+        SIR.statements_hash,
+    ):
+        lowered = LoweredSIR(SIR)
+        _lowered_sirs[SIR] = lowered
+    return lowered
+
+
 class Interpreter:
     """
     Interpreter is used to interpret and execute SIR.
@@ -92,32 +249,7 @@ class Interpreter:
         Returns:
             A list of the Symbol of the StatementIR after execution.
         """
-        SIR = self.get_sir(name)
-        for stmt in SIR.statements:
-            stmt: Statement
-            before_stmt_opnum = opnum_in_program()
-            inputs = replace_symbol(stmt.inputs, state)
-            outs = getattr(self, stmt.type)(stmt, inputs)
-
-            def _set(v, s):
-                state[s.name] = v
-
-            if len(to_sequence(outs)) != len(to_sequence(stmt.outputs)):
-                raise InnerError("Number output mismatch, some error happen.")
-
-            _append_opstack_between(
-                before_stmt_opnum, opnum_in_program() + 1, stmt.stmt_stack
-            )
-
-            map_if(
-                outs,
-                stmt.outputs,
-                pred=lambda v, s: isinstance(s, Symbol),
-                true_fn=lambda v, s: _set(v, s),
-                false_fn=lambda v, s: None,
-            )
-        # fetch outputs
-        return replace_symbol(SIR.outputs, state)
+        return lower_sir(self.get_sir(name)).run(self, state)
 
     def call(self, stmt: Statement, inputs):
         SIR = self.get_sir(stmt.sir_name)
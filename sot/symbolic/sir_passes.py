@@ -0,0 +1,329 @@
+"""
+THIS FILE IS PRIVATE !!
+
+The passes which optimize a StatementIR before it's compiled.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any
+
+import paddle
+
+from ..utils import (
+    Singleton,
+    disabled_sir_passes,
+    flatten_extend,
+    is_pure_api,
+    is_pure_tensor_method,
+    log,
+)
+from .interpreter import replace_symbol
+from .statement_ir import (
+    HASHABLE_CONSTANT_TYPES,
+    ApiStatement,
+    MethodStatement,
+    Statement,
+    StatementIR,
+    Symbol,
+    collect_symbols,
+    structure_key,
+)
+
+
+def is_pure_statement(stmt: Statement) -> bool:
+    """
+    Whether the statement always produces the same outputs for the same inputs
+    without side effects. The layers and the calls of SIR are never pure, and
+    neither are the statements without Symbol outputs, which are only called
+    for their side effects (e.g. `paddle.assign(x, y)`).
+    """
+    if not collect_symbols(stmt.outputs):
+        return False
+    if isinstance(stmt, ApiStatement):
+        return is_pure_api(stmt.api, stmt.inputs[1])
+    if isinstance(stmt, MethodStatement):
+        return is_pure_tensor_method(stmt.method)
+    return False
+
+
+def has_constant_inputs(stmt: Statement) -> bool:
+    """
+    Whether the arguments of the statement are Symbols or constants which
+    are compared by value.
+    """
+    return all(
+        isinstance(x, (Symbol, *HASHABLE_CONSTANT_TYPES))
+        for x in flatten_extend(stmt.inputs)
+    )
+
+
+def rebuild_sir(sir: StatementIR, statements: list[Statement]) -> StatementIR:
+    """
+    Returns a new SIR with the same name, inputs and outputs as sir, which
+    contains the given statements.
+    """
+    new_sir = StatementIR(sir.name)
+    for stmt in statements:
+        new_sir.add_statement(stmt)
+    new_sir.inputs = list(sir.inputs)
+    new_sir.outputs = list(sir.outputs)
+    return new_sir
+
+
+class SIRPass:
+    """
+    The base class of the passes over StatementIR.
+
+    Attributes:
+        name: The name of the pass, which is used to disable it by the
+            environment variable `SOT_DISABLED_SIR_PASSES`.
+    """
+
+    name: str = ""
+
+    def run(self, sir: StatementIR) -> tuple[StatementIR, list[Statement]]:
+        """
+        Optimize the SIR whose outputs are set.
+
+        Returns:
+            The optimized SIR, which may be sir itself if nothing is changed,
+            and the removed (or replaced) statements.
+        """
+        raise NotImplementedError()
+
+
+class DeadStatementElimination(SIRPass):
+    """
+    Remove the pure statements whose outputs are not used by the outputs of
+    the SIR, neither directly nor through other statements.
+    """
+
+    name = "dce"
+
+    def run(self, sir: StatementIR) -> tuple[StatementIR, list[Statement]]:
+        live = {symbol.name for symbol in collect_symbols(sir.outputs)}
+        kept, removed = [], []
+        for stmt in reversed(sir.statements):
+            if is_pure_statement(stmt) and not any(
+                symbol.name in live for symbol in collect_symbols(stmt.outputs)
+            ):
+                removed.append(stmt)
+                continue
+            kept.append(stmt)
+            live.update(symbol.name for symbol in collect_symbols(stmt.inputs))
+        if not removed:
+            return sir, []
+        return rebuild_sir(sir, kept[::-1]), removed[::-1]
+
+
+class CommonSubexpressionElimination(SIRPass):
+    """
+    Remove the pure statements which call the same api (or method) with the
+    same inputs as a previous statement, and use the outputs of the previous
+    one instead.
+
+    The statements involving a Symbol which may be updated in place, i.e.
+    passed to an impure statement or assigned more than once, are skipped,
+    and so are the ones whose outputs are the outputs of the SIR, since the
+    same tensor can't be returned twice without aliasing.
+    """
+
+    name = "cse"
+
+    def run(self, sir: StatementIR) -> tuple[StatementIR, list[Statement]]:
+        output_names = {symbol.name for symbol in collect_symbols(sir.outputs)}
+        mutated_names = set()
+        defined_names = set()
+        for stmt in sir.statements:
+            if not is_pure_statement(stmt):
+                mutated_names.update(
+                    symbol.name for symbol in collect_symbols(stmt.inputs)
+                )
+            for symbol in collect_symbols(stmt.outputs):
+                if symbol.name in defined_names:
+                    mutated_names.add(symbol.name)
+                defined_names.add(symbol.name)
+
+        replaced_names: dict[str, str] = {}
+        seen: dict[Any, Statement] = {}
+        statements, removed = [], []
+        for stmt in sir.statements:
+            if any(
+                symbol.name in replaced_names
+                for symbol in collect_symbols(stmt.inputs)
+            ):
+                stmt = stmt.rename(lambda name: replaced_names.get(name, name))
+            output_symbols = collect_symbols(stmt.outputs)
+            if (
+                not is_pure_statement(stmt)
+                or not has_constant_inputs(stmt)
+                or any(
+                    symbol.name in mutated_names
+                    for symbol in collect_symbols(stmt.inputs) + output_symbols
+                )
+            ):
+                statements.append(stmt)
+                continue
+            # The inputs are compared by their structure rather than its hash,
+            # e.g. `hash(-1) == hash(-2)`.
+            key = (stmt.type, stmt.identity(), structure_key(stmt.inputs))
+            origin = seen.get(key)
+            origin_symbols = (
+                collect_symbols(origin.outputs) if origin is not None else []
+            )
+            if (
+                origin is None
+                or len(origin_symbols) != len(output_symbols)
+                or any(symbol.name in output_names for symbol in output_symbols)
+            ):
+                seen.setdefault(key, stmt)
+                statements.append(stmt)
+                continue
+            for symbol, origin_symbol in zip(output_symbols, origin_symbols):
+                replaced_names[symbol.name] = origin_symbol.name
+            removed.append(stmt)
+        if not removed:
+            return sir, []
+        return rebuild_sir(sir, statements), removed
+
+
+class ConstantFolding(SIRPass):
+    """
+    Evaluate the pure statements whose inputs are all constants, or outputs of
+    other evaluated statements. A statement which uses the outputs of others
+    is replaced by a `paddle.to_tensor` of its value, so a chain of them (e.g.
+    `paddle.arange(6).reshape([2, 3]).astype("float32")`) becomes one constant,
+    and the statements it used are left to DeadStatementElimination.
+
+    Only the tensors of FOLDABLE_DTYPES with at most MAX_NUMEL elements are
+    folded, since the values are embedded in the program.
+    """
+
+    name = "constant_folding"
+    MAX_NUMEL = 1024
+    FOLDABLE_DTYPES = (
+        paddle.float32,
+        paddle.float64,
+        paddle.int32,
+        paddle.int64,
+        paddle.bool,
+    )
+
+    def run(self, sir: StatementIR) -> tuple[StatementIR, list[Statement]]:
+        if not paddle.in_dynamic_mode():
+            return sir, []
+        values: dict[str, paddle.Tensor] = {}
+        statements, removed = [], []
+        for stmt in sir.statements:
+            statements.append(stmt)
+            if not isinstance(stmt.outputs, Symbol) or not (
+                is_pure_statement(stmt) and has_constant_inputs(stmt)
+            ):
+                continue
+            input_symbols = collect_symbols(stmt.inputs)
+            if any(symbol.name not in values for symbol in input_symbols):
+                continue
+            value = self.evaluate(stmt, values)
+            if value is None:
+                continue
+            values[stmt.outputs.name] = value
+            if input_symbols:
+                statements[-1] = ApiStatement(
+                    paddle.to_tensor,
+                    (
+                        (value.numpy(),),
+                        {
+                            "dtype": value.dtype,
+                            "stop_gradient": value.stop_gradient,
+                        },
+                    ),
+                    stmt.outputs,
+                    stmt.stmt_stack,
+                )
+                removed.append(stmt)
+        if not removed:
+            return sir, []
+        return rebuild_sir(sir, statements), removed
+
+    def evaluate(
+        self, stmt: Statement, values: dict[str, paddle.Tensor]
+    ) -> paddle.Tensor | None:
+        """
+        Evaluate the statement in dygraph, returns None if it can't be folded.
+        """
+        args, kwargs = replace_symbol(stmt.inputs, values)
+        try:
+            if isinstance(stmt, ApiStatement):
+                value = stmt.api(*args, **kwargs)
+            else:
+                value = getattr(args[0], stmt.method)(*args[1:], **kwargs)
+        except Exception as e:
+            log(3, f"[SIRPass] Failed to fold {stmt}: {e}\n")
+            return None
+        if (
+            not isinstance(value, paddle.Tensor)
+            or value.dtype not in self.FOLDABLE_DTYPES
+            or value.size > self.MAX_NUMEL
+        ):
+            return None
+        return value
+
+
+@Singleton
+class SIRPassManager:
+    """
+    Run the passes over a StatementIR before it's compiled (and keyed in
+    CompileSIRCache). The passes named in the environment variable
+    `SOT_DISABLED_SIR_PASSES` (separated by commas) are skipped, and the
+    statements removed by each pass are logged and counted.
+
+    Examples:
+        >>> from sot.symbolic.sir_passes import SIRPassManager
+        >>> [sir_pass.name for sir_pass in SIRPassManager().passes]
+        ['constant_folding', 'cse', 'dce']
+    """
+
+    def __init__(self):
+        self.passes: list[SIRPass] = [
+            ConstantFolding(),
+            CommonSubexpressionElimination(),
+            DeadStatementElimination(),
+        ]
+        self.removed_count: Counter[str] = Counter()
+
+    def register(self, sir_pass: SIRPass, index: int | None = None):
+        """
+        Add a pass, which runs after the existing ones unless index is given.
+        """
+        if index is None:
+            self.passes.append(sir_pass)
+        else:
+            self.passes.insert(index, sir_pass)
+
+    def run(self, sir: StatementIR) -> StatementIR:
+        """
+        Run the enabled passes over sir, returns the optimized SIR.
+        """
+        disabled = disabled_sir_passes()
+        for sir_pass in self.passes:
+            if sir_pass.name in disabled:
+                continue
+            sir, removed = sir_pass.run(sir)
+            if removed:
+                self.removed_count[sir_pass.name] += len(removed)
+                log(
+                    2,
+                    f"[SIRPass] {sir_pass.name} removed {len(removed)} statements from {sir.name}:\n"
+                    + "".join(f"    {stmt}\n" for stmt in removed),
+                )
+        return sir
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number of statements removed by each pass.
+        """
+        return dict(self.removed_count)
+
+    def clear(self):
+        self.removed_count.clear()
@@ -0,0 +1,465 @@
+"""
+Serialize StatementIR to a JSON compatible format, which is used to inspect
+the SIRs of a run offline, to diff the SIRs of two runs (e.g. to see why a
+function is recompiled), and to rebuild the SIRs in another process.
+
+The format is stable across processes:
+    - The symbols are named by their canonical names, see `StatementIR.canonicalize`.
+    - The apis are referenced by their qualified names, e.g. `paddle.tensor.math:add`.
+    - The layers are referenced by their `full_name()`, which only depends on
+      the order of creation, and are found in LayerRegistry when deserialized.
+    - The called SIRs are referenced by their names, which depend on the run,
+      so they are compared by the fingerprints of the called SIRs instead.
+    - The constants are tagged by their types if they are not plain JSON.
+
+Usage:
+    python -m sot.symbolic.sir_serialization first.json second.json
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import importlib
+import json
+import sys
+import weakref
+from typing import Any, Callable
+
+import numpy as np
+
+import paddle
+
+from ..utils import Singleton, SIRSerializationError
+from .statement_ir import (
+    ApiStatement,
+    CallStatement,
+    LayerStatement,
+    MethodStatement,
+    Statement,
+    StatementIR,
+    StatementIRFactory,
+    Symbol,
+)
+
+FORMAT_VERSION = 2
+
+# The fields of a serialized SIR which are not compared by `compare_sir_dumps`.
+UNCOMPARED_FIELDS = ("name", "stacks", "sir")
+
+
+class OpaqueConstant:
+    """
+    The placeholder of a constant which can't be serialized, it's only printed
+    and compared by its text, so the SIR containing it can't be run.
+    """
+
+    def __init__(self, type_name: str, text: str):
+        self.type_name = type_name
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"OpaqueConstant({self.type_name}, {self.text!r})"
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, OpaqueConstant)
+            and self.type_name == other.type_name
+            and self.text == other.text
+        )
+
+    def __hash__(self):
+        return hash((self.type_name, self.text))
+
+
+@Singleton
+class LayerRegistry:
+    """
+    The layers which can be referenced by the serialized SIRs, keyed by their
+    `full_name()`. The layers are registered when the SIRs using them are
+    serialized, in another process they should be registered by
+    `register_layers` before the SIRs are deserialized.
+    """
+
+    def __init__(self):
+        self.layers: weakref.WeakValueDictionary[
+            str, paddle.nn.Layer
+        ] = weakref.WeakValueDictionary()
+
+    def register(self, layer: paddle.nn.Layer):
+        for sublayer in layer.sublayers(include_self=True):
+            self.layers[sublayer.full_name()] = sublayer
+
+    def __getitem__(self, key: str) -> paddle.nn.Layer:
+        layer = self.layers.get(key)
+        if layer is None:
+            raise SIRSerializationError(
+                f"Layer {key} is not registered, register the model by `register_layers` first."
+            )
+        return layer
+
+    def clear(self):
+        self.layers.clear()
+
+
+def register_layers(layer: paddle.nn.Layer):
+    """
+    Register the layer and its sublayers, so the serialized SIRs using them can
+    be deserialized.
+    """
+    LayerRegistry().register(layer)
+
+
+def qualified_name(fn: Callable) -> str:
+    """
+    Returns the name of fn, which is resolved by `resolve_qualified_name`.
+    """
+    module = getattr(fn, "__module__", None)
+    if module is None and hasattr(fn, "__objclass__"):
+        # The methods of builtin classes, e.g. paddle.Tensor.__add__
+        module = fn.__objclass__.__module__
+    qualname = getattr(fn, "__qualname__", None)
+    if module is None or qualname is None or "<" in qualname:
+        raise SIRSerializationError(f"{fn} has no qualified name.")
+    name = f"{module}:{qualname}"
+    if resolve_qualified_name(name) is not fn:
+        raise SIRSerializationError(f"{fn} can't be found by its name {name}.")
+    return name
+
+
+def resolve_qualified_name(name: str) -> Any:
+    module_name, _, qualname = name.partition(":")
+    try:
+        obj = importlib.import_module(module_name)
+        for attr in qualname.split("."):
+            obj = getattr(obj, attr)
+    except (ImportError, AttributeError) as e:
+        raise SIRSerializationError(f"Can't resolve {name}: {e}") from e
+    return obj
+
+
+def encode_structure(obj: Any, rename: Callable[[str], str]) -> Any:
+    """
+    Encode a nested structure of Symbols and constants to JSON compatible
+    objects. The lists are encoded as themselves, and the others which are not
+    plain JSON are encoded as a dict with a single key of their type.
+    """
+    if isinstance(obj, Symbol):
+        return {"symbol": rename(obj.name)}
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, list):
+        return [encode_structure(x, rename) for x in obj]
+    if isinstance(obj, tuple):
+        return {"tuple": [encode_structure(x, rename) for x in obj]}
+    if isinstance(obj, dict):
+        return {
+            "dict": [
+                [encode_structure(k, rename), encode_structure(v, rename)]
+                for k, v in obj.items()
+            ]
+        }
+    if isinstance(obj, slice):
+        return {
+            "slice": [
+                encode_structure(x, rename)
+                for x in (obj.start, obj.stop, obj.step)
+            ]
+        }
+    if isinstance(obj, complex):
+        return {"complex": [obj.real, obj.imag]}
+    if isinstance(obj, bytes):
+        return {"bytes": base64.b64encode(obj).decode()}
+    if obj is Ellipsis:
+        return {"ellipsis": None}
+    if isinstance(obj, paddle.dtype):
+        return {"dtype": str(obj)}
+    if isinstance(obj, (np.ndarray, np.generic)):
+        tag = "ndarray" if isinstance(obj, np.ndarray) else "numpy_scalar"
+        array = np.asarray(obj)
+        return {
+            tag: {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "data": base64.b64encode(array.tobytes()).decode(),
+            }
+        }
+    return {"object": [type(obj).__qualname__, str(obj)]}
+
+
+def decode_structure(obj: Any) -> Any:
+    """
+    The inverse of `encode_structure`, the constants which can't be serialized
+    are decoded as OpaqueConstant.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, list):
+        return [decode_structure(x) for x in obj]
+    if not isinstance(obj, dict) or len(obj) != 1:
+        raise SIRSerializationError(f"Invalid serialized object: {obj}")
+    [(tag, value)] = obj.items()
+    if tag == "symbol":
+        return Symbol(value)
+    if tag == "tuple":
+        return tuple(decode_structure(x) for x in value)
+    if tag == "dict":
+        return {decode_structure(k): decode_structure(v) for k, v in value}
+    if tag == "slice":
+        return slice(*(decode_structure(x) for x in value))
+    if tag == "complex":
+        return complex(*value)
+    if tag == "bytes":
+        return base64.b64decode(value)
+    if tag == "ellipsis":
+        return Ellipsis
+    if tag == "dtype":
+        return getattr(paddle, value.rpartition(".")[2])
+    if tag in ("ndarray", "numpy_scalar"):
+        array = np.frombuffer(
+            base64.b64decode(value["data"]), dtype=np.dtype(value["dtype"])
+        ).reshape(value["shape"])
+        return array.copy() if tag == "ndarray" else array[()]
+    if tag == "object":
+        return OpaqueConstant(*value)
+    raise SIRSerializationError(f"Unknown serialized type: {tag}")
+
+
+def serialize_statement(
+    stmt: Statement, rename: Callable[[str], str] = lambda name: name
+) -> dict[str, Any]:
+    """
+    Serialize a statement, whose Symbols are renamed by rename.
+    """
+    data: dict[str, Any] = {"type": stmt.type}
+    if isinstance(stmt, ApiStatement):
+        data["api"] = qualified_name(stmt.api)
+    elif isinstance(stmt, MethodStatement):
+        data["method"] = stmt.method
+    elif isinstance(stmt, CallStatement):
+        data["sir"] = stmt.sir_name
+        data["sir_fingerprint"] = called_sir_fingerprint(stmt.sir_name)
+    elif isinstance(stmt, LayerStatement):
+        layer = stmt.layer()
+        if layer is not None:
+            LayerRegistry().register(layer)
+        data["layer"] = stmt.layer_name
+        data["layer_training"] = list(stmt.layer_training)
+    else:
+        raise SIRSerializationError(f"Unknown statement: {stmt}")
+    data["inputs"] = encode_structure(stmt.inputs, rename)
+    data["outputs"] = encode_structure(stmt.outputs, rename)
+    data["stacks"] = list(stmt.stmt_stack or [])
+    return data
+
+
+def called_sir_fingerprint(sir_name: str) -> str | None:
+    """
+    The fingerprint of the called SIR, which is None if it's released.
+    """
+    try:
+        sir = StatementIRFactory()[sir_name]
+    except KeyError:
+        return None
+    return sir_fingerprint(serialize_sir(sir))
+
+
+def deserialize_statement(data: dict[str, Any]) -> Statement:
+    inputs = decode_structure(data["inputs"])
+    outputs = decode_structure(data["outputs"])
+    stacks = data.get("stacks", [])
+    stmt_type = data["type"]
+    if stmt_type == "api":
+        return ApiStatement(
+            resolve_qualified_name(data["api"]), inputs, outputs, stacks
+        )
+    if stmt_type == "method":
+        return MethodStatement(data["method"], inputs, outputs, stacks)
+    if stmt_type == "call":
+        return CallStatement(data["sir"], inputs, outputs, stacks)
+    if stmt_type == "layer":
+        return LayerStatement(
+            LayerRegistry()[data["layer"]], inputs, outputs, stacks
+        )
+    raise SIRSerializationError(f"Unknown statement type: {stmt_type}")
+
+
+def serialize_sir(sir: StatementIR) -> dict[str, Any]:
+    """
+    Serialize a SIR, whose Symbols are renamed by their canonical names.
+    """
+    rename, _ = sir._canonical_rename()
+    return {
+        "name": sir.name,
+        "inputs": encode_structure(sir.inputs, rename),
+        "outputs": encode_structure(sir.outputs, rename),
+        "statements": [
+            serialize_statement(stmt, rename) for stmt in sir.statements
+        ],
+    }
+
+
+def deserialize_sir(data: dict[str, Any]) -> StatementIR:
+    """
+    Rebuild the SIR, which should be registered by `StatementIRFactory().update`
+    to be compiled or called by other SIRs.
+    """
+    sir = StatementIR(data["name"])
+    for stmt_data in data["statements"]:
+        sir.add_statement(deserialize_statement(stmt_data))
+    sir.inputs = decode_structure(data["inputs"])
+    sir.outputs = decode_structure(data["outputs"])
+    return sir
+
+
+def dump_sirs(path: str, sirs: list[StatementIR] | None = None):
+    """
+    Dump the SIRs to a JSON file, which are all the alive SIRs by default.
+    """
+    if sirs is None:
+        sirs = StatementIRFactory().live_sirs()
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "format_version": FORMAT_VERSION,
+                "sirs": [serialize_sir(sir) for sir in sirs],
+            },
+            f,
+            indent=1,
+        )
+
+
+def read_sir_dump(path: str) -> list[dict[str, Any]]:
+    """
+    Read the serialized SIRs dumped by `dump_sirs`.
+    """
+    with open(path) as f:
+        dump = json.load(f)
+    if dump.get("format_version") != FORMAT_VERSION:
+        raise SIRSerializationError(
+            f"Unsupported format version of {path}: {dump.get('format_version')}"
+        )
+    return dump["sirs"]
+
+
+def load_sirs(path: str, register: bool = True) -> dict[str, StatementIR]:
+    """
+    Rebuild the SIRs dumped by `dump_sirs`, they are registered in
+    StatementIRFactory if register is True.
+    """
+    sirs = {}
+    for data in read_sir_dump(path):
+        sir = deserialize_sir(data)
+        if register:
+            StatementIRFactory().update(sir)
+        sirs[sir.name] = sir
+    return sirs
+
+
+def strip_uncompared(data: Any) -> Any:
+    if isinstance(data, dict):
+        return {
+            k: strip_uncompared(v)
+            for k, v in data.items()
+            if k not in UNCOMPARED_FIELDS
+        }
+    if isinstance(data, list):
+        return [strip_uncompared(x) for x in data]
+    return data
+
+
+def sir_fingerprint(data: dict[str, Any]) -> str:
+    """
+    The digest of the structure of a serialized SIR, which is the same for the
+    SIRs which only differ in names and source callstacks across processes.
+    """
+    return hashlib.sha256(
+        json.dumps(strip_uncompared(data), sort_keys=True).encode()
+    ).hexdigest()
+
+
+def compare_sirs(
+    first: dict[str, Any], second: dict[str, Any], max_diffs: int = 10
+) -> list[str]:
+    """
+    Compare two serialized SIRs structurally, returns the differences.
+    """
+    name = f"{first['name']} vs {second['name']}"
+    diffs = []
+    for field in ("inputs", "outputs"):
+        if first[field] != second[field]:
+            diffs.append(
+                f"{name}: {field} differ: {json.dumps(first[field])} != {json.dumps(second[field])}"
+            )
+    first_stmts = strip_uncompared(first["statements"])
+    second_stmts = strip_uncompared(second["statements"])
+    if len(first_stmts) != len(second_stmts):
+        diffs.append(
+            f"{name}: {len(first_stmts)} statements != {len(second_stmts)} statements"
+        )
+    for i, (first_stmt, second_stmt) in enumerate(
+        zip(first_stmts, second_stmts)
+    ):
+        if len(diffs) >= max_diffs:
+            break
+        if first_stmt != second_stmt:
+            diffs.append(
+                f"{name}: statement {i} differs:\n"
+                f"  - {json.dumps(first_stmt, sort_keys=True)}\n"
+                f"  + {json.dumps(second_stmt, sort_keys=True)}"
+            )
+    return diffs
+
+
+def compare_sir_dumps(
+    first: str | list[dict[str, Any]], second: str | list[dict[str, Any]]
+) -> list[str]:
+    """
+    Compare two dumps of SIRs, which are paths or the results of
+    `read_sir_dump`. The SIRs are paired by names, and the unpaired ones are
+    paired by their structures, since the names of canonical SIRs depend on
+    the hash seed of the process.
+
+    Returns:
+        The differences, which is empty if the dumps are structurally equal.
+    """
+    if isinstance(first, str):
+        first = read_sir_dump(first)
+    if isinstance(second, str):
+        second = read_sir_dump(second)
+    first_sirs = {data["name"]: data for data in first}
+    second_sirs = {data["name"]: data for data in second}
+
+    diffs = []
+    for name in first_sirs.keys() & second_sirs.keys():
+        diffs.extend(compare_sirs(first_sirs.pop(name), second_sirs.pop(name)))
+    unpaired = {}
+    for data in second_sirs.values():
+        unpaired.setdefault(sir_fingerprint(data), []).append(data)
+    for name, data in first_sirs.items():
+        if unpaired.get(sir_fingerprint(data)):
+            unpaired[sir_fingerprint(data)].pop()
+        else:
+            diffs.append(f"{name}: only in the first dump")
+    for same_sirs in unpaired.values():
+        diffs.extend(
+            f"{data['name']}: only in the second dump" for data in same_sirs
+        )
+    return sorted(diffs)
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) != 2:
+        print(__doc__)
+        return 2
+    diffs = compare_sir_dumps(*argv)
+    for diff in diffs:
+        print(diff)
+    print(f"{len(diffs)} differences.")
+    return 1 if diffs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -5,13 +5,125 @@ use interface in symbolic_context.py first.
 """
 from __future__ import annotations
 
+import copy
+import functools
 import weakref
+from collections import ChainMap
 from typing import Any, Callable
 
+import numpy as np
+
 import paddle
 from paddle.utils import is_sequence, map_structure
 
-from ..utils import NameGenerator, OrderedSet, Singleton, flatten_extend
+from ..utils import (
+    NameGenerator,
+    OrderedSet,
+    Singleton,
+    flatten_extend,
+    map_if_extend,
+)
+
+# The prefix of the symbols in a canonical SIR, see `StatementIR.canonicalize`.
+CANONICAL_SYMBOL_PREFIX = "__var_"
+
+# The constants of these types are keyed by value, others are keyed by their
+# text like `str(sir)` does, since their `__eq__` may be based on identity.
+HASHABLE_CONSTANT_TYPES = (
+    bool,
+    int,
+    float,
+    complex,
+    str,
+    bytes,
+    type(None),
+    type(Ellipsis),
+    paddle.dtype,
+)
+
+
+def structure_key(obj: Any, rename: Callable[[str], str] | None = None) -> Any:
+    """
+    The canonical key of a nested structure of Symbols and constants, which
+    is a nested tuple keeping the types and values of the constants, so two
+    structures have equal keys only if they are the same. Compare the keys
+    rather than their hashes, e.g. `hash(-1) == hash(-2)`.
+
+    Args:
+        obj: The structure to be keyed.
+        rename: If given, the Symbols are keyed by the names it returns.
+    """
+    if isinstance(obj, Symbol):
+        return ("Symbol", obj.name if rename is None else rename(obj.name))
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__, *(structure_key(x, rename) for x in obj))
+    if isinstance(obj, dict):
+        return (
+            "dict",
+            *(
+                (structure_key(k, rename), structure_key(v, rename))
+                for k, v in obj.items()
+            ),
+        )
+    if isinstance(obj, slice):
+        return (
+            "slice",
+            structure_key(obj.start, rename),
+            structure_key(obj.stop, rename),
+            structure_key(obj.step, rename),
+        )
+    if isinstance(obj, np.ndarray):
+        # The text of a large array is abbreviated.
+        return ("ndarray", obj.dtype.str, obj.shape, obj.tobytes())
+    if isinstance(obj, (float, complex)):
+        # The text distinguishes 0.0 from -0.0, and nan from each other.
+        return (type(obj).__name__, repr(obj))
+    if isinstance(obj, HASHABLE_CONSTANT_TYPES):
+        return (type(obj).__name__, obj)
+    return (type(obj).__name__, str(obj))
+
+
+class StructureKey:
+    """
+    The structural key of a SIR, which is hashed by the hash folded in
+    `StatementIR.add_statement`, and compared by the canonical structure, so
+    the SIRs whose hashes collide are not taken as the same SIR.
+    """
+
+    __slots__ = ("hash", "structure")
+
+    def __init__(self, hash: int, structure: tuple[Any, ...]):
+        self.hash = hash
+        self.structure = structure
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, StructureKey)
+            and self.hash == other.hash
+            and self.structure == other.structure
+        )
+
+    def __hash__(self):
+        return self.hash
+
+
+def collect_symbols(structure: Any) -> list[Symbol]:
+    """
+    Returns the Symbols in a nested structure, e.g. the inputs of a statement.
+    """
+    return [x for x in flatten_extend(structure) if isinstance(x, Symbol)]
+
+
+def rename_symbols(structure: Any, rename: Callable[[str], str]) -> Any:
+    """
+    Returns a copy of the nested structure whose Symbols are renamed by rename.
+    """
+    return map_if_extend(
+        structure,
+        pred=lambda x: isinstance(x, Symbol),
+        true_fn=lambda x: Symbol(rename(x.name)),
+        false_fn=lambda x: x,
+    )
 
 
 class Symbol:
@@ -65,6 +177,52 @@ class Statement:
             stacks  # a list of string to record the source code callstack.
         )
         self.type = type
+        self._structure_key = None
+
+    def identity(self) -> Any:
+        """
+        The identity of the callee of the statement, used by `structure_key`.
+        """
+        return self.name
+
+    def structure_key(self, rename: Callable[[str], str] | None = None) -> Any:
+        """
+        The canonical key of the type, the callee, the inputs (including the
+        constant arguments) and the outputs of the statement, see
+        `structure_key`.
+
+        Args:
+            rename: If given, the Symbols are keyed by the names it returns,
+                and the result is not cached.
+        """
+        if rename is not None:
+            return (
+                self.type,
+                self.identity(),
+                structure_key(self.inputs, rename),
+                structure_key(self.outputs, rename),
+            )
+        if self._structure_key is None:
+            self._structure_key = self.structure_key(lambda name: name)
+        return self._structure_key
+
+    def structure_hash(self, rename: Callable[[str], str] | None = None) -> int:
+        """
+        The hash of `structure_key`, which may collide, so it's only used to
+        look up the keys.
+        """
+        return hash(self.structure_key(rename))
+
+    def rename(self, rename: Callable[[str], str]) -> Statement:
+        """
+        Returns a copy of the statement whose Symbols are renamed by rename.
+        """
+
+        renamed_stmt = copy.copy(self)
+        renamed_stmt.inputs = rename_symbols(self.inputs, rename)
+        renamed_stmt.outputs = rename_symbols(self.outputs, rename)
+        renamed_stmt._structure_key = None
+        return renamed_stmt
 
     def __str__(self):
         def to_string(inps):
@@ -109,6 +267,9 @@ class ApiStatement(Statement):
         )
         self.api = api
 
+    def identity(self) -> Any:
+        return self.api
+
 
 class MethodStatement(Statement):
     def __init__(
@@ -134,6 +295,17 @@ class LayerStatement(Statement):
             "layer", layer.__class__.__name__, inputs, outputs, stacks
         )
         self.layer = weakref.ref(layer)
+        # The key of the layer in a serialized SIR, see `sir_serialization`.
+        self.layer_name = layer.full_name()
+        # The parameters of the layer are captured in the compiled program.
+        self.layer_id = id(layer)
+        # The program traced in train mode differs from the one in eval mode.
+        self.layer_training = tuple(
+            sublayer.training for sublayer in layer.sublayers(include_self=True)
+        )
+
+    def identity(self) -> Any:
+        return (self.name, self.layer_id, self.layer_training)
 
 
 class StatementIR:
@@ -152,6 +324,13 @@ class StatementIR:
         self.inputs = []  # list of Symbol | PythonObj
         self.outputs = []  # list of Symbol | PythonObj
         self.statements = []  # list of Statement
+        # The canonical names of the symbols, which are numbered by the order
+        # of their first appearance in statements.
+        self.canonical_names: dict[str, str] = {}
+        # The keys of statements with the canonical names, and their hash,
+        # which is folded in `add_statement`.
+        self.statement_keys: list[Any] = []
+        self.statements_hash = hash(())
 
     def __len__(self):
         return len(self.statements)
@@ -161,6 +340,9 @@ class StatementIR:
         new_sir.inputs = list(self.inputs)
         new_sir.outputs = list(self.outputs)
         new_sir.statements = list(self.statements)
+        new_sir.canonical_names = dict(self.canonical_names)
+        new_sir.statement_keys = list(self.statement_keys)
+        new_sir.statements_hash = self.statements_hash
         return new_sir
 
     def add_input(self, input):
@@ -172,6 +354,83 @@ class StatementIR:
     def add_statement(self, statement):
         assert isinstance(statement, Statement)
         self.statements.append(statement)
+        for symbol in collect_symbols((statement.inputs, statement.outputs)):
+            if symbol.name not in self.canonical_names:
+                self.canonical_names[
+                    symbol.name
+                ] = f"{CANONICAL_SYMBOL_PREFIX}{len(self.canonical_names)}"
+        key = statement.structure_key(self.canonical_names.__getitem__)
+        self.statement_keys.append(key)
+        self.statements_hash = hash((self.statements_hash, hash(key)))
+
+    def _canonical_rename(self) -> tuple[Callable[[str], str], ChainMap]:
+        """
+        Returns a function which maps the names of symbols to their canonical
+        names, the symbols which don't appear in statements are numbered
+        after the others, and the mapping it has made.
+        """
+        unseen: dict[str, str] = {}
+
+        def rename(name: str) -> str:
+            canonical_name = self.canonical_names.get(name)
+            if canonical_name is None:
+                canonical_name = unseen.setdefault(
+                    name,
+                    f"{CANONICAL_SYMBOL_PREFIX}{len(self.canonical_names) + len(unseen)}",
+                )
+            return canonical_name
+
+        return rename, ChainMap(self.canonical_names, unseen)
+
+    def structure_key(self) -> StructureKey:
+        """
+        The structural key of the SIR, which is used as the key to cache the
+        compiled function. The symbols are keyed by their canonical names, so
+        the SIRs which only differ in the names of symbols (and of the SIRs)
+        have equal keys. The statements are keyed and hashed incrementally in
+        `add_statement`, so the hash costs O(len(inputs) + len(outputs))
+        rather than rendering the whole SIR to text, and the structures are
+        only compared when the hashes are equal.
+        """
+        rename, _ = self._canonical_rename()
+        inputs_key = structure_key(self.inputs, rename)
+        outputs_key = structure_key(self.outputs, rename)
+        return StructureKey(
+            hash((hash(inputs_key), hash(outputs_key), self.statements_hash)),
+            (inputs_key, outputs_key, tuple(self.statement_keys)),
+        )
+
+    def structure_hash(self) -> int:
+        """
+        The hash of `structure_key`, which may collide, so it's only used to
+        look up the keys.
+        """
+        return self.structure_key().hash
+
+    def canonicalize(self) -> tuple[StatementIR, dict[str, str]]:
+        """
+        Rename the symbols by the order of their first appearance, so the SIRs
+        with the same structure are canonicalized to the same SIR, which can
+        be compiled once and called with the inputs of any of them, since the
+        inputs and outputs are passed by position.
+
+        Returns:
+            The canonical SIR, which is named by its structure key (see
+            `StatementIRFactory.canonical_name`), and the mapping from the
+            canonical names to the names of the symbols in this SIR.
+        """
+        rename, names = self._canonical_rename()
+
+        canonical_sir = StatementIR(
+            StatementIRFactory().canonical_name(self.structure_key())
+        )
+        for stmt in self.statements:
+            canonical_sir.add_statement(stmt.rename(rename))
+        canonical_sir.inputs = rename_symbols(self.inputs, rename)
+        canonical_sir.outputs = rename_symbols(self.outputs, rename)
+        return canonical_sir, {
+            canonical_name: name for name, canonical_name in names.items()
+        }
 
     def analyse_inputs(self):
         used_symbols = OrderedSet()
@@ -184,8 +443,10 @@ class StatementIR:
                 if isinstance(out, Symbol):
                     generated_symbols.add(out)
 
-        input_symbols = sorted(used_symbols, key=lambda x: x.name)
-        return input_symbols
+        # NOTE: The inputs keep the order of their first use rather than being
+        # sorted by names, so the order doesn't depend on the global counter
+        # of symbol names, see `canonicalize`.
+        return list(used_symbols)
 
     def __str__(self):
         strs = []
@@ -211,14 +472,36 @@ class StatementIR:
 class StatementIRFactory:
     """
     It is used to create a StatementIR.
+
+    The SIRs are held weakly, a SIR is alive as long as it's referenced by the
+    SymbolicTraceContext tracing it, a memo of FunctionGraph, or a
+    FallbackWrapper running it (which is held by CompileSIRCache and the
+    cached translations). When a SIR is released, its entry in SIRRuntimeCache
+    is removed too.
     """
 
     def __init__(self):
-        self.cache = {}
+        self.cache: dict[str, weakref.ref[StatementIR]] = {}
         self.name_generator = NameGenerator("SIR_")
+        self.released_count = 0
 
     def __getitem__(self, key):
-        return self.cache[key]
+        sir = self.cache[key]()
+        if sir is None:
+            raise KeyError(key)
+        return sir
+
+    def _register(self, sir: StatementIR):
+        self.cache[sir.name] = weakref.ref(
+            sir, functools.partial(self._release, sir.name)
+        )
+
+    def _release(self, name: str, ref: weakref.ref[StatementIR]):
+        # The name may be registered again by `update`.
+        if self.cache.get(name) is ref:
+            del self.cache[name]
+            SIRRuntimeCache().remove(name)
+            self.released_count += 1
 
     def create(self, input_name=None):
         if input_name:
@@ -227,12 +510,29 @@ class StatementIRFactory:
             name = self.name_generator.next()
 
         sir = StatementIR(name)
-        self.cache[name] = sir
+        self._register(sir)
         return sir
 
     def update(self, stmt_ir):
-        name = stmt_ir.name
-        self.cache[name] = stmt_ir
+        self._register(stmt_ir)
+
+    def canonical_name(self, key: StructureKey) -> str:
+        """
+        Returns the name of the canonical SIR with the structure key, which is
+        named by the hash of key, and suffixed by a number if a living SIR with
+        another structure has the name, so the SIRs whose hashes collide don't
+        replace each other.
+        """
+        base_name = f"__SIR_{key.hash & 0xFFFFFFFFFFFFFFFF:016x}"
+        name = base_name
+        suffix = 0
+        while True:
+            ref = self.cache.get(name)
+            sir = ref() if ref is not None else None
+            if sir is None or sir.structure_key() == key:
+                return name
+            suffix += 1
+            name = f"{base_name}_{suffix}"
 
     def clear(self):
         want_clear = [
@@ -243,6 +543,23 @@ class StatementIRFactory:
         for key in want_clear:
             del self.cache[key]
 
+    def live_sirs(self) -> list[StatementIR]:
+        sirs = (ref() for ref in list(self.cache.values()))
+        return [sir for sir in sirs if sir is not None]
+
+    def memory_report(self) -> dict[str, int]:
+        """
+        Returns the number of the alive SIRs and their statements, the number
+        of the released SIRs, and the number of entries in SIRRuntimeCache.
+        """
+        sirs = self.live_sirs()
+        return {
+            "sirs": len(sirs),
+            "statements": sum(len(sir) for sir in sirs),
+            "released": self.released_count,
+            "runtime_entries": len(SIRRuntimeCache().cache),
+        }
+
 
 @Singleton
 class SIRRuntimeCache:
@@ -296,6 +613,12 @@ class SIRRuntimeCache:
         else:
             self.cache[key] = (None, None, free_vars)
 
+    def remove(self, key: str):
+        """
+        Remove the runtime information of the StatementIR.
+        """
+        self.cache.pop(key, None)
+
     def get_origin_inputs(self, key: str):
         """
         Get the origin inputs of the StatementIR.
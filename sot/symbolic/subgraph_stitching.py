@@ -0,0 +1,407 @@
+"""
+THIS FILE IS PRIVATE !!
+
+Stitch the subgraphs which are split by graph breaks into one program.
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Tuple
+
+import paddle
+
+from ..utils import Singleton, log
+from .sir_passes import is_pure_statement
+from .statement_ir import (
+    CallStatement,
+    LayerStatement,
+    StatementIR,
+    StatementIRFactory,
+    Symbol,
+    collect_symbols,
+    rename_symbols,
+)
+
+if TYPE_CHECKING:
+    from .compile_cache import FallbackWrapper
+
+# The inputs of a fragment, referenced by their positions in the tensors seen
+# in the chain, i.e. the inputs and outputs of the head, and the outputs of the
+# followers before it.
+InputRefs = Tuple[int, ...]
+
+
+def is_stitchable(sir: StatementIR) -> bool:
+    """
+    Whether the SIR can run ahead of the host code before it, and run again if
+    its outputs are not taken, i.e. all statements are pure (see
+    `is_pure_statement`), the layers are in eval mode, and the called SIRs are
+    stitchable. The statements without Symbol outputs, which are only called
+    for their side effects, are never stitchable.
+    """
+    for stmt in sir.statements:
+        if not collect_symbols(stmt.outputs):
+            return False
+        if isinstance(stmt, LayerStatement):
+            # The layers in train mode may update their buffers, e.g. the
+            # running statistics of batch_norm, or draw random numbers.
+            if any(stmt.layer_training):
+                return False
+        elif isinstance(stmt, CallStatement):
+            try:
+                called_sir = StatementIRFactory()[stmt.sir_name]
+            except KeyError:
+                return False
+            if not is_stitchable(called_sir):
+                return False
+        elif not is_pure_statement(stmt):
+            return False
+    return True
+
+
+def stitch_sirs(
+    name: str,
+    head_sir: StatementIR,
+    followers: list[tuple[StatementIR, InputRefs]],
+) -> StatementIR:
+    """
+    Stitch the SIRs of a chain of fragments into one SIR, whose inputs are the
+    inputs of the head, and whose outputs are the outputs of all fragments in
+    order. The inputs of the followers are replaced by the symbols they refer
+    to, and the other symbols of the i-th fragment are prefixed by
+    `__stitch{i}_` to avoid conflicts.
+    """
+
+    def head_rename(name):
+        return f"__stitch0_{name}"
+
+    sir = StatementIR(name)
+    for stmt in head_sir.statements:
+        sir.add_statement(stmt.rename(head_rename))
+    sir.inputs = rename_symbols(head_sir.inputs, head_rename)
+    outputs: list[Symbol] = rename_symbols(head_sir.outputs, head_rename)
+    values = sir.inputs + outputs
+    for index, (follower_sir, refs) in enumerate(followers, 1):
+        input_names = {
+            symbol.name: values[ref].name
+            for symbol, ref in zip(follower_sir.inputs, refs)
+        }
+
+        def rename(name, input_names=input_names, prefix=f"__stitch{index}_"):
+            return input_names.get(name, prefix + name)
+
+        for stmt in follower_sir.statements:
+            sir.add_statement(stmt.rename(rename))
+        follower_outputs = rename_symbols(follower_sir.outputs, rename)
+        outputs += follower_outputs
+        values += follower_outputs
+    sir.outputs = outputs
+    return sir
+
+
+class StitchedGroup:
+    """
+    A chain of fragments run by one fused program, which is called in place of
+    the head, and the outputs of the followers are kept until they're called.
+    """
+
+    def __init__(
+        self,
+        head: FallbackWrapper,
+        followers: list[FallbackWrapper],
+        input_refs: list[InputRefs],
+        fused: FallbackWrapper,
+    ):
+        self.head = head
+        self.followers = followers
+        self.input_refs = input_refs
+        self.fused = fused
+        self.output_slices = []
+        start = len(head.SIR.outputs)
+        for follower in followers:
+            self.output_slices.append(
+                slice(start, start + len(follower.SIR.outputs))
+            )
+            start += len(follower.SIR.outputs)
+        self.misses = 0
+
+
+class PendingOutputs:
+    """
+    The outputs of the followers computed by the fused program of a group,
+    with the states they depend on, which are checked when they're taken.
+    """
+
+    def __init__(self, group: StitchedGroup, inputs, outputs):
+        self.group = group
+        self.index = 0
+        # The same positions as the ones in FragmentTrace.
+        self.values = [*inputs, *outputs]
+        self.versions = [value._inplace_version() for value in self.values]
+        self.outputs = outputs
+        self.grad_enabled = paddle.is_grad_enabled()
+        self.parameter_versions = [
+            [param._inplace_version() for param in parameters_of(follower)]
+            for follower in group.followers
+        ]
+
+    def take(self, wrapper: FallbackWrapper, inputs) -> list | None:
+        """
+        Returns the outputs of wrapper if it's the next follower, and it's
+        called with the same inputs, parameters and grad mode as the ones
+        used by the fused program, otherwise None.
+        """
+        group = self.group
+        index = self.index
+        if group.followers[index] is not wrapper:
+            return None
+        refs = group.input_refs[index]
+        if (
+            len(inputs) != len(refs)
+            or paddle.is_grad_enabled() != self.grad_enabled
+            or any(
+                value is not self.values[ref]
+                or value._inplace_version() != self.versions[ref]
+                for value, ref in zip(inputs, refs)
+            )
+            or [param._inplace_version() for param in parameters_of(wrapper)]
+            != self.parameter_versions[index]
+        ):
+            return None
+        self.index += 1
+        return self.outputs[group.output_slices[index]]
+
+    def done(self) -> bool:
+        return self.index == len(self.group.followers)
+
+
+class FragmentTrace:
+    """
+    The chain of fragments which are called one after another, and each of
+    them only takes the tensors seen in the chain as inputs.
+    """
+
+    def __init__(self, head: FallbackWrapper, inputs, outputs):
+        self.head = head
+        self.values = [*inputs, *outputs]
+        self.chain: list[tuple[FallbackWrapper, InputRefs]] = []
+
+    def find_refs(self, inputs) -> InputRefs | None:
+        positions = {id(value): i for i, value in enumerate(self.values)}
+        refs = tuple(positions.get(id(value)) for value in inputs)
+        if None in refs:
+            return None
+        return refs
+
+    def contains(self, wrapper: FallbackWrapper) -> bool:
+        return wrapper is self.head or any(
+            wrapper is follower for follower, _ in self.chain
+        )
+
+    def append(self, wrapper: FallbackWrapper, refs: InputRefs, outputs):
+        self.chain.append((wrapper, refs))
+        self.values.extend(outputs)
+
+
+def parameters_of(wrapper: FallbackWrapper) -> list[paddle.Tensor]:
+    concrete_program = wrapper.concrete_program
+    if concrete_program is None:
+        return []
+    return list(concrete_program.parameters or [])
+
+
+@Singleton
+class SubgraphStitcher:
+    """
+    Stitch the compiled fragments of a step which are split by graph breaks,
+    so a chain of tiny programs runs as one program.
+
+    The fragments (i.e. FallbackWrappers) called one after another are traced,
+    if a fragment only takes the inputs and outputs of the previous fragments
+    in the chain, i.e. the host code between them only passes the tensors
+    through, it's appended to the chain. Once the same chain is seen
+    STITCH_THRESHOLD times, the SIRs of the chain are stitched into one
+    program, which runs in place of the head of the chain, and the outputs of
+    the followers are returned when they're called with the same tensors
+    (not updated in place), parameters and grad mode. Otherwise it's a miss,
+    the follower runs its own program, and the group is dropped after
+    MAX_MISSES misses.
+
+    The followers which update their inputs in place or draw random numbers by
+    apis and methods are not stitched, since they would run before the host
+    code. It's disabled by default, set ENABLED to True to enable it.
+
+    Examples:
+        >>> from sot.symbolic.subgraph_stitching import SubgraphStitcher
+        >>> SubgraphStitcher().ENABLED = True  # doctest: +SKIP
+    """
+
+    ENABLED = False
+    STITCH_THRESHOLD = 3
+    MAX_STITCHED_FRAGMENTS = 8
+    MAX_MISSES = 3
+
+    def __init__(self):
+        self.groups: weakref.WeakKeyDictionary[
+            FallbackWrapper, StitchedGroup
+        ] = weakref.WeakKeyDictionary()
+        self.observations: weakref.WeakKeyDictionary[
+            FallbackWrapper, Counter
+        ] = weakref.WeakKeyDictionary()
+        self.blocked_heads: weakref.WeakSet[FallbackWrapper] = weakref.WeakSet()
+        self.stitchable: weakref.WeakKeyDictionary[
+            FallbackWrapper, bool
+        ] = weakref.WeakKeyDictionary()
+        self.local = threading.local()
+        self.hit_num = 0
+        self.miss_num = 0
+
+    def __call__(self, wrapper: FallbackWrapper, *args, **kwargs):
+        if kwargs or len(args) != 1:
+            return wrapper.run(*args, **kwargs)
+        inputs = args[0]
+        outputs = self.take_pending(wrapper, inputs)
+        if outputs is None:
+            group = self.groups.get(wrapper)
+            if group is not None:
+                outputs = group.fused.run(inputs)
+                self.local.pending = PendingOutputs(group, inputs, outputs)
+                outputs = outputs[: len(wrapper.SIR.outputs)]
+            else:
+                outputs = wrapper.run(inputs)
+        self.record(wrapper, inputs, outputs)
+        return outputs
+
+    def take_pending(self, wrapper: FallbackWrapper, inputs) -> list | None:
+        pending: PendingOutputs | None = getattr(self.local, "pending", None)
+        if pending is None:
+            return None
+        outputs = pending.take(wrapper, inputs)
+        if outputs is None:
+            self.local.pending = None
+            self.miss(pending.group)
+            return None
+        self.hit_num += 1
+        if pending.done():
+            self.local.pending = None
+        return outputs
+
+    def miss(self, group: StitchedGroup):
+        self.miss_num += 1
+        group.misses += 1
+        log(
+            3,
+            f"[SubgraphStitcher] miss the group of {group.head.SIR.name}\n",
+        )
+        if group.misses >= self.MAX_MISSES:
+            log(
+                2,
+                f"[SubgraphStitcher] drop the group of {group.head.SIR.name} after {group.misses} misses\n",
+            )
+            self.groups.pop(group.head, None)
+            self.observations.pop(group.head, None)
+            self.blocked_heads.add(group.head)
+
+    def record(self, wrapper: FallbackWrapper, inputs, outputs):
+        """
+        Append the call of wrapper to the current chain, or start a new chain
+        from it.
+        """
+        trace: FragmentTrace | None = getattr(self.local, "trace", None)
+        if (
+            trace is not None
+            and len(trace.chain) < self.MAX_STITCHED_FRAGMENTS
+            # A fragment seen again starts the next iteration.
+            and not trace.contains(wrapper)
+            and self.is_stitchable(wrapper)
+        ):
+            refs = trace.find_refs(inputs)
+            if refs is not None:
+                trace.append(wrapper, refs, outputs)
+                self.observe(trace)
+                return
+        self.local.trace = FragmentTrace(wrapper, inputs, outputs)
+
+    def is_stitchable(self, wrapper: FallbackWrapper) -> bool:
+        stitchable = self.stitchable.get(wrapper)
+        if stitchable is None:
+            stitchable = self.stitchable[wrapper] = is_stitchable(wrapper.SIR)
+        return stitchable
+
+    def observe(self, trace: FragmentTrace):
+        head = trace.head
+        if head in self.blocked_heads:
+            return
+        chain = tuple(trace.chain)
+        counter = self.observations.setdefault(head, Counter())
+        counter[chain] += 1
+        group = self.groups.get(head)
+        if counter[chain] < self.STITCH_THRESHOLD or (
+            group is not None and len(group.followers) >= len(chain)
+        ):
+            return
+        if head.partial_program is None or any(
+            follower.partial_program is None for follower, _ in chain
+        ):
+            return
+        self.groups[head] = self.build_group(head, list(chain))
+        # The chains of the old group are not needed anymore.
+        for key in [key for key in counter if len(key) < len(chain)]:
+            del counter[key]
+
+    def build_group(
+        self,
+        head: FallbackWrapper,
+        chain: list[tuple[FallbackWrapper, InputRefs]],
+    ) -> StitchedGroup:
+        from .compile_cache import CompileSIRCache
+        from .symbolic_context import SymbolicTraceContext
+
+        context = SymbolicTraceContext()
+        fused_sir = stitch_sirs(
+            context.TOS.name,
+            head.SIR,
+            [(follower.SIR, refs) for follower, refs in chain],
+        )
+        context.statement_factory.update(fused_sir)
+        fused = CompileSIRCache().value_fn(
+            context, fused_sir.name, **head.compile_kwargs
+        )
+        log(
+            2,
+            f"[SubgraphStitcher] stitch {len(chain) + 1} fragments: "
+            + ", ".join(
+                [head.SIR.name, *(follower.SIR.name for follower, _ in chain)]
+            )
+            + f" -> {fused.SIR.name}\n",
+        )
+        return StitchedGroup(
+            head,
+            [follower for follower, _ in chain],
+            [refs for _, refs in chain],
+            fused,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns the number of the groups, the number of the fragments merged
+        into the programs of their heads, and the hits and misses of the
+        outputs computed ahead.
+        """
+        groups = list(self.groups.values())
+        return {
+            "groups": len(groups),
+            "merged_fragments": sum(len(group.followers) for group in groups),
+            "hits": self.hit_num,
+            "misses": self.miss_num,
+        }
+
+    def clear(self):
+        self.groups.clear()
+        self.observations.clear()
+        self.blocked_heads = weakref.WeakSet()
+        self.local = threading.local()
+        self.hit_num = 0
+        self.miss_num = 0
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from ..utils import log
 from .compile_cache import CompileSIRCache
+from .sir_passes import SIRPassManager
 from .statement_ir import (
     ApiStatement,
     CallStatement,
@@ -92,6 +93,19 @@ class SymbolicTraceContext:
         """
         return self.statement_factory[name]
 
+    def get_called_sirs(self, sir: StatementIR) -> list[StatementIR]:
+        """
+        Get the SIRs called by sir, directly or indirectly.
+        """
+        called_sirs = {}
+        sirs = [sir]
+        while sirs:
+            for stmt in sirs.pop().statements:
+                if stmt.type == "call" and stmt.sir_name not in called_sirs:
+                    called_sirs[stmt.sir_name] = self.get_sir(stmt.sir_name)
+                    sirs.append(called_sirs[stmt.sir_name])
+        return list(called_sirs.values())
+
     def reset_TOS(self):
         """
         Reset the TOS.
@@ -125,22 +139,55 @@ class SymbolicTraceContext:
         dummy_stmt_ir.inputs = []
         return dummy_func, dummy_stmt_ir
 
-    def compile_fn(self, ret_vals, **kwargs):
+    def compile_fn(self, ret_vals, input_metas=None, **kwargs):
         """
         start compile and return the python function, which must can be to_static without errors.
+
+        If some of input_metas (the MetaInfo of the input symbols) have dynamic
+        dimensions, the function is compiled with the InputSpec of them, so one
+        program serves all the sizes of the dynamic dimensions. The compiled
+        function is shared by the SIRs with the same structure and input metas.
         """
         cur_sir: StatementIR = self.TOS
         # step0: if no statement, return a dummy function
         if len(cur_sir.statements) == 0:
             return self.compile_do_nothing(ret_vals)
-        # step1: analyse sir inputs and outputs
-        cur_sir.inputs = cur_sir.analyse_inputs()
+        # step1: optimize sir, and analyse sir inputs and outputs
         # TODO: output analysis
         cur_sir.outputs = ret_vals
+        optimized_sir = SIRPassManager().run(cur_sir)
+        if optimized_sir is not cur_sir:
+            self.replace_TOS(optimized_sir)
+            cur_sir = optimized_sir
+            if len(cur_sir.statements) == 0:
+                return self.compile_do_nothing(ret_vals)
+        cur_sir.inputs = cur_sir.analyse_inputs()
         log(2, "start subgraph compile and execution.\n")
         log(2, self.TOS, "\n")
         # step2: call compile_sir and get python function, third cache is triggered here.
-        static_func = CompileSIRCache()(self, cur_sir.name, **kwargs)
+        # The metas of some inputs may be unknown, e.g. the inputs created
+        # by the SIR passes, then the SIR is compiled by its first call.
+        sir_input_metas = None
+        if input_metas is not None and all(
+            symbol.name in input_metas for symbol in cur_sir.inputs
+        ):
+            sir_input_metas = [
+                input_metas[symbol.name] for symbol in cur_sir.inputs
+            ]
+        input_spec = None
+        if sir_input_metas is not None and any(
+            meta.is_dynamic_shape() for meta in sir_input_metas
+        ):
+            input_spec = [
+                tuple(meta.to_input_spec() for meta in sir_input_metas)
+            ]
+        static_func = CompileSIRCache()(
+            self,
+            cur_sir.name,
+            input_spec=input_spec,
+            input_metas=sir_input_metas,
+            **kwargs,
+        )
         # step3: GC and reset TOS
         # self.reset_TOS()
 
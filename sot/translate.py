@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 import os
-from typing import TYPE_CHECKING, Callable, TypeVar
+import time
+from typing import TYPE_CHECKING, Any, Callable, Sequence, TypeVar
 
 import paddle
 
 from .opcode_translator import eval_frame_callback
-from .utils import GraphLogger, StepInfoManager, StepState, log_do
+from .opcode_translator.executor.executor_cache import OpcodeExecutorCache
+from .utils import (
+    GraphLogger,
+    StepInfo,
+    StepInfoManager,
+    StepState,
+    log,
+    log_do,
+    map_if,
+    set_log_level,
+)
 
 if TYPE_CHECKING:
     from typing_extensions import ParamSpec
@@ -15,7 +26,7 @@ if TYPE_CHECKING:
     R = TypeVar("R")
 
 # Temporarily set the default log level to 2 to get more information in CI log.
-os.environ["LOG_LEVEL"] = os.getenv("LOG_LEVEL", "2")
+set_log_level(int(os.getenv("LOG_LEVEL", "2")))
 
 
 def symbolic_translate(fn: Callable[P, R], **kwargs) -> Callable[P, R]:
@@ -113,3 +124,103 @@ def symbolic_translate(fn: Callable[P, R], **kwargs) -> Callable[P, R]:
                 )
 
     return impl
+
+
+# The max number of calls to warm up fn with a spec, which is enough for the
+# cost model to make a decision, see `StepInfo`.
+MAX_WARMUP_CALLS = StepInfo.COLLECT_INFO_MAX_STEP + StepInfo.REQUIRED_SOT_INFOS
+
+
+def create_warmup_input(spec: paddle.static.InputSpec) -> paddle.Tensor:
+    """
+    Create a zero tensor of spec, whose stop_gradient is the one of spec.
+
+    NOTE: The stop_gradient of InputSpec is False by default, while the one
+    of the tensors created by most APIs is True. The tensors are guarded by
+    stop_gradient, so spec should set it as the real inputs.
+    """
+    if any(dim is None or dim < 0 for dim in spec.shape):
+        raise ValueError(
+            f"The shape of {spec} should be static to warm up, use a representative shape instead."
+        )
+    tensor = paddle.zeros(spec.shape, dtype=spec.dtype)
+    tensor.stop_gradient = spec.stop_gradient
+    return tensor
+
+
+def warmup(
+    fn: Callable, input_specs: Sequence[Sequence[Any]], **kwargs
+) -> list[dict[str, Any]]:
+    """
+    Translate and compile fn ahead of time for a list of representative
+    inputs, so the calls of `symbolic_translate(fn)` with the inputs of the
+    same metas hit the cache rather than paying for the translation.
+
+    For each spec, fn is called until it doesn't need new translations (the
+    background translations are waited for if ASYNC_TRANSLATION is set) and,
+    if the cost model is enabled, until the cost model decides whether to run
+    fn in SOT or dygraph, at most MAX_WARMUP_CALLS times.
+
+    Args:
+        fn: The function to warm up.
+        input_specs: The positional arguments of fn for each call, in which
+            the InputSpecs are replaced by zero tensors of their static shapes
+            and stop_gradient. The stop_gradient of InputSpec is False by
+            default, set it to True for the inputs which don't require
+            gradients (e.g. the tensors created by `paddle.rand`), otherwise
+            the calls with them miss the cache.
+        kwargs: The arguments passed to `symbolic_translate`.
+
+    Returns:
+        The reports of the specs, each has the number of calls and the new
+        translations, the time of the first call and the last call in seconds,
+        and the state of the cost model.
+
+    Examples:
+        >>> # doctest: +SKIP("Cound not get source code of function foo."")
+        >>> import paddle
+        >>> from sot.translate import warmup
+        >>> def foo(x: paddle.Tensor):
+        ...     return x + 1
+        >>> reports = warmup(
+        ...     foo,
+        ...     [[paddle.static.InputSpec([2, 3], "float32", stop_gradient=True)]],
+        ... )
+        >>> [report["translations"] for report in reports]
+        [1]
+    """
+    translated_fn = symbolic_translate(fn, **kwargs)
+    executor_cache = OpcodeExecutorCache()
+    reports = []
+    for spec in input_specs:
+        args = map_if(
+            list(spec),
+            pred=lambda x: isinstance(x, paddle.static.InputSpec),
+            true_fn=create_warmup_input,
+            false_fn=lambda x: x,
+        )
+        translate_count = executor_cache.translate_count
+        call_times = []
+        while len(call_times) < MAX_WARMUP_CALLS:
+            last_translate_count = executor_cache.translate_count
+            start_time = time.perf_counter()
+            translated_fn(*args)
+            call_times.append(time.perf_counter() - start_time)
+            executor_cache.wait_background_translations()
+            state = StepInfoManager().step_record[fn.__code__].state
+            if (
+                executor_cache.translate_count == last_translate_count
+                and state != StepState.COLLECT_INFO
+            ):
+                break
+        report = {
+            "spec": str(spec),
+            "calls": len(call_times),
+            "translations": executor_cache.translate_count - translate_count,
+            "first_call": call_times[0],
+            "last_call": call_times[-1],
+            "state": state.name,
+        }
+        log(1, f"[Warmup] {fn.__name__}: {report}\n")
+        reports.append(report)
+    return reports
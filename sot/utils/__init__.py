@@ -3,12 +3,15 @@ from .exceptions import (  # noqa: F401
     BreakGraphError,
     FallbackError,
     InnerError,
+    SIRSerializationError,
     inner_error_default_handler,
 )
 from .magic_methods import magic_method_builtin_dispatch  # noqa: F401
 from .paddle_api_config import (  # noqa: F401
     is_break_graph_tensor_methods,
     is_inplace_api,
+    is_pure_api,
+    is_pure_tensor_method,
     paddle_tensor_methods,
 )
 from .utils import (  # noqa: F401
@@ -19,11 +22,14 @@ from .utils import (  # noqa: F401
     ResumeFnNameFactory,
     Singleton,
     SotUndefinedVar,
+    StepInfo,
     StepInfoManager,
     StepState,
+    check_infer_meta_rules,
     cost_model,
     count_if,
     current_tmp_name_records,
+    disabled_sir_passes,
     execute_time,
     flatten_extend,
     get_unbound_method,
@@ -38,11 +44,16 @@ from .utils import (  # noqa: F401
     list_find_index_by_id,
     log,
     log_do,
+    log_enabled,
+    log_level,
     map_if,
     map_if_extend,
     meta_str,
     min_graph_size,
     no_eval_frame,
+    set_log_level,
     show_trackers,
+    static_program_lock,
     tmp_name_guard,
+    translation_cache_dir,
 )
@@ -21,6 +21,10 @@ class HasNoAttributeError(InnerError):
     pass
 
 
+class SIRSerializationError(InnerError):
+    pass
+
+
 class FallbackError(SotErrorBase):
     def __init__(self, msg, disable_eval_frame=False):
         super().__init__(msg)
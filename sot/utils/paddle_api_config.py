@@ -8,6 +8,238 @@ def is_inplace_api(func):
     return func in inplace_apis
 
 
+# The names of the apis and tensor methods which always return the same
+# outputs for the same inputs without side effects, the others (e.g. the ones
+# drawing random numbers, updating their inputs or running collectives) are
+# never taken as pure.
+_pure_op_names = {
+    # math
+    "add",
+    "subtract",
+    "multiply",
+    "divide",
+    "floor_divide",
+    "remainder",
+    "mod",
+    "pow",
+    "maximum",
+    "minimum",
+    "fmax",
+    "fmin",
+    "abs",
+    "neg",
+    "exp",
+    "expm1",
+    "log",
+    "log2",
+    "log10",
+    "log1p",
+    "sqrt",
+    "rsqrt",
+    "square",
+    "sign",
+    "reciprocal",
+    "floor",
+    "ceil",
+    "round",
+    "trunc",
+    "sin",
+    "cos",
+    "tan",
+    "asin",
+    "acos",
+    "atan",
+    "sinh",
+    "cosh",
+    "tanh",
+    "erf",
+    "clip",
+    "scale",
+    "lerp",
+    "matmul",
+    "mm",
+    "bmm",
+    "dot",
+    "outer",
+    "einsum",
+    # reduction
+    "sum",
+    "mean",
+    "max",
+    "min",
+    "amax",
+    "amin",
+    "prod",
+    "all",
+    "any",
+    "argmax",
+    "argmin",
+    "cumsum",
+    "cumprod",
+    "logsumexp",
+    "norm",
+    "std",
+    "var",
+    # comparison and logic
+    "equal",
+    "not_equal",
+    "less_than",
+    "less_equal",
+    "greater_than",
+    "greater_equal",
+    "logical_and",
+    "logical_or",
+    "logical_not",
+    "logical_xor",
+    "isnan",
+    "isinf",
+    "isfinite",
+    "where",
+    # shape and indexing
+    "reshape",
+    "transpose",
+    "flatten",
+    "squeeze",
+    "unsqueeze",
+    "concat",
+    "stack",
+    "split",
+    "chunk",
+    "unbind",
+    "expand",
+    "expand_as",
+    "broadcast_to",
+    "tile",
+    "flip",
+    "roll",
+    "gather",
+    "gather_nd",
+    "index_select",
+    "masked_select",
+    "slice",
+    "strided_slice",
+    "tril",
+    "triu",
+    "topk",
+    "sort",
+    "argsort",
+    "one_hot",
+    "cast",
+    "astype",
+    "numel",
+    "shape",
+    "t",
+    # creation
+    "to_tensor",
+    "zeros",
+    "ones",
+    "full",
+    "zeros_like",
+    "ones_like",
+    "full_like",
+    "arange",
+    "linspace",
+    "eye",
+    # activation and nn
+    "relu",
+    "relu6",
+    "leaky_relu",
+    "elu",
+    "gelu",
+    "silu",
+    "swish",
+    "mish",
+    "sigmoid",
+    "hardsigmoid",
+    "hardswish",
+    "hardtanh",
+    "softplus",
+    "softsign",
+    "softmax",
+    "log_softmax",
+    "linear",
+    "conv1d",
+    "conv2d",
+    "conv3d",
+    "max_pool1d",
+    "max_pool2d",
+    "avg_pool1d",
+    "avg_pool2d",
+    "adaptive_avg_pool1d",
+    "adaptive_avg_pool2d",
+    "adaptive_max_pool2d",
+    "layer_norm",
+    "normalize",
+    "embedding",
+    "pad",
+    "interpolate",
+    "cross_entropy",
+    "mse_loss",
+    "l1_loss",
+}
+
+_pure_api_modules = [paddle, paddle.nn.functional, paddle.linalg]
+
+_pure_apis = {
+    getattr(module, name)
+    for module in _pure_api_modules
+    for name in _pure_op_names
+    if callable(getattr(module, name, None))
+}
+
+_pure_magic_methods = {
+    "__add__",
+    "__radd__",
+    "__sub__",
+    "__rsub__",
+    "__mul__",
+    "__rmul__",
+    "__div__",
+    "__rdiv__",
+    "__truediv__",
+    "__rtruediv__",
+    "__floordiv__",
+    "__mod__",
+    "__pow__",
+    "__rpow__",
+    "__matmul__",
+    "__neg__",
+    "__abs__",
+    "__invert__",
+    "__and__",
+    "__or__",
+    "__xor__",
+    "__eq__",
+    "__ne__",
+    "__lt__",
+    "__le__",
+    "__gt__",
+    "__ge__",
+    "__getitem__",
+}
+
+
+def is_pure_api(func, kwargs=None):
+    """
+    Whether the api always returns the same outputs for the same inputs
+    without side effects, so it can be deduplicated or removed if unused. Only
+    the known pure apis are pure.
+    """
+    if func not in _pure_apis:
+        return False
+    return not kwargs or all(
+        kwargs.get(key) is None for key in ("out", "output")
+    )
+
+
+def is_pure_tensor_method(name):
+    """
+    Whether the tensor method always returns the same outputs for the same
+    inputs without side effects, see `is_pure_api`.
+    """
+    return name in _pure_magic_methods or name in _pure_op_names
+
+
 def get_tensor_methods():
     return [
         member_name
@@ -3,6 +3,7 @@ from __future__ import annotations
 import builtins
 import inspect
 import os
+import threading
 import time
 import types
 import weakref
@@ -35,6 +36,29 @@ def min_graph_size():
     return int(os.environ.get("MIN_GRAPH_SIZE", 10))
 
 
+def translation_cache_dir():
+    return os.environ.get("SOT_TRANSLATION_CACHE_DIR", "")
+
+
+def check_infer_meta_rules():
+    return os.environ.get("SOT_CHECK_INFER_META_RULES", "0") == "1"
+
+
+# The default main program of paddle is shared by all threads, so the static
+# programs are built under this lock, i.e. the programs which infer metas in
+# a background translation, and the ones built on the first calls of the
+# compiled SIRs in the main thread.
+static_program_lock = threading.RLock()
+
+
+def disabled_sir_passes():
+    return {
+        name.strip()
+        for name in os.environ.get("SOT_DISABLED_SIR_PASSES", "").split(",")
+        if name.strip()
+    }
+
+
 class Singleton(Generic[T]):
     def __init__(self, cls: type[T]):
         self._cls = cls
@@ -104,15 +128,37 @@ class ResumeFnNameFactory:
         return name
 
 
+_log_level: int | None = None
+
+
+def log_level() -> int:
+    """
+    Returns LOG_LEVEL, which is read from the environment only once, since
+    it's checked on the hot paths, use `set_log_level` to change it.
+    """
+    global _log_level
+    if _log_level is None:
+        _log_level = int(os.environ.get("LOG_LEVEL", "0"))
+    return _log_level
+
+
+def set_log_level(level: int):
+    global _log_level
+    os.environ["LOG_LEVEL"] = str(level)
+    _log_level = level
+
+
 def log(level, *args):
-    cur_level = int(os.environ.get("LOG_LEVEL", "0"))
-    if level <= cur_level:
+    if level <= log_level():
         print(*args, end="")
 
 
+def log_enabled(level):
+    return level <= log_level()
+
+
 def log_do(level, fn):
-    cur_level = int(os.environ.get("LOG_LEVEL", "0"))
-    if level <= cur_level:
+    if level <= log_level():
         fn()
 
 
@@ -232,6 +278,8 @@ class Cache:
         else:
             self.cache = WeakValueDictionary()
         self.hit_num = 0
+        self.miss_num = 0
+        self.value_time = 0.0
 
     def __call__(self, *args, **kwargs):
         cache_key = self.key_fn(*args, **kwargs)
@@ -241,13 +289,29 @@ class Cache:
             log(5, "cache hit: ", cache_key, "\n")
             self.hit_num += 1
             return self.cache[cache_key]
+        self.miss_num += 1
+        start_time = time.perf_counter()
         value = self.value_fn(*args, **kwargs)
+        self.value_time += time.perf_counter() - start_time
         self.cache[cache_key] = value
         return value
 
     def clear(self):
         self.cache.clear()
         self.hit_num = 0
+        self.miss_num = 0
+        self.value_time = 0.0
+
+    def stats(self):
+        """
+        Returns the hits, misses, size and the time (in seconds) spent on computing values of the cache.
+        """
+        return {
+            "hits": self.hit_num,
+            "misses": self.miss_num,
+            "size": len(self.cache),
+            "value_time": self.value_time,
+        }
 
     def key_fn(self, *args, **kwargs):
         raise NotImplementedError()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot import symbolic_translate
+from sot.opcode_translator.executor import executor_cache
+from sot.symbolic.compile_cache import FallbackWrapper
+from sot.symbolic.interpreter import compile_sir
+from sot.symbolic.statement_ir import MethodStatement, Symbol
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+from sot.utils import StepInfoManager, static_program_lock
+
+
+def foo(x: paddle.Tensor, y: int):
+    x = x + y
+    return x * 2
+
+
+def bar(x: paddle.Tensor):
+    return x - 1
+
+
+def baz(x: paddle.Tensor, ys: list):
+    return x + ys[0]
+
+
+def build_wrapper():
+    context = SymbolicTraceContext()
+    sir = context.TOS
+    sir.add_statement(
+        MethodStatement("__add__", ((Symbol("x"), 1), {}), Symbol("y"), [])
+    )
+    sir.inputs = [Symbol("x")]
+    sir.outputs = [Symbol("y")]
+    return FallbackWrapper(
+        paddle.jit.to_static(
+            compile_sir(context, sir.name), enable_fallback=False
+        ),
+        sir,
+    )
+
+
+class TestAsyncTranslation(TestCaseBase):
+    def test_run_dygraph_while_translating(self):
+        x = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, ASYNC_TRANSLATION=True
+        ):
+            self.assert_results(foo, x, 1)
+            ctx.wait_background_translations()
+            self.assertEqual(ctx.translate_count, 1)
+            self.assertEqual(len(ctx.cache[foo.__code__]), 1)
+            self.assert_results(foo, x, 1)
+            self.assertEqual(ctx.code_stats[foo.__code__].hits, 1)
+            # A miss is translated in background too.
+            self.assert_results(foo, x, 2)
+            ctx.wait_background_translations()
+            self.assert_results(foo, x, 2)
+            self.assertEqual(ctx.translate_count, 2)
+            self.assertEqual(ctx.code_stats[foo.__code__].hits, 2)
+
+    def test_bounded_pending_translations(self):
+        real_start_translate = executor_cache.start_translate
+        started = threading.Event()
+        resume = threading.Event()
+
+        def blocked_start_translate(frame, **kwargs):
+            started.set()
+            resume.wait()
+            return real_start_translate(frame, **kwargs)
+
+        x = paddle.to_tensor(1.0)
+        with patch(
+            "sot.opcode_translator.executor.executor_cache.start_translate",
+            blocked_start_translate,
+        ), test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, ASYNC_TRANSLATION=True, MAX_BACKGROUND_TRANSLATIONS=1
+        ):
+            self.assert_results(foo, x, 1)
+            started.wait()
+            # foo is being translated, so bar is not scheduled.
+            self.assert_results(bar, x)
+            self.assert_results(foo, x, 1)
+            self.assertEqual(list(ctx._pending_translations), [foo.__code__])
+            resume.set()
+            ctx.wait_background_translations()
+            self.assertEqual(ctx.translate_count, 1)
+            self.assert_results(bar, x)
+            ctx.wait_background_translations()
+            self.assertEqual(ctx.translate_count, 2)
+
+    def test_failed_translation_falls_back(self):
+        def failed_start_translate(frame, **kwargs):
+            raise RuntimeError("translation failed")
+
+        x = paddle.to_tensor(1.0)
+        with patch(
+            "sot.opcode_translator.executor.executor_cache.start_translate",
+            failed_start_translate,
+        ), test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, ASYNC_TRANSLATION=True
+        ):
+            self.assert_results(foo, x, 1)
+            ctx.wait_background_translations()
+            self.assertEqual(
+                symbolic_translate(foo)(x, 1).item(), foo(x, 1).item()
+            )
+            self.assertIn(
+                "RuntimeError: translation failed",
+                ctx.code_stats[foo.__code__].fallback_reasons,
+            )
+
+    def test_first_call_while_translating(self):
+        real_start_translate = executor_cache.start_translate
+        started = threading.Event()
+        resume = threading.Event()
+        order = []
+
+        def blocked_start_translate(frame, **kwargs):
+            # The translation is building a static program.
+            with static_program_lock:
+                started.set()
+                resume.wait()
+                order.append("translation")
+            return real_start_translate(frame, **kwargs)
+
+        wrapper = build_wrapper()
+        x = paddle.to_tensor(1.0)
+        with patch.object(
+            executor_cache, "start_translate", blocked_start_translate
+        ), test_instruction_translator_cache_context() as ctx, patch.object(
+            ctx, "ASYNC_TRANSLATION", True
+        ):
+            self.assert_results(bar, x)
+            started.wait()
+            timer = threading.Timer(0.1, resume.set)
+            timer.start()
+            # The program of wrapper is built after the one of translation.
+            with StepInfoManager().step_guard(
+                self.test_first_call_while_translating.__code__
+            ):
+                (out,) = wrapper((x,))
+            order.append("first call")
+            timer.join()
+            np.testing.assert_allclose(out.numpy(), (x + 1).numpy())
+            self.assertEqual(order, ["translation", "first call"])
+            ctx.wait_background_translations()
+            self.assert_results(bar, x)
+            self.assertEqual(ctx.code_stats[bar.__code__].hits, 1)
+
+    def test_mutable_locals_translated_synchronously(self):
+        x = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx, patch.object(
+            ctx, "ASYNC_TRANSLATION", True
+        ):
+            # The list is shared with the running frame.
+            self.assert_results(baz, x, [1])
+            self.assertEqual(ctx.translate_count, 1)
+            self.assertEqual(ctx._pending_translations, {})
+            self.assertEqual(len(ctx.cache[baz.__code__]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot import symbolic_translate
+
+
+def foo(x: int, y: paddle.Tensor):
+    return x + y
+
+
+class TestCacheEviction(TestCaseBase):
+    def test_lru_eviction(self):
+        y = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, MAX_CACHE_SIZE=3
+        ):
+            self.assert_results(foo, 0, y)
+            self.assert_results(foo, 1, y)
+            self.assert_results(foo, 2, y)
+            # hit 0, so 1 becomes the least recently used entry
+            self.assert_results(foo, 0, y)
+            self.assertEqual(ctx.translate_count, 3)
+            self.assert_results(foo, 3, y)
+            self.assertEqual(len(ctx.cache[foo.__code__]), 3)
+            self.assertEqual(len(ctx.guard_trees[foo.__code__]), 3)
+            self.assert_results(foo, 0, y)
+            self.assertEqual(ctx.translate_count, 4)
+            self.assert_results(foo, 1, y)
+            self.assertEqual(ctx.translate_count, 5)
+
+    def test_lfu_eviction(self):
+        y = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, MAX_CACHE_SIZE=2, EVICTION_POLICY="lfu"
+        ):
+            self.assert_results(foo, 0, y)
+            self.assert_results(foo, 0, y)
+            self.assert_results(foo, 1, y)
+            # 1 is used later but less frequently, so it is evicted
+            self.assert_results(foo, 2, y)
+            self.assertEqual(ctx.translate_count, 3)
+            self.assert_results(foo, 0, y)
+            self.assertEqual(ctx.translate_count, 3)
+            self.assert_results(foo, 1, y)
+            self.assertEqual(ctx.translate_count, 4)
+
+    def test_global_budget(self):
+        def bar(x: int, y: paddle.Tensor):
+            return x - y
+
+        y = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, MAX_TOTAL_CACHE_SIZE=3
+        ):
+            self.assert_results(foo, 0, y)
+            self.assert_results(bar, 0, y)
+            self.assert_results(foo, 1, y)
+            self.assert_results(bar, 1, y)
+            self.assertEqual(ctx.total_size(), 3)
+            self.assertEqual(len(ctx.cache[foo.__code__]), 1)
+
+
+class TestRecompileStorm(TestCaseBase):
+    def test_pin_to_dygraph(self):
+        y = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, RECOMPILE_STORM_THRESHOLD=3
+        ):
+            for x in range(10):
+                self.assert_results(foo, x, y)
+            self.assertEqual(ctx.translate_count, 3)
+            self.assertIn(foo.__code__, ctx.pinned_codes)
+            self.assertIn("frame.f_locals['x']", ctx.pinned_codes[foo.__code__])
+
+    def test_hit_resets_streak(self):
+        y = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, RECOMPILE_STORM_THRESHOLD=3
+        ):
+            for x in range(10):
+                self.assert_results(foo, x, y)
+                self.assert_results(foo, x, y)
+            self.assertEqual(ctx.translate_count, 10)
+            self.assertNotIn(foo.__code__, ctx.pinned_codes)
+
+    def test_pinned_code_runs(self):
+        y = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, RECOMPILE_STORM_THRESHOLD=2
+        ):
+            for x in range(5):
+                out = symbolic_translate(foo)(x, y)
+                self.assertEqual(out.item(), x + 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import unittest
+
+from test_case_base import (
+    TestCaseBase,
+    strict_mode_guard,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot.opcode_translator.executor.executor_cache import code_location
+
+
+def foo(x: paddle.Tensor, y: int):
+    return x + y
+
+
+def numpy_add(x: paddle.Tensor, y: paddle.Tensor):
+    return paddle.to_tensor(x.numpy() + y.numpy())
+
+
+class TestCacheStats(TestCaseBase):
+    def test_code_stats(self):
+        x = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx:
+            self.assert_results(foo, x, 1)
+            self.assert_results(foo, x, 1)
+            self.assert_results(foo, x, 2)
+            self.assert_results(foo, x, 1)
+            stats = ctx.get_stats()
+            foo_stats = stats["codes"][code_location(foo.__code__)]
+            self.assertEqual(foo_stats["hits"], 2)
+            self.assertEqual(foo_stats["misses"], 1)
+            self.assertEqual(foo_stats["translations"], 2)
+            self.assertEqual(foo_stats["entries"], 2)
+            self.assertGreater(foo_stats["translate_time"], 0)
+            self.assertGreater(foo_stats["guard_time"], 0)
+            self.assertEqual(stats["total"]["translations"], 2)
+            self.assertIn("CompileSIRCache", stats["caches"])
+            self.assertIn("InferMetaCache", stats["caches"])
+            self.assertIn("LayerInferMetaCache", stats["caches"])
+            self.assertEqual(json.loads(ctx.get_stats_json()), stats)
+
+    @strict_mode_guard(0)
+    def test_fallback_reasons(self):
+        x = paddle.to_tensor([1.0])
+        with test_instruction_translator_cache_context() as ctx:
+            self.assert_results(numpy_add, x, x)
+            reasons = ctx.get_stats()["total"]["fallback_reasons"]
+            self.assertTrue(
+                any(reason.startswith("FallbackError") for reason in reasons)
+            )
+
+    def test_clear(self):
+        x = paddle.to_tensor(1.0)
+        with test_instruction_translator_cache_context() as ctx:
+            self.assert_results(foo, x, 1)
+            ctx.clear()
+            self.assertEqual(ctx.get_stats()["codes"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import unittest
+from concurrent.futures import Future
+from unittest.mock import patch
+
+import numpy as np
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot import symbolic_translate
+from sot.opcode_translator.executor.executor_cache import OpcodeExecutorCache
+from sot.symbolic.compile_cache import FallbackWrapper
+from sot.symbolic.compile_service import SIRCompileService
+from sot.symbolic.interpreter import compile_sir
+from sot.symbolic.statement_ir import MethodStatement, Symbol
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+from sot.utils import StepInfoManager
+
+
+def build_wrapper():
+    context = SymbolicTraceContext()
+    sir = context.TOS
+    sir.add_statement(
+        MethodStatement("__add__", ((Symbol("x"), 1), {}), Symbol("y"), [])
+    )
+    sir.inputs = [Symbol("x")]
+    sir.outputs = [Symbol("y")]
+    return FallbackWrapper(
+        paddle.jit.to_static(
+            compile_sir(context, sir.name), enable_fallback=False
+        ),
+        sir,
+    )
+
+
+class Net(paddle.nn.Layer):
+    def __init__(self):
+        super().__init__()
+        self.linear1 = paddle.nn.Linear(4, 8)
+        self.norm = paddle.nn.BatchNorm1D(8)
+        self.linear2 = paddle.nn.Linear(8, 2)
+
+    def forward(self, x: paddle.Tensor):
+        y = paddle.nn.functional.relu(self.norm(self.linear1(x)))
+        print("graph break")
+        return self.linear2(y) * 2
+
+
+def net_call(x: paddle.Tensor, net: paddle.nn.Layer):
+    return net(x)
+
+
+class TestCompileService(TestCaseBase):
+    def setUp(self):
+        SIRCompileService().ENABLED = True
+
+    def tearDown(self):
+        del SIRCompileService().ENABLED
+        SIRCompileService().shutdown()
+
+    def test_layer(self):
+        net = Net()
+        x = paddle.rand([3, 4])
+        x.stop_gradient = False
+        with test_instruction_translator_cache_context():
+            shipped = SIRCompileService().stats()["shipped"]
+            for _ in range(2):
+                out = symbolic_translate(net.forward)(x)
+                out.sum().backward()
+                grad = net.linear1.weight.grad.numpy()
+                net.clear_gradients()
+                expected = net(x)
+                expected.sum().backward()
+                np.testing.assert_allclose(out.numpy(), expected.numpy())
+                np.testing.assert_allclose(
+                    grad, net.linear1.weight.grad.numpy()
+                )
+                net.clear_gradients()
+            # Both subgraphs are built by the workers.
+            self.assertEqual(
+                SIRCompileService().stats()["shipped"], shipped + 2
+            )
+
+    def test_training_mode(self):
+        net = Net()
+        x = paddle.rand([3, 4])
+        with test_instruction_translator_cache_context():
+            for training in [True, False, True]:
+                net.train() if training else net.eval()
+                # The workers are forked again with the new training mode.
+                self.assert_results(net_call, x, net)
+
+    def test_fallback(self):
+        wrapper = build_wrapper()
+        future = Future()
+        future.set_exception(RuntimeError("worker failed"))
+        wrapper.pending_program = future
+        fallbacks = SIRCompileService().stats()["fallbacks"]
+        x = paddle.rand([3])
+        with StepInfoManager().step_guard(self.test_fallback.__code__):
+            (out,) = wrapper((x,))
+        np.testing.assert_allclose(out.numpy(), (x + 1).numpy())
+        self.assertIsNotNone(wrapper.partial_program)
+        self.assertIsNone(wrapper.pending_program)
+        self.assertEqual(
+            SIRCompileService().stats()["fallbacks"], fallbacks + 1
+        )
+
+    def test_timeout(self):
+        wrapper = build_wrapper()
+        # The future of a stuck worker, which is never done.
+        future = Future()
+        wrapper.pending_program = future
+        timeouts = SIRCompileService().stats()["timeouts"]
+        SIRCompileService().TIMEOUT = 0
+        x = paddle.rand([3])
+        try:
+            with StepInfoManager().step_guard(self.test_timeout.__code__):
+                (out,) = wrapper((x,))
+        finally:
+            del SIRCompileService().TIMEOUT
+        np.testing.assert_allclose(out.numpy(), (x + 1).numpy())
+        self.assertIsNotNone(wrapper.partial_program)
+        self.assertTrue(future.cancelled())
+        self.assertEqual(SIRCompileService().stats()["timeouts"], timeouts + 1)
+
+    def test_disabled_with_async_translation(self):
+        available = SIRCompileService().is_available()
+        # The workers are not forked while translating in background.
+        with patch.object(OpcodeExecutorCache(), "ASYNC_TRANSLATION", True):
+            self.assertFalse(SIRCompileService().is_available())
+        self.assertEqual(SIRCompileService().is_available(), available)
+
+    def test_unknown_inputs(self):
+        wrapper = build_wrapper()
+        synchronous = SIRCompileService().stats()["synchronous"]
+        SIRCompileService().submit(wrapper, None)
+        self.assertIsNone(wrapper.pending_program)
+        self.assertEqual(
+            SIRCompileService().stats()["synchronous"], synchronous + 1
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
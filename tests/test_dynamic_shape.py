@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot.infer_meta import MetaInfo
+from sot.opcode_translator.executor.dynamic_shape import DynamicShapeManager
+from sot.symbolic.statement_ir import MethodStatement, Symbol
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+from sot.utils import StepInfoManager
+
+
+def foo(x: paddle.Tensor, y: paddle.Tensor):
+    return x + y * 2
+
+
+def get_shape(x: paddle.Tensor):
+    return x.shape[1] + x
+
+
+class TestDynamicShape(TestCaseBase):
+    def test_generalize_dims(self):
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, DYNAMIC_SHAPE_THRESHOLD=2
+        ):
+            for n in range(1, 7):
+                self.assert_results(
+                    foo, paddle.rand([n, 4]), paddle.rand([n, 4])
+                )
+            self.assertEqual(ctx.translate_count, 3)
+            self.assertEqual(
+                DynamicShapeManager().dynamic_dims[foo.__code__],
+                {"x": (0,), "y": (0,)},
+            )
+            # The static dimensions are still guarded.
+            self.assert_results(foo, paddle.rand([2, 3]), paddle.rand([2, 3]))
+            self.assertEqual(ctx.translate_count, 4)
+
+    def test_disabled_by_default(self):
+        with test_instruction_translator_cache_context() as ctx:
+            for n in range(1, 5):
+                self.assert_results(
+                    foo, paddle.rand([n, 4]), paddle.rand([n, 4])
+                )
+            self.assertEqual(ctx.translate_count, 4)
+            self.assertNotIn(foo.__code__, DynamicShapeManager().dynamic_dims)
+
+    def test_dtype_change_is_not_dynamic(self):
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, DYNAMIC_SHAPE_THRESHOLD=1
+        ):
+            for dtype in ["float32", "float64", "int32"]:
+                x = paddle.ones([2, 4], dtype=dtype)
+                self.assert_results(foo, x, x)
+            self.assertEqual(ctx.translate_count, 3)
+            self.assertNotIn(foo.__code__, DynamicShapeManager().dynamic_dims)
+
+    def test_read_static_dim(self):
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, DYNAMIC_SHAPE_THRESHOLD=1
+        ):
+            for n in range(1, 5):
+                self.assert_results(get_shape, paddle.rand([n, 4]))
+
+    def test_unknown_input_metas(self):
+        context = SymbolicTraceContext()
+        context.TOS.add_statement(
+            MethodStatement("__add__", ((Symbol("x"), 1), {}), Symbol("y"), [])
+        )
+        meta = MetaInfo([-1, 4], paddle.float32, True, "z", False, None, None)
+        # The meta of the input x is unknown.
+        compiled_fn, sir = context.compile_fn([Symbol("y")], {"z": meta})
+        self.assertEqual([symbol.name for symbol in sir.inputs], ["x"])
+        x = paddle.rand([2, 4])
+        with StepInfoManager().step_guard(
+            self.test_unknown_input_metas.__code__
+        ):
+            (out,) = compiled_fn((x,))
+        self.assertTrue(paddle.allclose(out, x + 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import paddle
+from sot.symbolic.compile_cache import FallbackWrapper
+from sot.symbolic.interpreter import compile_sir
+from sot.symbolic.statement_ir import MethodStatement, Symbol
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+from sot.utils import StepInfoManager, log_level, set_log_level
+
+
+def build_wrapper():
+    context = SymbolicTraceContext()
+    sir = context.TOS
+    sir.add_statement(
+        MethodStatement("__add__", ((Symbol("x"), 1.0), {}), Symbol("y"), [])
+    )
+    sir.inputs = [Symbol("x")]
+    sir.outputs = [Symbol("y")]
+    return FallbackWrapper(
+        paddle.jit.to_static(
+            compile_sir(context, sir.name), enable_fallback=False
+        ),
+        sir,
+    )
+
+
+class TestFallbackWrapper(unittest.TestCase):
+    def test_fast_path(self):
+        wrapper = build_wrapper()
+        x = paddle.rand([2, 3])
+        self.addCleanup(set_log_level, log_level())
+        with StepInfoManager().step_guard(self.test_fast_path.__code__):
+            step_info = StepInfoManager().current_step_info
+            set_log_level(0)
+            # The environment is not read on every call.
+            with mock.patch.dict(os.environ, {"LOG_LEVEL": "1"}):
+                # The first call builds the partial program.
+                (out,) = wrapper((x,))
+                np.testing.assert_allclose(out.numpy(), x.numpy() + 1)
+                self.assertIsNotNone(wrapper.partial_program)
+                # The calling frames are traced back in the first steps.
+                self.assertTrue(wrapper.need_hooks())
+
+                step_info.step_count = step_info.BACK_TRACE_STEPS
+                self.assertFalse(wrapper.need_hooks())
+                with mock.patch.object(
+                    wrapper, "call_with_hooks", side_effect=AssertionError
+                ):
+                    (out,) = wrapper((x,))
+                np.testing.assert_allclose(out.numpy(), x.numpy() + 1)
+
+            set_log_level(1)
+            self.assertTrue(wrapper.need_hooks())
+            with mock.patch.object(
+                wrapper, "call_with_hooks", return_value="hooked"
+            ):
+                self.assertEqual(wrapper((x,)), "hooked")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+import inspect
+import unittest
+from unittest.mock import patch
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot.opcode_translator.executor.guard import (
+    GuardCodeCache,
+    StringifyExpression,
+    make_guard,
+)
+from sot.opcode_translator.executor.guard_tree import GuardTree
+from sot.utils import tmp_name_guard
+
+
+def fake_frame(x, y):
+    return inspect.currentframe()
+
+
+def make_equal_guard(expected: dict):
+    with tmp_name_guard():
+        exprs = []
+        for name, value in expected.items():
+            tracer = StringifyExpression(f"frame.f_locals['{name}']", [], {})
+            exprs.append(
+                StringifyExpression(
+                    f"{{}} == __{name}_{id(value)}",
+                    [tracer],
+                    {f"__{name}_{id(value)}": value},
+                )
+            )
+        return make_guard(exprs)
+
+
+class TestGuardTree(unittest.TestCase):
+    def test_share_prefix(self):
+        tree = GuardTree()
+        for x in range(2):
+            for y in range(3):
+                tree.add(make_equal_guard({"x": x, "y": y}), (x, y))
+        self.assertEqual(len(tree), 6)
+        # x is checked once for each value, then branch to y.
+        self.assertEqual(
+            tree.dump(),
+            [
+                (1, 0, [(1, 1, []), (1, 1, []), (1, 1, [])]),
+                (1, 0, [(1, 1, []), (1, 1, []), (1, 1, [])]),
+            ],
+        )
+        for x in range(2):
+            for y in range(3):
+                self.assertEqual(tree.lookup(fake_frame(x, y)), (x, y))
+        self.assertIsNone(tree.lookup(fake_frame(2, 0)))
+
+    def test_single_entry_is_one_segment(self):
+        tree = GuardTree()
+        tree.add(make_equal_guard({"x": 1, "y": 2}), "entry")
+        self.assertEqual(tree.dump(), [(2, 1, [])])
+        self.assertEqual(tree.lookup(fake_frame(1, 2)), "entry")
+        self.assertIsNone(tree.lookup(fake_frame(1, 3)))
+
+    def test_guard_error_is_miss(self):
+        tree = GuardTree()
+        tree.add(make_equal_guard({"z": 1}), "missing")
+        tree.add(lambda frame: True, "opaque")
+        self.assertEqual(tree.lookup(fake_frame(1, 2)), "opaque")
+
+    def test_reorder_by_statistics(self):
+        tree = GuardTree()
+        tree.PROFILE_INTERVAL = 1
+        tree.REORDER_INTERVAL = 30
+        for y in range(3):
+            tree.add(make_equal_guard({"x": 0, "y": y}), y)
+        self.assertEqual(
+            tree.dump(), [(1, 0, [(1, 1, []), (1, 1, []), (1, 1, [])])]
+        )
+        for i in range(30):
+            self.assertEqual(tree.lookup(fake_frame(0, i % 3)), i % 3)
+        # x always passes, so it's moved after the check of y.
+        self.assertEqual(tree.dump(), [(2, 1, []), (2, 1, []), (2, 1, [])])
+        for y in range(3):
+            self.assertEqual(tree.lookup(fake_frame(0, y)), y)
+        self.assertIsNone(tree.lookup(fake_frame(1, 0)))
+
+    def test_profile_one_sub_guard(self):
+        tree = GuardTree()
+        tree.PROFILE_INTERVAL = 1
+        for y in range(3):
+            tree.add(make_equal_guard({"x": 0, "y": y}), y)
+        sub_guards = [
+            sub_guard
+            for sub_guards, _ in tree.items
+            for sub_guard in sub_guards
+        ]
+        for i in range(8):
+            tree.lookup(fake_frame(0, 0))
+            # Each lookup profiles one of the 4 SubGuards in the tree.
+            self.assertEqual(
+                sum(
+                    sub_guard.pass_count + sub_guard.fail_count
+                    for sub_guard in set(sub_guards)
+                ),
+                i + 1,
+            )
+        self.assertTrue(
+            all(
+                sub_guard.pass_count + sub_guard.fail_count == 2
+                for sub_guard in set(sub_guards)
+            )
+        )
+
+    def test_last_hit_fast_path(self):
+        tree = GuardTree()
+        for y in range(3):
+            tree.add(make_equal_guard({"x": 0, "y": y}), y)
+        for _ in range(4):
+            self.assertEqual(tree.lookup(fake_frame(0, 2)), 2)
+        self.assertEqual(tree.hit_count, 4)
+        self.assertEqual(tree.last_hit_count, 3)
+        self.assertIsNone(tree.lookup(fake_frame(0, 3)))
+        self.assertEqual(tree.hit_count, 4)
+
+    def test_promote_on_hit(self):
+        tree = GuardTree()
+        for x in range(3):
+            tree.add(make_equal_guard({"x": x, "y": 0}), x)
+        self.assertEqual(tree.lookup(fake_frame(2, 0)), 2)
+        self.assertEqual(tree.lookup(fake_frame(1, 0)), 1)
+        self.assertEqual(
+            [child.entries for child in tree.root.children], [[1], [2], [0]]
+        )
+        tree.add(make_equal_guard({"x": 3, "y": 0}), 3)
+        self.assertEqual(tree.lookup(fake_frame(1, 0)), 1)
+        self.assertEqual(tree.lookup(fake_frame(3, 0)), 3)
+
+    def test_empty_guard_entry(self):
+        tree = GuardTree()
+        tree.add(make_equal_guard({}), "entry")
+        self.assertEqual(tree.lookup(fake_frame(0, 0)), "entry")
+        self.assertEqual(tree.lookup(fake_frame(0, 0)), "entry")
+        self.assertEqual(tree.last_hit_count, 1)
+
+
+class TestGuardCodeCache(unittest.TestCase):
+    def test_share_code_between_free_vars(self):
+        hit_num = GuardCodeCache().hit_num
+        guard_1 = make_equal_guard({"x": 1, "y": 2})
+        guard_2 = make_equal_guard({"x": 3, "y": 4})
+        self.assertGreater(GuardCodeCache().hit_num, hit_num)
+        self.assertIs(guard_1.__code__, guard_2.__code__)
+        self.assertTrue(guard_1(fake_frame(1, 2)))
+        self.assertFalse(guard_1(fake_frame(3, 4)))
+        self.assertTrue(guard_2(fake_frame(3, 4)))
+        self.assertFalse(guard_2(fake_frame(1, 2)))
+
+    def test_different_expressions(self):
+        guard_1 = make_equal_guard({"x": 1})
+        guard_2 = make_equal_guard({"y": 1})
+        self.assertIsNot(guard_1.__code__, guard_2.__code__)
+
+    def test_bounded(self):
+        with patch.object(GuardCodeCache(), "MAX_SIZE", 2):
+            guard_x = make_equal_guard({"x": 1})
+            guard_y = make_equal_guard({"y": 1})
+            # The code of guard_x becomes the most recently used one.
+            self.assertIs(make_equal_guard({"x": 2}).__code__, guard_x.__code__)
+            make_equal_guard({"x": 1, "y": 1})
+            self.assertEqual(len(GuardCodeCache().cache), 2)
+            miss_num = GuardCodeCache().miss_num
+            self.assertIs(make_equal_guard({"x": 3}).__code__, guard_x.__code__)
+            self.assertEqual(GuardCodeCache().miss_num, miss_num)
+            # The code of guard_y is evicted.
+            self.assertIsNot(
+                make_equal_guard({"y": 2}).__code__, guard_y.__code__
+            )
+            self.assertEqual(GuardCodeCache().miss_num, miss_num + 1)
+
+    def test_free_var_named_as_local(self):
+        # Only the free variable `x` is renamed, the key 'x' is kept.
+        with tmp_name_guard():
+            tracer = StringifyExpression("frame.f_locals['x']", [], {})
+            guard = make_guard(
+                [StringifyExpression("{} == x", [tracer], {"x": 1})]
+            )
+        self.assertTrue(guard(fake_frame(1, 2)))
+        self.assertFalse(guard(fake_frame(2, 2)))
+
+
+def foo(x, y):
+    return x + y
+
+
+class TestGuardTreeInCache(TestCaseBase):
+    def test_shape_specializations(self):
+        with test_instruction_translator_cache_context() as ctx:
+            x = paddle.rand([2])
+            for n in [1, 2, 3]:
+                self.assert_results(foo, x, paddle.rand([n, 2]))
+            self.assertEqual(ctx.translate_count, 3)
+            for n in [3, 2, 1]:
+                self.assert_results(foo, x, paddle.rand([n, 2]))
+            self.assertEqual(ctx.translate_count, 3)
+            tree = ctx.guard_trees[foo.__code__]
+            self.assertEqual(len(tree), 3)
+            # The guard of x is shared by all entries.
+            self.assertEqual(len(tree.dump()), 1)
+            self.assertEqual(len(tree.dump()[0][2]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
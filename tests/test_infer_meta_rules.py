@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import os
+import unittest
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot.infer_meta import (
+    MetaInfo,
+    RuleInferMeta,
+    VariableCreator,
+    infer_meta_for_layer,
+    infer_meta_for_layer_by_program,
+)
+
+
+def meta(shape, dtype=paddle.float32, stop_gradient=True):
+    return MetaInfo(shape, dtype, stop_gradient, "x", False, None, None)
+
+
+def foo(x: paddle.Tensor, y: paddle.Tensor):
+    z = paddle.nn.functional.relu(x * 2 + y) / 3
+    z = paddle.matmul(z, y, transpose_y=True).reshape([-1])
+    a, b = paddle.split(z.astype("float64"), 2)
+    return paddle.concat([a, b]).sum(axis=0, keepdim=True) > 1.0
+
+
+class TestInferMetaRules(TestCaseBase):
+    def setUp(self):
+        os.environ["SOT_CHECK_INFER_META_RULES"] = "1"
+
+    def tearDown(self):
+        del os.environ["SOT_CHECK_INFER_META_RULES"]
+
+    def assert_rule(self, func, *args, **kwargs):
+        out = RuleInferMeta()(func, *args, **kwargs)
+        self.assertIsNotNone(out)
+        self.assertEqual(
+            out, VariableCreator().infer_meta(func, *args, **kwargs)
+        )
+        return out
+
+    def test_rules(self):
+        x = meta([4, 1, 3], stop_gradient=False)
+        y = meta([2, 3])
+        self.assertEqual(self.assert_rule("__add__", x, y).shape, (4, 2, 3))
+        self.assertFalse(self.assert_rule("__add__", x, y).stop_gradient)
+        self.assertEqual(
+            self.assert_rule("__truediv__", meta([3], paddle.int64), 2).dtype,
+            paddle.float32,
+        )
+        self.assertEqual(
+            self.assert_rule(paddle.sum, x, axis=[0, -1]).shape, (1,)
+        )
+        self.assertEqual(
+            self.assert_rule(paddle.matmul, x, y, transpose_y=True).shape,
+            (4, 1, 2),
+        )
+        self.assertEqual(self.assert_rule("reshape", x, [0, -1]).shape, (4, 3))
+        self.assertEqual(
+            [
+                out.shape
+                for out in self.assert_rule(paddle.split, x, [1, -1], 2)
+            ],
+            [(4, 1, 1), (4, 1, 2)],
+        )
+        self.assertEqual(
+            self.assert_rule("astype", y, "float16").dtype, paddle.float16
+        )
+
+    def test_fallback(self):
+        # Dynamic shape
+        self.assertIsNone(RuleInferMeta()("__add__", meta([-1, 3]), 1))
+        # Different dtypes
+        self.assertIsNone(
+            RuleInferMeta()(paddle.add, meta([3]), meta([3], paddle.float64))
+        )
+        # Unexpected arguments
+        self.assertIsNone(RuleInferMeta()(paddle.sum, meta([3]), unknown=1))
+        # No rule
+        self.assertIsNone(RuleInferMeta()(paddle.cumsum, meta([3])))
+
+    def test_translate(self):
+        hits = RuleInferMeta().stats()["hits"]
+        with test_instruction_translator_cache_context():
+            self.assert_results(foo, paddle.rand([2, 4]), paddle.rand([2, 4]))
+        self.assertGreater(RuleInferMeta().stats()["hits"], hits)
+
+
+class ReLU(paddle.nn.ReLU):
+    def forward(self, x):
+        return paddle.nn.functional.relu(x).sum()
+
+
+def net_call(net: paddle.nn.Layer, x: paddle.Tensor):
+    return net(x)
+
+
+class TestLayerRules(TestCaseBase):
+    def setUp(self):
+        os.environ["SOT_CHECK_INFER_META_RULES"] = "1"
+
+    def tearDown(self):
+        del os.environ["SOT_CHECK_INFER_META_RULES"]
+
+    def assert_rule(self, layer, *args, **kwargs):
+        out = RuleInferMeta()(layer, *args, **kwargs)
+        self.assertIsNotNone(out)
+        self.assertEqual(
+            out, infer_meta_for_layer_by_program(layer, *args, **kwargs)
+        )
+        return out
+
+    def test_rules(self):
+        x = meta([2, 3, 15, 16])
+        conv = paddle.nn.Conv2D(3, 8, 3, stride=2, padding=[1, 2])
+        out = self.assert_rule(conv, x)
+        self.assertEqual(out.shape, (2, 8, 8, 9))
+        self.assertFalse(out.stop_gradient)
+        self.assertEqual(
+            self.assert_rule(paddle.nn.BatchNorm2D(3), x).shape, x.shape
+        )
+        self.assertEqual(
+            self.assert_rule(paddle.nn.MaxPool2D(3, 2, 1), x).shape,
+            (2, 3, 8, 8),
+        )
+        self.assertEqual(
+            self.assert_rule(paddle.nn.AdaptiveAvgPool2D((1, None)), x).shape,
+            (2, 3, 1, 16),
+        )
+        self.assertEqual(
+            self.assert_rule(paddle.nn.Flatten(), x).shape, (2, 720)
+        )
+        self.assertEqual(
+            self.assert_rule(paddle.nn.Linear(16, 4), x).shape, (2, 3, 15, 4)
+        )
+        self.assertEqual(
+            self.assert_rule(
+                paddle.nn.Embedding(10, 4), meta([2, 3], paddle.int64)
+            ).shape,
+            (2, 3, 4),
+        )
+
+    def test_fallback(self):
+        x = meta([2, 3])
+        # No rule for the subclasses
+        self.assertIsNone(RuleInferMeta()(ReLU(), x))
+        # Forward hooks
+        relu = paddle.nn.ReLU()
+        relu.register_forward_post_hook(lambda layer, inputs, out: out + 1)
+        self.assertIsNone(RuleInferMeta()(relu, x))
+        # Mismatched input
+        self.assertIsNone(RuleInferMeta()(paddle.nn.Linear(4, 4), x))
+        # Unsupported padding mode
+        conv = paddle.nn.Conv2D(3, 8, 3, padding=1, padding_mode="reflect")
+        self.assertIsNone(RuleInferMeta()(conv, meta([2, 3, 8, 8])))
+        self.assertEqual(
+            infer_meta_for_layer(conv, meta([2, 3, 8, 8])).shape, (2, 8, 8, 8)
+        )
+
+    def test_program_keeps_layer(self):
+        layer = ReLU()
+        infer_meta_for_layer(layer, meta([2, 3]))
+        # The layer isn't converted to static and rolled back.
+        self.assertNotIn("forward", layer.__dict__)
+
+    def test_translate(self):
+        net = paddle.nn.Sequential(
+            paddle.nn.Conv2D(3, 4, 3),
+            paddle.nn.BatchNorm2D(4),
+            paddle.nn.ReLU(),
+            paddle.nn.AdaptiveAvgPool2D(1),
+            paddle.nn.Flatten(),
+            paddle.nn.Linear(4, 2),
+        )
+        net.eval()
+        hits = RuleInferMeta().stats()["hits"]
+        with test_instruction_translator_cache_context():
+            self.assert_results(net_call, net, paddle.rand([2, 3, 8, 8]))
+        self.assertGreaterEqual(RuleInferMeta().stats()["hits"], hits + 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
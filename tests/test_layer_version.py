@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import unittest
+
+from test_case_base import test_instruction_translator_cache_context
+
+import paddle
+from sot import symbolic_translate
+from sot.infer_meta import LayerInferMetaCache, LayerVersionManager, MetaInfo
+
+
+class Net(paddle.nn.Layer):
+    def __init__(self):
+        super().__init__()
+        self.linear = paddle.nn.Linear(4, 4)
+
+    def forward(self, x):
+        return self.linear(x)
+
+
+class TestLayerVersion(unittest.TestCase):
+    def setUp(self):
+        self.net = Net()
+        self.meta = MetaInfo(
+            [2, 4], paddle.float32, True, "x", False, None, None
+        )
+
+    def key(self):
+        return LayerInferMetaCache().key_fn(self.net, self.meta)
+
+    def translated_key(self):
+        # The versions are computed again in a new translation.
+        LayerVersionManager().invalidate()
+        return self.key()
+
+    def test_hit(self):
+        key = self.key()
+        generation = LayerVersionManager().generation
+        self.assertEqual(self.key(), key)
+        # The parameters are not read again on a hit.
+        self.assertEqual(
+            LayerVersionManager().versions[self.net][0], generation
+        )
+
+    def test_to_dtype(self):
+        key = self.key()
+        self.net.to(dtype="float64")
+        self.assertNotEqual(self.translated_key(), key)
+        self.net.to(dtype="float32")
+        self.assertEqual(self.translated_key(), key)
+
+    def test_add_parameter(self):
+        key = self.key()
+        self.net.linear.add_parameter(
+            "extra", self.net.linear.create_parameter([2])
+        )
+        self.assertNotEqual(self.translated_key(), key)
+
+    def test_set_sublayer(self):
+        key = self.key()
+        self.net.linear = paddle.nn.Linear(4, 8)
+        self.assertNotEqual(self.translated_key(), key)
+
+    def test_stop_gradient(self):
+        key = self.key()
+        self.net.linear.weight.stop_gradient = True
+        self.assertNotEqual(self.translated_key(), key)
+
+    def test_unrelated_change(self):
+        key = self.key()
+        Net().linear.to(dtype="float64")
+        # The version is computed again, but it's not changed.
+        self.assertEqual(self.translated_key(), key)
+
+    def test_invalidated_by_translation(self):
+        generation = LayerVersionManager().generation
+        with test_instruction_translator_cache_context():
+            symbolic_translate(self.net.forward)(paddle.rand([2, 4]))
+        self.assertGreater(LayerVersionManager().generation, generation)
+
+    def test_layer_not_patched(self):
+        self.assertIs(
+            paddle.nn.Layer.__setattr__,
+            paddle.nn.layer.layers.Layer.__dict__["__setattr__"],
+        )
+        self.assertEqual(
+            paddle.nn.Layer.__setattr__.__module__, "paddle.nn.layer.layers"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
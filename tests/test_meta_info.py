@@ -0,0 +1,50 @@
+import copy
+import pickle
+import unittest
+
+import paddle
+from sot.infer_meta import MetaInfo
+
+
+def meta(shape, name="x", place=None):
+    return MetaInfo(shape, paddle.float32, True, name, False, None, place)
+
+
+class TestMetaInfo(unittest.TestCase):
+    def test_immutable(self):
+        x = meta([2, 3])
+        self.assertEqual(x.shape, (2, 3))
+        with self.assertRaises(AttributeError):
+            x.shape = (3, 2)
+        with self.assertRaises(AttributeError):
+            x.extra = 1
+        self.assertEqual(x.with_dynamic_dims((0,)).shape, (-1, 3))
+        self.assertEqual(x.shape, (2, 3))
+
+    def test_interned(self):
+        x = meta([2, 3])
+        self.assertIs(meta((2, 3)), x)
+        self.assertIsNot(meta([2, 3], name="y"), x)
+        # The metas of the eager tensors have places.
+        tensor = paddle.rand([2, 3])
+        self.assertIsNot(
+            MetaInfo.from_tensor(tensor), MetaInfo.from_tensor(tensor)
+        )
+
+    def test_hash(self):
+        x = meta([2, 3])
+        y = meta([2, 3], name="y", place=paddle.CPUPlace())
+        self.assertEqual(x, y)
+        self.assertEqual(hash(x), hash(y))
+        self.assertNotEqual(x, meta([3, 2]))
+        self.assertNotEqual(x, (2, 3))
+        self.assertEqual(len({x, y, meta([3, 2])}), 2)
+
+    def test_copy(self):
+        x = meta([2, 3])
+        self.assertIs(copy.deepcopy(x), x)
+        self.assertIs(pickle.loads(pickle.dumps(x)), x)
+
+
+if __name__ == "__main__":
+    unittest.main()
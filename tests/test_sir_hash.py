@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import copy
+import unittest
+
+import numpy as np
+
+import paddle
+from sot import symbolic_translate
+from sot.symbolic.compile_cache import CompileSIRCache
+from sot.symbolic.statement_ir import (
+    ApiStatement,
+    LayerStatement,
+    MethodStatement,
+    StatementIR,
+    StatementIRFactory,
+    Symbol,
+)
+
+
+def build_sir(name="SIR_test", constant=1, api=paddle.add, offset=0):
+    def var(i):
+        return Symbol(f"var_{i + offset}")
+
+    sir = StatementIR(name)
+    sir.add_statement(ApiStatement(api, ((var(0), var(1)), {}), [var(2)], []))
+    sir.add_statement(
+        MethodStatement(
+            "__add__",
+            ((var(2), constant), {}),
+            [var(3)],
+            [],
+        )
+    )
+    sir.inputs = sir.analyse_inputs()
+    sir.outputs = [var(3)]
+    return sir
+
+
+class TestSIRStructureHash(unittest.TestCase):
+    def test_same_structure(self):
+        self.assertEqual(
+            build_sir().structure_hash(), build_sir().structure_hash()
+        )
+
+    def test_different_structure(self):
+        base = build_sir().structure_hash()
+        self.assertNotEqual(build_sir(constant=2).structure_hash(), base)
+        # 1 == 1.0 == True, but they are different constants.
+        self.assertNotEqual(build_sir(constant=1.0).structure_hash(), base)
+        self.assertNotEqual(build_sir(constant=True).structure_hash(), base)
+        self.assertNotEqual(
+            build_sir(constant=paddle.float32).structure_hash(),
+            build_sir(constant=paddle.float64).structure_hash(),
+        )
+        self.assertNotEqual(
+            build_sir(constant=[1, slice(0, 2)]).structure_hash(),
+            build_sir(constant=[1, slice(0, 3)]).structure_hash(),
+        )
+        self.assertNotEqual(
+            build_sir(api=paddle.subtract).structure_hash(), base
+        )
+        sir = build_sir()
+        sir.outputs = [Symbol("var_2")]
+        self.assertNotEqual(sir.structure_hash(), base)
+
+    def test_hash_collision(self):
+        # hash(-1) == hash(-2), the keys are compared by the constants.
+        sir_1 = build_sir(constant=-1)
+        sir_2 = build_sir(constant=-2)
+        self.assertEqual(sir_1.structure_hash(), sir_2.structure_hash())
+        self.assertNotEqual(sir_1.structure_key(), sir_2.structure_key())
+        self.assertEqual(
+            sir_1.structure_key(), build_sir(constant=-1).structure_key()
+        )
+        # 0.0 == -0.0, but they are different constants.
+        self.assertNotEqual(
+            build_sir(constant=0.0).structure_key(),
+            build_sir(constant=-0.0).structure_key(),
+        )
+
+    def test_incremental(self):
+        sir = build_sir()
+        statements_hash = sir.statements_hash
+        copied_sir = copy.deepcopy(sir)
+        self.assertEqual(copied_sir.structure_hash(), sir.structure_hash())
+        sir.add_statement(
+            MethodStatement(
+                "__neg__", ((Symbol("var_3"),), {}), [Symbol("var_4")], []
+            )
+        )
+        self.assertNotEqual(sir.statements_hash, statements_hash)
+        self.assertEqual(copied_sir.statements_hash, statements_hash)
+
+    def test_layer_identity(self):
+        def build_layer_sir(layer):
+            sir = StatementIR("SIR_layer")
+            sir.add_statement(
+                LayerStatement(
+                    layer, ((Symbol("var_0"),), {}), [Symbol("var_1")], []
+                )
+            )
+            return sir
+
+        layer_1 = paddle.nn.Linear(2, 2)
+        layer_2 = paddle.nn.Linear(2, 2)
+        self.assertEqual(
+            build_layer_sir(layer_1).structure_hash(),
+            build_layer_sir(layer_1).structure_hash(),
+        )
+        self.assertNotEqual(
+            build_layer_sir(layer_1).structure_hash(),
+            build_layer_sir(layer_2).structure_hash(),
+        )
+        train_hash = build_layer_sir(layer_1).structure_hash()
+        layer_1.eval()
+        self.assertNotEqual(
+            build_layer_sir(layer_1).structure_hash(), train_hash
+        )
+
+
+class TestCanonicalSIR(unittest.TestCase):
+    def test_rename(self):
+        sir = build_sir()
+        renamed_sir = build_sir(name="SIR_renamed", offset=8)
+        self.assertEqual(
+            [symbol.name for symbol in renamed_sir.inputs], ["var_8", "var_9"]
+        )
+        self.assertEqual(renamed_sir.structure_hash(), sir.structure_hash())
+
+        canonical_sir, names = renamed_sir.canonicalize()
+        self.assertEqual(
+            [symbol.name for symbol in canonical_sir.inputs],
+            ["__var_0", "__var_1"],
+        )
+        self.assertEqual(
+            [symbol.name for symbol in canonical_sir.outputs], ["__var_3"]
+        )
+        self.assertEqual(
+            names,
+            {
+                "__var_0": "var_8",
+                "__var_1": "var_9",
+                "__var_2": "var_10",
+                "__var_3": "var_11",
+            },
+        )
+        self.assertEqual(canonical_sir.structure_hash(), sir.structure_hash())
+        self.assertEqual(canonical_sir.name, sir.canonicalize()[0].name)
+        # The statements of the original SIR are not modified.
+        self.assertEqual(renamed_sir.statements[0].outputs[0].name, "var_10")
+
+    def test_position(self):
+        sir = build_sir()
+        swapped_sir = build_sir()
+        swapped_sir.inputs = list(reversed(swapped_sir.inputs))
+        self.assertNotEqual(swapped_sir.structure_hash(), sir.structure_hash())
+        unseen_sir = build_sir()
+        unseen_sir.outputs = [Symbol("var_3"), Symbol("var_100")]
+        canonical_sir, names = unseen_sir.canonicalize()
+        self.assertEqual(names["__var_4"], "var_100")
+
+    def test_name_collision(self):
+        # The structure hashes are equal, see `test_hash_collision`.
+        canonical_sir_1, _ = build_sir(constant=-1).canonicalize()
+        StatementIRFactory().update(canonical_sir_1)
+        canonical_sir_2, _ = build_sir(constant=-2).canonicalize()
+        StatementIRFactory().update(canonical_sir_2)
+        self.assertNotEqual(canonical_sir_1.name, canonical_sir_2.name)
+        self.assertIs(
+            StatementIRFactory()[canonical_sir_1.name], canonical_sir_1
+        )
+        self.assertEqual(
+            build_sir(constant=-1).canonicalize()[0].name, canonical_sir_1.name
+        )
+
+
+def add_mul(x, y):
+    return (x + y) * 2
+
+
+def add_mul_renamed(a, b):
+    return (a + b) * 2
+
+
+def sum_last(x):
+    return paddle.sum(x, axis=-1) * 2
+
+
+def sum_second_last(x):
+    return paddle.sum(x, axis=-2) * 2
+
+
+class TestShareCompiledSIR(unittest.TestCase):
+    def setUp(self):
+        CompileSIRCache().clear()
+
+    def test_share(self):
+        x = paddle.rand([2, 3])
+        y = paddle.rand([2, 3])
+        for fn in (add_mul, add_mul_renamed):
+            np.testing.assert_allclose(
+                symbolic_translate(fn)(x, y).numpy(), add_mul(x, y).numpy()
+            )
+        stats = CompileSIRCache().stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+        # The compiled function is not shared by the inputs with other metas.
+        x = paddle.rand([4, 3])
+        y = paddle.rand([4, 3])
+        np.testing.assert_allclose(
+            symbolic_translate(add_mul)(x, y).numpy(), add_mul(x, y).numpy()
+        )
+        self.assertEqual(CompileSIRCache().stats()["misses"], 2)
+
+    def test_hash_collision(self):
+        # The SIRs only differ in the axis, whose hashes are equal.
+        x = paddle.rand([3, 3])
+        # The functions are called again after both SIRs are compiled.
+        for fn in (sum_last, sum_second_last, sum_last, sum_second_last):
+            np.testing.assert_allclose(
+                symbolic_translate(fn)(x).numpy(), fn(x).numpy()
+            )
+        self.assertEqual(CompileSIRCache().stats()["misses"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
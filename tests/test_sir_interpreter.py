@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import unittest
+
+import paddle
+from sot.symbolic.interpreter import Interpreter, lower_sir
+from sot.symbolic.statement_ir import ApiStatement, MethodStatement, Symbol
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+
+
+def split(x, sections, axis=0):
+    return x[: sections[0]], x[sections[0] :]
+
+
+class TestLoweredSIR(unittest.TestCase):
+    def test_run(self):
+        context = SymbolicTraceContext()
+        sir = context.TOS
+        x, a, b, c, d = (Symbol(name) for name in "xabcd")
+        sir.add_statement(
+            ApiStatement(split, ((x, [1]), {"axis": 0}), [a, b], [])
+        )
+        sir.add_statement(
+            MethodStatement("__getitem__", ((b, slice(0, None)), {}), c, [])
+        )
+        sir.add_statement(
+            MethodStatement("__add__", ((c, Symbol("y")), {}), d, [])
+        )
+        sir.inputs = [x]
+        sir.outputs = [a, d]
+        interpreter = Interpreter(context)
+        self.assertEqual(
+            interpreter.run_sir(sir.name, {"x": "abc", "y": "d"}),
+            ["a", "bcd"],
+        )
+
+        lowered = lower_sir(sir)
+        self.assertIs(lower_sir(sir), lowered)
+        sir.add_statement(MethodStatement("__len__", ((d,), {}), a, []))
+        self.assertIsNot(lower_sir(sir), lowered)
+        self.assertEqual(
+            interpreter.run_sir(sir.name, {"x": "abc", "y": "d"}),
+            [3, "bcd"],
+        )
+
+    def test_op_callstack(self):
+        def build_program(stacks):
+            context = SymbolicTraceContext()
+            sir = context.TOS
+            sir.add_statement(
+                MethodStatement(
+                    "__add__", ((Symbol("x"), 1.0), {}), Symbol("y"), stacks
+                )
+            )
+            sir.inputs = [Symbol("x")]
+            sir.outputs = [Symbol("y")]
+            main_program = paddle.static.Program()
+            with paddle.static.program_guard(main_program):
+                x = paddle.static.data("x", [2], "float32")
+                Interpreter(context).run_sir(sir.name, {"x": x})
+            callstack_attr_name = (
+                paddle.framework.core.op_proto_and_checker_maker.kOpCreationCallstackAttrName()
+            )
+            return main_program.global_block().ops[-1].attr(callstack_attr_name)
+
+        paddle.enable_static()
+        try:
+            stacks = ['File "model.py", line 1, in forward']
+            self.assertEqual(build_program(stacks), stacks)
+            self.assertNotEqual(build_program([]), stacks)
+        finally:
+            paddle.disable_static()
+
+
+if __name__ == "__main__":
+    unittest.main()
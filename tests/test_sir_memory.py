@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import gc
+import unittest
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot.symbolic.compile_cache import CompileSIRCache
+from sot.symbolic.statement_ir import SIRRuntimeCache, StatementIRFactory
+
+
+def foo(x: paddle.Tensor):
+    return x + 1
+
+
+def bar(x: paddle.Tensor):
+    return x * 2 - 1
+
+
+def compiled_fn_names():
+    return [name for name in globals() if name.startswith("__compiled_fn_")]
+
+
+class TestSIRMemory(TestCaseBase):
+    def setUp(self):
+        CompileSIRCache().clear()
+
+    def tearDown(self):
+        CompileSIRCache().clear()
+
+    def test_release(self):
+        with test_instruction_translator_cache_context() as ctx:
+            for i in range(1, 4):
+                self.assert_results(foo, paddle.rand([i]))
+            self.assertEqual(len(compiled_fn_names()), 3)
+            sir_names = [
+                name[len("__compiled_fn_") :] for name in compiled_fn_names()
+            ]
+            self.assertGreaterEqual(
+                ctx.get_stats()["sir_memory"]["sirs"], len(sir_names)
+            )
+        # The cache is cleared by the context.
+        self.assertEqual(compiled_fn_names(), [])
+        CompileSIRCache().clear()
+        gc.collect()
+        for name in sir_names:
+            self.assertNotIn(name, StatementIRFactory().cache)
+
+    def test_evict(self):
+        with test_instruction_translator_cache_context() as ctx:
+            old_size = ctx.MAX_CACHE_SIZE
+            ctx.MAX_CACHE_SIZE = 2
+            try:
+                for i in range(1, 5):
+                    self.assert_results(foo, paddle.rand([i]))
+                self.assertEqual(len(compiled_fn_names()), 2)
+            finally:
+                ctx.MAX_CACHE_SIZE = old_size
+
+    def test_budget(self):
+        old_budget = CompileSIRCache().MAX_TOTAL_STATEMENTS
+        CompileSIRCache().MAX_TOTAL_STATEMENTS = 2
+        try:
+            with test_instruction_translator_cache_context():
+                self.assert_results(foo, paddle.rand([1]))
+                self.assert_results(bar, paddle.rand([1]))
+                stats = CompileSIRCache().stats()
+                self.assertEqual(stats["size"], 1)
+                self.assertEqual(stats["statements"], 2)
+        finally:
+            CompileSIRCache().MAX_TOTAL_STATEMENTS = old_budget
+
+    def test_runtime_cache(self):
+        sir = StatementIRFactory().create()
+        name = sir.name
+        SIRRuntimeCache().set_origin_inputs(name, [])
+        self.assertIs(StatementIRFactory()[name], sir)
+        del sir
+        gc.collect()
+        self.assertNotIn(name, StatementIRFactory().cache)
+        self.assertFalse(SIRRuntimeCache().has_key(name))
+
+
+if __name__ == "__main__":
+    unittest.main()
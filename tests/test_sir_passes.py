@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import os
+import unittest
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot.symbolic.sir_passes import (
+    CommonSubexpressionElimination,
+    ConstantFolding,
+    DeadStatementElimination,
+    SIRPassManager,
+)
+from sot.symbolic.statement_ir import (
+    ApiStatement,
+    LayerStatement,
+    MethodStatement,
+    StatementIR,
+    Symbol,
+)
+
+
+def api(fn, inputs, output):
+    return ApiStatement(fn, inputs, Symbol(output), [])
+
+
+def method(name, inputs, output):
+    return MethodStatement(name, inputs, Symbol(output), [])
+
+
+def build_sir(statements, outputs):
+    sir = StatementIR("SIR_pass")
+    for stmt in statements:
+        sir.add_statement(stmt)
+    sir.outputs = [Symbol(name) for name in outputs]
+    return sir
+
+
+def removed_names(removed):
+    return [stmt.outputs.name for stmt in removed]
+
+
+class TestDeadStatementElimination(unittest.TestCase):
+    def test_dce(self):
+        x = Symbol("x")
+        sir = build_sir(
+            [
+                method("__add__", ((x, 1), {}), "a"),
+                method("__mul__", ((x, 2), {}), "b"),
+                method("__neg__", ((Symbol("b"),), {}), "c"),
+                api(paddle.nn.functional.dropout, ((x,), {}), "d"),
+                LayerStatement(
+                    paddle.nn.Linear(2, 2), ((x,), {}), Symbol("e"), []
+                ),
+            ],
+            ["a"],
+        )
+        new_sir, removed = DeadStatementElimination().run(sir)
+        self.assertEqual(removed_names(removed), ["b", "c"])
+        self.assertEqual(
+            [stmt.outputs.name for stmt in new_sir.statements], ["a", "d", "e"]
+        )
+        self.assertEqual(new_sir.outputs, sir.outputs)
+
+    def test_nothing_removed(self):
+        sir = build_sir([method("__add__", ((Symbol("x"), 1), {}), "a")], ["a"])
+        self.assertIs(DeadStatementElimination().run(sir)[0], sir)
+
+    def test_side_effects(self):
+        x, y = Symbol("x"), Symbol("y")
+        sir = build_sir(
+            [
+                api(paddle.distributed.all_reduce, ((x,), {}), "a"),
+                # The output tensor is passed positionally.
+                api(paddle.assign, ((x, y), {}), "b"),
+                # Called only for its side effects.
+                ApiStatement(paddle.add, ((x, y), {}), None, []),
+            ],
+            [],
+        )
+        self.assertIs(DeadStatementElimination().run(sir)[0], sir)
+
+
+class TestCommonSubexpressionElimination(unittest.TestCase):
+    def test_cse(self):
+        x = Symbol("x")
+        sir = build_sir(
+            [
+                method("reshape", ((x, [-1]), {}), "a"),
+                method("reshape", ((x, [-1]), {}), "b"),
+                method("reshape", ((x, [1, -1]), {}), "c"),
+                api(paddle.add, ((Symbol("a"), Symbol("b")), {}), "d"),
+                api(paddle.add, ((Symbol("a"), Symbol("a")), {}), "e"),
+                api(paddle.add, ((Symbol("d"), Symbol("e")), {}), "f"),
+                # The outputs of SIR are not replaced.
+                api(paddle.add, ((Symbol("d"), Symbol("e")), {}), "g"),
+            ],
+            ["c", "f", "g"],
+        )
+        new_sir, removed = CommonSubexpressionElimination().run(sir)
+        self.assertEqual(removed_names(removed), ["b", "e"])
+        self.assertEqual(
+            [stmt.outputs.name for stmt in new_sir.statements],
+            ["a", "c", "d", "f", "g"],
+        )
+        self.assertEqual(new_sir.statements[2].inputs[0][1].name, "a")
+        self.assertEqual(new_sir.statements[3].inputs[0][1].name, "d")
+
+    def test_mutated(self):
+        x = Symbol("x")
+        sir = build_sir(
+            [
+                method("reshape", ((x, [-1]), {}), "a"),
+                method("add_", ((x, 1), {}), "y"),
+                method("reshape", ((x, [-1]), {}), "b"),
+                api(paddle.rand, (([2],), {}), "c"),
+                api(paddle.rand, (([2],), {}), "d"),
+            ],
+            ["a", "b", "c", "d"],
+        )
+        self.assertEqual(CommonSubexpressionElimination().run(sir)[1], [])
+
+    def test_different_constants(self):
+        # hash(-1) == hash(-2), but the statements are different.
+        x = Symbol("x")
+        sir = build_sir(
+            [
+                api(paddle.sum, ((x,), {"axis": -1}), "a"),
+                api(paddle.sum, ((x,), {"axis": -2}), "b"),
+                api(paddle.add, ((Symbol("a"), Symbol("b")), {}), "c"),
+            ],
+            ["c"],
+        )
+        self.assertEqual(CommonSubexpressionElimination().run(sir)[1], [])
+
+
+class TestConstantFolding(unittest.TestCase):
+    def test_fold(self):
+        sir = build_sir(
+            [
+                api(paddle.arange, ((6,), {}), "a"),
+                method("reshape", ((Symbol("a"), [2, 3]), {}), "b"),
+                method("astype", ((Symbol("b"), "float32"), {}), "c"),
+                api(paddle.add, ((Symbol("x"), Symbol("c")), {}), "d"),
+            ],
+            ["d"],
+        )
+        new_sir, removed = ConstantFolding().run(sir)
+        self.assertEqual(removed_names(removed), ["b", "c"])
+        folded = new_sir.statements[2]
+        self.assertIs(folded.api, paddle.to_tensor)
+        (value,), kwargs = folded.inputs
+        self.assertEqual(value.tolist(), [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(kwargs["dtype"], paddle.float32)
+
+        new_sir, removed = DeadStatementElimination().run(new_sir)
+        self.assertEqual(removed_names(removed), ["a", "b"])
+
+    def test_not_fold(self):
+        sir = build_sir(
+            [
+                api(paddle.rand, (([2],), {}), "a"),
+                method("__add__", ((Symbol("a"), 1), {}), "b"),
+                api(paddle.zeros, (([2048],), {}), "c"),
+                method("__add__", ((Symbol("c"), 1), {}), "d"),
+            ],
+            ["b", "d"],
+        )
+        self.assertEqual(ConstantFolding().run(sir)[1], [])
+
+
+def redundant(x: paddle.Tensor):
+    unused = x * 2  # noqa: F841
+    y = x.reshape([-1]) + x.reshape([-1])
+    return y + paddle.arange(4).reshape([2, 2]).astype("float32").sum()
+
+
+class TestSIRPassManager(TestCaseBase):
+    def setUp(self):
+        SIRPassManager().clear()
+
+    def test_passes(self):
+        x = paddle.rand([2, 2])
+        with test_instruction_translator_cache_context() as ctx:
+            self.assert_results(redundant, x)
+            self.assertEqual(
+                ctx.get_stats()["sir_passes"],
+                {"constant_folding": 3, "cse": 1, "dce": 4},
+            )
+
+    def test_disable(self):
+        x = paddle.rand([2, 2])
+        os.environ["SOT_DISABLED_SIR_PASSES"] = "cse,dce"
+        try:
+            with test_instruction_translator_cache_context() as ctx:
+                self.assert_results(redundant, x)
+                self.assertEqual(
+                    ctx.get_stats()["sir_passes"], {"constant_folding": 3}
+                )
+        finally:
+            del os.environ["SOT_DISABLED_SIR_PASSES"]
+
+
+if __name__ == "__main__":
+    unittest.main()
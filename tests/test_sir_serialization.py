@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import paddle
+from sot import symbolic_translate
+from sot.symbolic.interpreter import compile_sir
+from sot.symbolic.sir_serialization import (
+    OpaqueConstant,
+    compare_sir_dumps,
+    decode_structure,
+    deserialize_sir,
+    dump_sirs,
+    encode_structure,
+    load_sirs,
+    read_sir_dump,
+    serialize_sir,
+)
+from sot.symbolic.statement_ir import (
+    ApiStatement,
+    CallStatement,
+    LayerStatement,
+    MethodStatement,
+    StatementIR,
+    StatementIRFactory,
+    Symbol,
+)
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+from sot.utils import SIRSerializationError
+
+
+def build_sir(name="SIR_test", constant=1, api=paddle.add, layer=None):
+    x, y, z, w = (Symbol(name) for name in ("x", "y", "z", "w"))
+    sir = StatementIR(name)
+    sir.add_statement(ApiStatement(api, ((x, y), {}), z, []))
+    sir.add_statement(MethodStatement("__add__", ((z, constant), {}), w, []))
+    if layer is not None:
+        sir.add_statement(LayerStatement(layer, ((w,), {}), z, []))
+    sir.inputs = [x, y]
+    sir.outputs = [z if layer is not None else w]
+    return sir
+
+
+class TestSIRSerialization(unittest.TestCase):
+    def test_constants(self):
+        for value in [
+            None,
+            True,
+            1,
+            1.5,
+            "x",
+            [1, (2, 3)],
+            {"a": slice(0, None, 2)},
+            1 + 2j,
+            b"abc",
+            Ellipsis,
+            paddle.float16,
+            np.float32(1.5),
+        ]:
+            decoded = decode_structure(encode_structure(value, str))
+            self.assertEqual(decoded, value)
+            self.assertIs(type(decoded), type(value))
+        array = np.arange(6, dtype="int64").reshape([2, 3])
+        np.testing.assert_array_equal(
+            decode_structure(encode_structure(array, str)), array
+        )
+        self.assertIsInstance(
+            decode_structure(encode_structure(object(), str)), OpaqueConstant
+        )
+
+    def test_round_trip(self):
+        layer = paddle.nn.ReLU()
+        sir = build_sir(layer=layer)
+        data = serialize_sir(sir)
+        self.assertEqual(
+            data["inputs"], [{"symbol": "__var_0"}, {"symbol": "__var_1"}]
+        )
+        self.assertEqual(data["statements"][0]["api"], "paddle.tensor.math:add")
+        self.assertEqual(data["statements"][2]["layer"], layer.full_name())
+
+        new_sir = deserialize_sir(data)
+        self.assertEqual(new_sir.structure_hash(), sir.structure_hash())
+        self.assertEqual(serialize_sir(new_sir), data)
+
+        del layer, sir, new_sir
+        with self.assertRaises(SIRSerializationError):
+            deserialize_sir(data)
+
+    def test_run_loaded_sir(self):
+        sir = build_sir(name="SIR_test_run")
+        x, y = paddle.rand([2, 3]), paddle.rand([2, 3])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "sirs.json")
+            dump_sirs(path, [sir])
+            loaded = load_sirs(path)["SIR_test_run"]
+        self.assertIsNot(loaded, sir)
+        compiled_fn = paddle.jit.to_static(
+            compile_sir(SymbolicTraceContext(), loaded.name),
+            enable_fallback=False,
+        )
+        (out,) = compiled_fn((x, y))
+        np.testing.assert_allclose(out.numpy(), (x + y + 1).numpy())
+
+    def test_compare(self):
+        base = serialize_sir(build_sir(name="SIR_0"))
+        self.assertEqual(compare_sir_dumps([base], [base]), [])
+        # The SIRs which aren't paired by names are paired by structures.
+        renamed = serialize_sir(build_sir(name="SIR_1"))
+        self.assertEqual(compare_sir_dumps([base], [renamed]), [])
+
+        diffs = compare_sir_dumps(
+            [base], [serialize_sir(build_sir(name="SIR_0", constant=2))]
+        )
+        self.assertEqual(len(diffs), 1)
+        self.assertIn("statement 1 differs", diffs[0])
+        self.assertEqual(
+            compare_sir_dumps([base], [renamed, base]),
+            ["SIR_1: only in the second dump"],
+        )
+
+    def test_compare_call(self):
+        def build_caller(name, callee):
+            x, y, z = (Symbol(name) for name in ("x", "y", "z"))
+            StatementIRFactory().update(callee)
+            sir = StatementIR(name)
+            sir.add_statement(CallStatement(callee.name, ((x, y), {}), z, []))
+            sir.inputs = [x, y]
+            sir.outputs = [z]
+            return sir
+
+        callee = build_sir(name="SIR_test_callee_0")
+        base = serialize_sir(build_caller("SIR_0", callee))
+        # The called SIRs are named differently in another run.
+        renamed_callee = build_sir(name="SIR_test_callee_1")
+        renamed = serialize_sir(build_caller("SIR_0", renamed_callee))
+        self.assertNotEqual(base, renamed)
+        self.assertEqual(compare_sir_dumps([base], [renamed]), [])
+
+        changed_callee = build_sir(name="SIR_test_callee_2", constant=2)
+        changed = serialize_sir(build_caller("SIR_0", changed_callee))
+        diffs = compare_sir_dumps([base], [changed])
+        self.assertEqual(len(diffs), 1)
+        self.assertIn("statement 0 differs", diffs[0])
+
+    def test_dump_run(self):
+        def foo(x, y):
+            return (x + y) * 2
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, f"{i}.json") for i in range(3)]
+            symbolic_translate(foo)(paddle.rand([2]), paddle.rand([2]))
+            dump_sirs(paths[0])
+            dump_sirs(paths[1])
+            self.assertGreater(len(read_sir_dump(paths[0])), 0)
+            self.assertEqual(compare_sir_dumps(paths[0], paths[1]), [])
+            symbolic_translate(foo)(paddle.rand([2]), paddle.rand([2]) > 0)
+            dump_sirs(paths[2])
+            self.assertNotEqual(compare_sir_dumps(paths[0], paths[2]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
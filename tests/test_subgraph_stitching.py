@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import contextlib
+import unittest
+
+import numpy as np
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot.symbolic.compile_cache import FallbackWrapper
+from sot.symbolic.interpreter import compile_sir
+from sot.symbolic.statement_ir import (
+    ApiStatement,
+    MethodStatement,
+    StatementIR,
+    Symbol,
+)
+from sot.symbolic.subgraph_stitching import (
+    SubgraphStitcher,
+    is_stitchable,
+    stitch_sirs,
+)
+from sot.symbolic.symbolic_context import SymbolicTraceContext
+from sot.utils import StepInfoManager
+
+
+def build_wrapper(method, constant):
+    context = SymbolicTraceContext()
+    sir = context.TOS
+    sir.add_statement(
+        MethodStatement(method, ((Symbol("x"), constant), {}), Symbol("y"), [])
+    )
+    sir.inputs = [Symbol("x")]
+    sir.outputs = [Symbol("y")]
+    return FallbackWrapper(
+        paddle.jit.to_static(
+            compile_sir(context, sir.name), enable_fallback=False
+        ),
+        sir,
+    )
+
+
+def foo(x: paddle.Tensor):
+    y = x + 1
+    print("graph break")
+    z = y * 2
+    print("graph break")
+    return z - x
+
+
+class TestSubgraphStitching(TestCaseBase):
+    def setUp(self):
+        SubgraphStitcher().clear()
+        SubgraphStitcher().ENABLED = True
+
+    def tearDown(self):
+        del SubgraphStitcher().ENABLED
+        SubgraphStitcher().clear()
+
+    def test_stitch_sirs(self):
+        head = build_wrapper("__add__", 1).SIR
+        follower = build_wrapper("__mul__", 2).SIR
+        # The follower takes the output of the head.
+        sir = stitch_sirs("SIR_stitched", head, [(follower, (1,))])
+        self.assertEqual([x.name for x in sir.inputs], ["__stitch0_x"])
+        self.assertEqual(
+            [x.name for x in sir.outputs], ["__stitch0_y", "__stitch1_y"]
+        )
+        self.assertEqual(sir.statements[1].inputs[0][0].name, "__stitch0_y")
+
+    def test_is_stitchable(self):
+        self.assertTrue(is_stitchable(build_wrapper("__mul__", 2).SIR))
+
+        def build_sir(api, args, outputs):
+            sir = StatementIR("SIR_side_effect")
+            sir.add_statement(ApiStatement(api, (args, {}), outputs, []))
+            return sir
+
+        x, y = Symbol("x"), Symbol("y")
+        self.assertTrue(is_stitchable(build_sir(paddle.add, (x, y), [y])))
+        # The followers with side effects may run twice on a miss.
+        self.assertFalse(
+            is_stitchable(build_sir(paddle.distributed.all_reduce, (x,), y))
+        )
+        self.assertFalse(is_stitchable(build_sir(paddle.assign, (x, y), y)))
+        self.assertFalse(is_stitchable(build_sir(paddle.add, (x, y), [])))
+        self.assertFalse(is_stitchable(build_sir(paddle.rand, ([2],), y)))
+
+    def test_stitch(self):
+        with test_instruction_translator_cache_context():
+            for _ in range(5):
+                self.assert_results(foo, paddle.rand([3]))
+            stats = SubgraphStitcher().stats()
+            self.assertEqual(stats["groups"], 1)
+            self.assertEqual(stats["merged_fragments"], 2)
+            self.assertGreater(stats["hits"], 0)
+            self.assertEqual(stats["misses"], 0)
+
+    def test_miss(self):
+        with StepInfoManager().step_guard(self.test_miss.__code__):
+            self.check_miss()
+
+    def check_miss(self):
+        head = build_wrapper("__add__", 1)
+        follower = build_wrapper("__mul__", 2)
+        stitcher = SubgraphStitcher()
+
+        def run(x, update=False, other=None, no_grad=False):
+            (y,) = head((x,))
+            if update:
+                y.add_(paddle.ones_like(y))
+            with paddle.no_grad() if no_grad else contextlib.nullcontext():
+                (z,) = follower((y if other is None else other,))
+            return z
+
+        x = paddle.rand([3])
+        for _ in range(stitcher.STITCH_THRESHOLD + 1):
+            run(x)
+        self.assertEqual(stitcher.stats()["merged_fragments"], 1)
+        self.assertEqual(stitcher.stats()["hits"], 1)
+
+        other = paddle.rand([3])
+        np.testing.assert_allclose(
+            run(x, other=other).numpy(), (other * 2).numpy(), rtol=1e-6
+        )
+        np.testing.assert_allclose(
+            run(x, update=True).numpy(), ((x + 2) * 2).numpy(), rtol=1e-6
+        )
+        self.assertEqual(stitcher.stats()["misses"], 2)
+        run(x, no_grad=True)
+        # The group is dropped after MAX_MISSES misses.
+        self.assertEqual(stitcher.stats()["misses"], 3)
+        self.assertEqual(stitcher.stats()["groups"], 0)
+        for _ in range(stitcher.STITCH_THRESHOLD + 1):
+            run(x)
+        self.assertEqual(stitcher.stats()["groups"], 0)
+
+    def test_disabled(self):
+        SubgraphStitcher().ENABLED = False
+        with test_instruction_translator_cache_context():
+            for _ in range(5):
+                self.assert_results(foo, paddle.rand([3]))
+        self.assertEqual(SubgraphStitcher().stats()["groups"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
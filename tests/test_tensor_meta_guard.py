@@ -0,0 +1,44 @@
+import unittest
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+
+
+def foo(x: paddle.Tensor):
+    return x + 1
+
+
+class TestTensorMetaGuard(TestCaseBase):
+    def test_guard_hit(self):
+        with test_instruction_translator_cache_context() as ctx:
+            self.assert_results(foo, paddle.rand([2, 3]))
+            self.assert_results(foo, paddle.rand([2, 3]))
+            self.assertEqual(ctx.translate_count, 1)
+
+    def test_guard_miss_by_shape(self):
+        with test_instruction_translator_cache_context() as ctx:
+            self.assert_results(foo, paddle.rand([2, 3]))
+            self.assert_results(foo, paddle.rand([3, 2]))
+            self.assertEqual(ctx.translate_count, 2)
+
+    def test_guard_miss_by_dtype(self):
+        with test_instruction_translator_cache_context() as ctx:
+            self.assert_results(foo, paddle.rand([2, 3], dtype="float32"))
+            self.assert_results(foo, paddle.rand([2, 3], dtype="float64"))
+            self.assertEqual(ctx.translate_count, 2)
+
+    def test_guard_miss_by_stop_gradient(self):
+        with test_instruction_translator_cache_context() as ctx:
+            x = paddle.rand([2, 3])
+            self.assert_results(foo, x)
+            x.stop_gradient = False
+            self.assert_results(foo, x)
+            self.assertEqual(ctx.translate_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot.opcode_translator.executor.disk_cache import TranslationDiskCache
+from sot.opcode_translator.executor.dynamic_shape import DynamicShapeManager
+
+
+def numpy_add(x: paddle.Tensor, y: paddle.Tensor):
+    return paddle.to_tensor(x.numpy() + y.numpy())
+
+
+def foo(x: paddle.Tensor, y: int):
+    return x + y
+
+
+class TestTranslationDiskCache(TestCaseBase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.environ["SOT_TRANSLATION_CACHE_DIR"] = self.tmp_dir.name
+
+    def tearDown(self):
+        del os.environ["SOT_TRANSLATION_CACHE_DIR"]
+        self.tmp_dir.cleanup()
+
+    def test_restore_fallback_code(self):
+        def run_in_new_process():
+            # The names of resume functions depend on the translation
+            # history, so a new process is used to simulate a restart.
+            script = (
+                "import paddle\n"
+                "from sot import symbolic_translate\n"
+                "from sot.opcode_translator.executor.executor_cache import OpcodeExecutorCache\n"
+                "from test_translation_disk_cache import numpy_add\n"
+                "x = paddle.to_tensor([1.0])\n"
+                "assert symbolic_translate(numpy_add)(x, x).item() == 2.0\n"
+                "print('translate_count', OpcodeExecutorCache().translate_count)\n"
+            )
+            env = dict(os.environ, STRICT_MODE="0", LOG_LEVEL="0")
+            env["PYTHONPATH"] = os.pathsep.join(
+                [os.path.dirname(os.path.abspath(__file__))]
+                + env.get("PYTHONPATH", "").split(os.pathsep)
+            )
+            result = subprocess.run(
+                [sys.executable, "-c", script],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            return int(result.stdout.split("translate_count")[-1])
+
+        translate_count = run_in_new_process()
+        self.assertEqual(translate_count, 3)
+        # The resume function falling back to dygraph is not translated again.
+        self.assertEqual(run_in_new_process(), 2)
+
+    def test_refuse_stale_record(self):
+        x = paddle.to_tensor([1.0])
+        with test_instruction_translator_cache_context() as ctx:
+            TranslationDiskCache().update(
+                foo.__code__, pinned_reason="recompile storm"
+            )
+            path = TranslationDiskCache().record_path(foo.__code__)
+            with open(path) as f:
+                record = json.load(f)
+            record["identity"]["bytecode_hash"] = "stale"
+            with open(path, "w") as f:
+                json.dump(record, f)
+            self.assertIsNone(TranslationDiskCache().load(foo.__code__))
+            self.assert_results(foo, x, 1)
+            self.assertEqual(ctx.translate_count, 1)
+            self.assertNotIn(foo.__code__, ctx.pinned_codes)
+
+    def test_restore_pinned_and_dynamic_dims(self):
+        with test_instruction_translator_cache_context() as ctx, patch.multiple(
+            ctx, DYNAMIC_SHAPE_THRESHOLD=2
+        ):
+            TranslationDiskCache().update(
+                foo.__code__,
+                pinned_reason="recompile storm",
+                pinned_misses=ctx.RECOMPILE_STORM_THRESHOLD,
+                dynamic_dims={"x": [0]},
+            )
+            self.assert_results(foo, paddle.to_tensor([1.0]), 1)
+            self.assertEqual(ctx.translate_count, 0)
+            self.assertEqual(ctx.pinned_codes[foo.__code__], "recompile storm")
+            self.assertEqual(
+                DynamicShapeManager().get_dynamic_dims(foo.__code__, "x"),
+                (0,),
+            )
+
+    def test_revalidate_pinned(self):
+        with test_instruction_translator_cache_context() as ctx:
+            # The pin was triggered by a lower threshold.
+            TranslationDiskCache().update(
+                foo.__code__,
+                pinned_reason="recompile storm",
+                pinned_misses=ctx.RECOMPILE_STORM_THRESHOLD - 1,
+            )
+            self.assert_results(foo, paddle.to_tensor([1.0]), 1)
+            self.assertEqual(ctx.translate_count, 1)
+            self.assertNotIn(foo.__code__, ctx.pinned_codes)
+
+    def test_disabled(self):
+        del os.environ["SOT_TRANSLATION_CACHE_DIR"]
+        TranslationDiskCache().update(foo.__code__, pinned_reason="storm")
+        self.assertIsNone(TranslationDiskCache().load(foo.__code__))
+        os.environ["SOT_TRANSLATION_CACHE_DIR"] = self.tmp_dir.name
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import gc
+import unittest
+import weakref
+
+import paddle
+from sot.infer_meta import InferMetaCache, MetaInfo, VariableCreator
+
+
+def meta(shape, dtype=paddle.float32, stop_gradient=True):
+    return MetaInfo(shape, dtype, stop_gradient, "x", False, None, None)
+
+
+class TestVariableCreator(unittest.TestCase):
+    def setUp(self):
+        VariableCreator().MAX_PROGRAM_OPS = 4
+
+    def tearDown(self):
+        del VariableCreator().MAX_PROGRAM_OPS
+
+    def test_recycle(self):
+        recycles = VariableCreator().recycle_num
+        program = weakref.ref(VariableCreator().main_program)
+        # The ops have no rules of RuleInferMeta.
+        outs = [
+            VariableCreator().infer_meta(
+                paddle.cumsum, meta([i + 1, 3]), axis=0
+            )
+            for i in range(10)
+        ]
+        self.assertEqual(
+            [out.shape for out in outs], [(i + 1, 3) for i in range(10)]
+        )
+        stats = InferMetaCache().stats()
+        self.assertGreater(stats["program_recycles"], recycles)
+        self.assertLessEqual(stats["program_ops"], 4)
+        self.assertLessEqual(
+            len(VariableCreator().var_cache), stats["program_vars"]
+        )
+        # The inferred metas don't keep the recycled programs alive.
+        gc.collect()
+        self.assertIsNone(program())
+
+
+if __name__ == "__main__":
+    unittest.main()
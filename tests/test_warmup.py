@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import unittest
+from unittest import mock
+
+from test_case_base import (
+    TestCaseBase,
+    test_instruction_translator_cache_context,
+)
+
+import paddle
+from sot import symbolic_translate, warmup
+from sot.utils import StepInfoManager, StepState
+
+
+def foo(x: paddle.Tensor, y: int):
+    return x + y
+
+
+def foo_with_break(x: paddle.Tensor):
+    x = x + 1
+    print("graph break")
+    return x * 2
+
+
+class TestWarmup(TestCaseBase):
+    def test_warmup(self):
+        # The tensors are guarded by stop_gradient too.
+        specs = [
+            [paddle.static.InputSpec([2, 3], "float32", stop_gradient=True), 1],
+            [paddle.static.InputSpec([4], "float32", stop_gradient=True), 1],
+        ]
+        with test_instruction_translator_cache_context() as ctx:
+            reports = warmup(foo, specs)
+            self.assertEqual(len(reports), 2)
+            for report in reports:
+                self.assertEqual(report["translations"], 1)
+                self.assertEqual(report["state"], StepState.RUN_SOT.name)
+                self.assertGreater(report["first_call"], 0)
+            # The normal call path hits the warm cache.
+            symbolic_translate(foo)(paddle.rand([2, 3]), 1)
+            symbolic_translate(foo)(paddle.rand([4]), 1)
+            self.assertEqual(ctx.translate_count, 2)
+            self.assert_results(foo, paddle.rand([2, 3]), 1)
+            self.assertEqual(ctx.translate_count, 2)
+
+    def test_stop_gradient(self):
+        # The stop_gradient of InputSpec is False by default.
+        specs = [[paddle.static.InputSpec([2, 3], "float32"), 1]]
+        with test_instruction_translator_cache_context() as ctx:
+            warmup(foo, specs)
+            x = paddle.rand([2, 3])
+            x.stop_gradient = False
+            symbolic_translate(foo)(x, 1)
+            self.assertEqual(ctx.translate_count, 1)
+            # The inputs which don't require gradients miss the cache.
+            symbolic_translate(foo)(paddle.rand([2, 3]), 1)
+            self.assertEqual(ctx.translate_count, 2)
+
+    def test_graph_break(self):
+        with test_instruction_translator_cache_context() as ctx:
+            (report,) = warmup(foo_with_break, [[paddle.rand([3])]])
+            self.assertGreater(report["translations"], 1)
+            translate_count = ctx.translate_count
+            symbolic_translate(foo_with_break)(paddle.rand([3]))
+            self.assertEqual(ctx.translate_count, translate_count)
+
+    def test_async_translation(self):
+        with test_instruction_translator_cache_context() as ctx:
+            ctx.ASYNC_TRANSLATION = True
+            try:
+                (report,) = warmup(foo, [[paddle.rand([5]), 2]])
+                self.assertEqual(report["translations"], 1)
+                symbolic_translate(foo)(paddle.rand([5]), 2)
+                self.assertEqual(ctx.translate_count, 1)
+            finally:
+                del ctx.ASYNC_TRANSLATION
+
+    def test_cost_model(self):
+        def bar(x: paddle.Tensor):
+            return x * 2
+
+        with test_instruction_translator_cache_context():
+            with mock.patch.dict(os.environ, {"COST_MODEL": "True"}):
+                (report,) = warmup(bar, [[paddle.rand([3])]])
+            self.assertGreater(report["calls"], 1)
+            self.assertNotEqual(report["state"], StepState.COLLECT_INFO.name)
+            self.assertEqual(
+                StepInfoManager().step_record[bar.__code__].state.name,
+                report["state"],
+            )
+
+    def test_dynamic_spec(self):
+        with self.assertRaises(ValueError):
+            warmup(foo, [[paddle.static.InputSpec([None, 3], "float32"), 1]])
+
+
+if __name__ == "__main__":
+    unittest.main()